@@ -93,6 +93,8 @@ from corsheaders.defaults import default_headers
 CORS_ALLOW_HEADERS = list(default_headers) + [
     "Authorization",
     "Content-Type",
+    "Cache-Control",
+    "X-Request-Timeout",
 ]
 
 ROOT_URLCONF = 'GENAI_BACKEND.urls'
@@ -219,3 +221,224 @@ DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 MEDIA_URL = "/media/"
 
+
+# AI provider clients (created once per worker process and reused)
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+AI_GEMINI_TRANSPORT = os.getenv("AI_GEMINI_TRANSPORT") or None
+AI_TEXT_MODEL = os.getenv("AI_TEXT_MODEL", "gemini-2.0-flash")
+AI_IMAGE_MODEL = os.getenv("AI_IMAGE_MODEL", "dall-e-3")
+AI_TEXT_TIMEOUT = float(os.getenv("AI_TEXT_TIMEOUT", 60))
+AI_IMAGE_TIMEOUT = float(os.getenv("AI_IMAGE_TIMEOUT", 120))
+# Per prompt kind overrides, e.g. {"poster_copy": 15}
+AI_TIMEOUTS = {}
+AI_HTTP_MAX_CONNECTIONS = int(os.getenv("AI_HTTP_MAX_CONNECTIONS", 10))
+AI_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("AI_HTTP_KEEPALIVE_EXPIRY", 60))
+
+# LLM response cache: in-process LRU in front of the LLMResponseCache table
+AI_CACHE_LOCAL_MAX_ENTRIES = int(os.getenv("AI_CACHE_LOCAL_MAX_ENTRIES", 512))
+AI_CACHE_DB_MAX_ENTRIES = int(os.getenv("AI_CACHE_DB_MAX_ENTRIES", 10000))
+AI_CACHE_DEFAULT_TTL = int(os.getenv("AI_CACHE_DEFAULT_TTL", 3600))
+# Seconds per prompt kind, 0 disables caching for that kind
+AI_CACHE_TTLS = {
+    "event": 3600,
+    "task_assignment": 86400,
+    "venue_suggestion": 86400,
+    "registration_form": 86400,
+    "invitation": 3600,
+    "social_post": 3600,
+    "poster_copy": 86400,
+    "social_post_candidates": 3600,
+    "poster_copy_candidates": 86400,
+    "poster_image": 86400,
+}
+
+# Background generation jobs (?async=true), run on a thread pool per worker
+AI_JOB_WORKERS = int(os.getenv("AI_JOB_WORKERS", 4))
+AI_JOB_HEARTBEAT = int(os.getenv("AI_JOB_HEARTBEAT", 15))
+AI_JOB_STALE_AFTER = int(os.getenv("AI_JOB_STALE_AFTER", 120))
+AI_JOB_MAX_ATTEMPTS = int(os.getenv("AI_JOB_MAX_ATTEMPTS", 3))
+AI_JOB_RECOVER_INTERVAL = int(os.getenv("AI_JOB_RECOVER_INTERVAL", 30))
+
+# Parallel stages of /ai/generate-kit/<event_id>/
+AI_KIT_WORKERS = int(os.getenv("AI_KIT_WORKERS", 4))
+
+# Seconds a coalesced result stays available to workers that waited on it
+AI_COALESCE_RESULT_TTL = int(os.getenv("AI_COALESCE_RESULT_TTL", 300))
+# Retry-After of a request that gave up waiting for an identical one
+AI_COALESCE_RETRY_AFTER = int(os.getenv("AI_COALESCE_RETRY_AFTER", 5))
+
+# Provider retries and circuit breakers (see ai/services/resilience.py)
+AI_RESILIENCE = {
+    "gemini": {"max_attempts": 3, "base_delay": 0.5, "max_delay": 8, "deadline": 90,
+               "failure_threshold": 5, "reset_timeout": 30},
+    "openai": {"max_attempts": 2, "base_delay": 1, "max_delay": 10, "deadline": 150,
+               "failure_threshold": 3, "reset_timeout": 60},
+}
+# Total provider time budget in seconds; requests can lower it with X-Request-Timeout
+AI_REQUEST_DEADLINE = float(os.getenv("AI_REQUEST_DEADLINE", 150))
+AI_KIT_DEADLINE = float(os.getenv("AI_KIT_DEADLINE", 300))
+AI_JOB_DEADLINE = float(os.getenv("AI_JOB_DEADLINE", 600))
+
+# Model routing per prompt kind (see ai/services/routing.py). ModelRoute rows
+# override AI_MODEL_ROUTES at runtime; a route whose recent p95 breaches its
+# SLO falls back to the faster tier.
+AI_MODEL_TIERS = {
+    "quality": {"model": os.getenv("AI_QUALITY_MODEL", "gemini-2.5-flash"), "fallback": "standard"},
+    "standard": {"model": AI_TEXT_MODEL, "fallback": "fast"},
+    "fast": {"model": os.getenv("AI_FAST_MODEL", "gemini-2.0-flash-lite")},
+}
+AI_DEFAULT_MODEL_TIER = "standard"
+AI_MODEL_ROUTES = {
+    "event": {"tier": "standard", "slo_p95_ms": 10000},
+    "task_assignment": {"tier": "standard", "slo_p95_ms": 10000},
+    "venue_suggestion": {"tier": "quality", "slo_p95_ms": 20000},
+    "registration_form": {"tier": "standard", "slo_p95_ms": 10000},
+    "invitation": {"tier": "standard", "slo_p95_ms": 10000},
+    "social_post": {"tier": "standard", "slo_p95_ms": 10000},
+    "poster_copy": {"tier": "fast", "slo_p95_ms": 5000},
+    "social_post_candidates": {"tier": "standard", "slo_p95_ms": 15000},
+    "poster_copy_candidates": {"tier": "fast", "slo_p95_ms": 8000},
+}
+AI_ROUTES_REFRESH = int(os.getenv("AI_ROUTES_REFRESH", 10))
+AI_ROUTE_WINDOW = int(os.getenv("AI_ROUTE_WINDOW", 300))
+AI_ROUTE_MIN_SAMPLES = int(os.getenv("AI_ROUTE_MIN_SAMPLES", 20))
+
+# "fake" switches text/image generation to the offline provider used for load
+# tests (ai/services/fake_provider.py)
+AI_TEXT_PROVIDER = os.getenv("AI_TEXT_PROVIDER", "gemini")
+AI_IMAGE_PROVIDER = os.getenv("AI_IMAGE_PROVIDER", "openai")
+AI_FAKE_TEXT_LATENCY_MS = float(os.getenv("AI_FAKE_TEXT_LATENCY_MS", 800))
+AI_FAKE_IMAGE_LATENCY_MS = float(os.getenv("AI_FAKE_IMAGE_LATENCY_MS", 5000))
+AI_FAKE_LATENCY_JITTER = float(os.getenv("AI_FAKE_LATENCY_JITTER", 0.25))
+AI_FAKE_ERROR_RATE = float(os.getenv("AI_FAKE_ERROR_RATE", 0))
+# Prompt kind -> canned JSON answer, instead of one generated from the schema
+AI_FAKE_RESPONSES = {}
+
+# Static prompt prefixes are sent as system instructions and, when at least
+# AI_CONTEXT_CACHE_MIN_TOKENS long (the provider's minimum for explicit
+# caching), kept in a Gemini context cache. The current prefixes (roughly
+# 150-550 tokens) are below it, so they are billed as input on every call.
+AI_CONTEXT_CACHE = os.getenv("AI_CONTEXT_CACHE", "true").lower() == "true"
+AI_CONTEXT_CACHE_TTL = int(os.getenv("AI_CONTEXT_CACHE_TTL", 3600))
+AI_CONTEXT_CACHE_MIN_TOKENS = int(os.getenv("AI_CONTEXT_CACHE_MIN_TOKENS", 1024))
+
+# Speculative task/venue generation after an event is created (opt-in per
+# request with "speculate": true, or for every event with this setting)
+AI_SPECULATIVE_GENERATION = os.getenv("AI_SPECULATIVE_GENERATION", "false").lower() == "true"
+AI_SPECULATIVE_WORKERS = int(os.getenv("AI_SPECULATIVE_WORKERS", 1))
+AI_SPECULATIVE_MAX_PENDING = int(os.getenv("AI_SPECULATIVE_MAX_PENDING", 20))
+# Interactive generations in flight above which speculative work waits
+AI_SPECULATIVE_MAX_INTERACTIVE = int(os.getenv("AI_SPECULATIVE_MAX_INTERACTIVE", 2))
+AI_SPECULATIVE_MAX_DEFER = int(os.getenv("AI_SPECULATIVE_MAX_DEFER", 30))
+AI_SPECULATIVE_DEADLINE = float(os.getenv("AI_SPECULATIVE_DEADLINE", 60))
+# Seconds a generate-* call waits for a matching draft that is still running
+AI_SPECULATIVE_WAIT = float(os.getenv("AI_SPECULATIVE_WAIT", 20))
+
+# Semantic near-duplicate cache: a generation is reused for inputs whose
+# embedded "fields" have a cosine similarity of at least "threshold" and whose
+# "exact" fields are identical
+AI_SEMANTIC_CACHE = {
+    "event": {
+        "fields": ["type", "target_audience", "goal", "atmosphere"],
+        "exact": ["date", "budget"],
+        "threshold": float(os.getenv("AI_SEMANTIC_THRESHOLD", 0.95)),
+    },
+}
+AI_SEMANTIC_DIMENSIONS = int(os.getenv("AI_SEMANTIC_DIMENSIONS", 512))
+AI_SEMANTIC_CAPACITY = int(os.getenv("AI_SEMANTIC_CAPACITY", 50000))
+AI_SEMANTIC_CACHE_PATH = os.getenv("AI_SEMANTIC_CACHE_PATH", str(BASE_DIR / "var" / "semantic_cache.npy"))
+
+# Admission control: per-user and global token buckets (tokens per second and
+# burst size). A request costs the sum of its prompt kinds' costs.
+AI_ADMISSION_ENABLED = os.getenv("AI_ADMISSION_ENABLED", "true").lower() == "true"
+AI_ADMISSION_DEFAULT_COST = 1
+AI_ADMISSION_COSTS = {
+    "poster_image": 10,
+}
+AI_ADMISSION_USER_RATE = float(os.getenv("AI_ADMISSION_USER_RATE", 0.2))
+AI_ADMISSION_USER_BURST = float(os.getenv("AI_ADMISSION_USER_BURST", 30))
+AI_ADMISSION_GLOBAL_RATE = float(os.getenv("AI_ADMISSION_GLOBAL_RATE", 5))
+AI_ADMISSION_GLOBAL_BURST = float(os.getenv("AI_ADMISSION_GLOBAL_BURST", 100))
+# Seconds a request waits for its turn at the global bucket before a 429
+AI_ADMISSION_MAX_WAIT = float(os.getenv("AI_ADMISSION_MAX_WAIT", 10))
+AI_ADMISSION_JOB_WAIT = float(os.getenv("AI_ADMISSION_JOB_WAIT", 300))
+# Admit requests when the TokenBucket table is unavailable; false rejects them with 429
+AI_ADMISSION_FAIL_OPEN = os.getenv("AI_ADMISSION_FAIL_OPEN", "true").lower() == "true"
+
+# Priority lanes for provider calls, highest priority first, with the number
+# of concurrent calls per worker process. Queued bulk work waits while
+# interactive calls are queued.
+AI_LANES = {
+    "interactive": {"concurrency": int(os.getenv("AI_LANE_INTERACTIVE_CONCURRENCY", 8))},
+    "bulk": {"concurrency": int(os.getenv("AI_LANE_BULK_CONCURRENCY", 2))},
+}
+
+# candidates=N on social posts and poster copy: variants per request, and
+# "single_call" (one response with N variants) or "parallel" (N calls, for
+# providers that return one answer per call)
+AI_CANDIDATES_MAX = int(os.getenv("AI_CANDIDATES_MAX", 5))
+AI_CANDIDATES_DEFAULT = int(os.getenv("AI_CANDIDATES_DEFAULT", 3))
+AI_CANDIDATES_MODE = os.getenv("AI_CANDIDATES_MODE", "single_call")
+
+# Registration QR code pasted into the bottom-right corner of each poster
+# (as its "qr" variant); size and margin are fractions of the poster side
+AI_POSTER_QR = os.getenv("AI_POSTER_QR", "true").lower() == "true"
+AI_QR_WORKERS = int(os.getenv("AI_QR_WORKERS", 1))
+AI_QR_SIZE_RATIO = float(os.getenv("AI_QR_SIZE_RATIO", 0.2))
+AI_QR_MARGIN_RATIO = float(os.getenv("AI_QR_MARGIN_RATIO", 0.03))
+
+# Downscaled renditions of generated posters (name -> width in pixels), in
+# each of these formats the installed Pillow can encode
+AI_IMAGE_RENDITIONS = {"thumbnail": 256, "card": 512, "full": 1024}
+AI_IMAGE_FORMATS = ["avif", "webp"]
+AI_RENDITION_WORKERS = int(os.getenv("AI_RENDITION_WORKERS", 1))
+
+# Media serving: max-age for files without a content-hashed name, and
+# offloading of the body to a front proxy ("x-accel-redirect" with an
+# internal nginx location at AI_MEDIA_ACCEL_PREFIX aliased to MEDIA_ROOT,
+# or "x-sendfile"); empty serves files from the worker
+AI_MEDIA_MAX_AGE = int(os.getenv("AI_MEDIA_MAX_AGE", 3600))
+AI_MEDIA_OFFLOAD = os.getenv("AI_MEDIA_OFFLOAD", "")
+AI_MEDIA_ACCEL_PREFIX = os.getenv("AI_MEDIA_ACCEL_PREFIX", "/protected-media/")
+
+# Orphaned poster files: each worker that saves posters sweeps every
+# AI_MEDIA_GC_INTERVAL seconds (0 = only "manage.py gc_media"), keeping
+# files younger than AI_MEDIA_GC_GRACE seconds
+AI_MEDIA_GC_INTERVAL = int(os.getenv("AI_MEDIA_GC_INTERVAL", 21600))
+AI_MEDIA_GC_GRACE = int(os.getenv("AI_MEDIA_GC_GRACE", 3600))
+
+# Poster images: "provider" (the image model) or "local" (template renderer,
+# also the fallback when the provider fails or takes longer than
+# AI_POSTER_FALLBACK_AFTER seconds); requests choose with "engine".
+# AI_POSTER_FONT is a TrueType font for the local renderer (one with CJK
+# glyphs for Chinese/Japanese posters)
+AI_POSTER_ENGINE = os.getenv("AI_POSTER_ENGINE", "provider")
+AI_POSTER_LOCAL_FALLBACK = os.getenv("AI_POSTER_LOCAL_FALLBACK", "true").lower() == "true"
+AI_POSTER_FALLBACK_AFTER = float(os.getenv("AI_POSTER_FALLBACK_AFTER", 45))
+AI_POSTER_FONT = os.getenv("AI_POSTER_FONT", "")
+AI_LOCAL_POSTER_SIZE = (1024, 1448)
+
+# Venue geocoding cache: found places are refreshed after AI_GEOCODE_TTL
+# seconds, names Nominatim does not know are retried after
+# AI_GEOCODE_NEGATIVE_TTL; Nominatim allows one request per second
+AI_GEOCODE_TTL = int(os.getenv("AI_GEOCODE_TTL", 30 * 86400))
+AI_GEOCODE_NEGATIVE_TTL = int(os.getenv("AI_GEOCODE_NEGATIVE_TTL", 86400))
+AI_GEOCODE_LOCAL_MAX_ENTRIES = 1024
+AI_GEOCODE_TIMEOUT = float(os.getenv("AI_GEOCODE_TIMEOUT", 10))
+# Nominatim requests per second (and burst) across all workers
+AI_GEOCODE_RATE = float(os.getenv("AI_GEOCODE_RATE", 1.0))
+AI_GEOCODE_BURST = float(os.getenv("AI_GEOCODE_BURST", 1))
+# Venue suggestions wait AI_GEOCODE_DEADLINE seconds for geocoding, the rest
+# is filled in later; a background lookup waits at most AI_GEOCODE_MAX_WAIT
+# for its turn at the bucket
+AI_GEOCODE_WORKERS = int(os.getenv("AI_GEOCODE_WORKERS", 4))
+AI_GEOCODE_DEADLINE = float(os.getenv("AI_GEOCODE_DEADLINE", 3))
+AI_GEOCODE_MAX_WAIT = float(os.getenv("AI_GEOCODE_MAX_WAIT", 60))
+
+# Venue catalogue (api.Venue): up to AI_VENUE_PROMPT_CANDIDATES venues in the
+# radius go into the venue prompt; with AI_VENUE_CATALOGUE_ANSWER_MIN or more
+# (0 = never) they are the answer and the model is not called
+AI_VENUE_PROMPT_CANDIDATES = int(os.getenv("AI_VENUE_PROMPT_CANDIDATES", 10))
+AI_VENUE_CATALOGUE_ANSWER_MIN = int(os.getenv("AI_VENUE_CATALOGUE_ANSWER_MIN", 5))
+AI_VENUE_INDEX_CHECK = int(os.getenv("AI_VENUE_INDEX_CHECK", 30))
@@ -0,0 +1,36 @@
+# Settings for the test suite: SQLite, the offline fake provider and a
+# throwaway media directory, so the tests need no database server or API keys.
+#   python manage.py test --settings=GENAI_BACKEND.test_settings
+import atexit
+import os
+import shutil
+import tempfile
+
+os.environ.setdefault("EMAIL_HOST_USER", "test@example.com")
+os.environ.setdefault("EMAIL_HOST_PASSWORD", "test")
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from GENAI_BACKEND.settings import *  # noqa: E402,F401,F403
+
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": ":memory:",
+    }
+}
+
+SECURE_SSL_REDIRECT = False
+PASSWORD_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+
+_TEST_DIR = tempfile.mkdtemp(prefix="genai-tests-")
+atexit.register(shutil.rmtree, _TEST_DIR, True)
+MEDIA_ROOT = os.path.join(_TEST_DIR, "media")
+AI_SEMANTIC_CACHE_PATH = os.path.join(_TEST_DIR, "semantic_cache.npy")
+AI_MEDIA_GC_INTERVAL = 0
+AI_MEDIA_OFFLOAD = ""
+
+AI_TEXT_PROVIDER = "fake"
+AI_IMAGE_PROVIDER = "fake"
+AI_FAKE_TEXT_LATENCY_MS = 0
+AI_FAKE_IMAGE_LATENCY_MS = 0
+AI_FAKE_ERROR_RATE = 0
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from ai.services import storage
+
+
+class Command(BaseCommand):
+    help = "Delete generated poster files no VisualAsset references any more"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Only report what would be deleted")
+        parser.add_argument("--grace", type=int, default=None,
+                            help="Keep files modified within this many seconds (default AI_MEDIA_GC_GRACE)")
+
+    def handle(self, *args, **options):
+        stats = storage.collect(grace=options["grace"], dry_run=options["dry_run"])
+        verb = "Would delete" if options["dry_run"] else "Deleted"
+        self.stdout.write(f"{verb} {stats['deleted']} of {stats['scanned']} files ({stats['bytes']} bytes)")
@@ -0,0 +1,78 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from ai.services import geocode
+from api.models import Venue
+
+# updated_at is set explicitly: auto_now does not apply to rows updated on conflict,
+# and the radius index of every worker is rebuilt when it changes
+FIELDS = ["name", "address", "lat", "lon", "capacity", "is_outdoor", "transportation_score", "map_url", "updated_at"]
+
+
+def _bool(value) -> bool:
+    return str(value).strip().lower() in ("1", "true", "yes", "y", "outdoor")
+
+
+class Command(BaseCommand):
+    help = ("Load venues into the catalogue from a CSV file with the columns name, capacity and "
+            "optionally address, lat, lon, is_outdoor, transportation_score, map_url. "
+            "Rows are matched on name and address; venues without coordinates are geocoded.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("csv_file")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        # (name, address) -> Venue; a later row for the same venue replaces an earlier one
+        venues, lines, skipped = {}, {}, []
+        now = timezone.now()
+        with open(options["csv_file"], newline="", encoding="utf-8-sig") as f:
+            reader = csv.DictReader(f)
+            missing = {"name", "capacity"} - set(reader.fieldnames or [])
+            if missing:
+                raise CommandError(f"Missing columns: {', '.join(sorted(missing))}")
+
+            for line, row in enumerate(reader, start=2):
+                name = (row.get("name") or "").strip()
+                try:
+                    if row.get("lat") and row.get("lon"):
+                        lat, lon = float(row["lat"]), float(row["lon"])
+                    else:
+                        location = geocode.lookup(name)
+                        if not location:
+                            raise ValueError("could not be geocoded")
+                        lat, lon = location["lat"], location["lon"]
+                        row["address"] = row.get("address") or location["address"][:255]
+                    venue = Venue(
+                        name=name,
+                        address=(row.get("address") or "").strip(),
+                        lat=lat,
+                        lon=lon,
+                        capacity=int(row["capacity"]),
+                        is_outdoor=_bool(row.get("is_outdoor", "")),
+                        transportation_score=int(row.get("transportation_score") or 3),
+                        map_url=(row.get("map_url") or "").strip() or None,
+                        updated_at=now,
+                    )
+                except (TypeError, ValueError) as e:
+                    skipped.append(f"line {line} ({name or 'no name'}): {e}")
+                    continue
+
+                # One batch must not update the same row twice (PostgreSQL rejects it)
+                key = (venue.name, venue.address)
+                if key in venues:
+                    skipped.append(f"line {lines[key]} ({name}): superseded by line {line}")
+                venues[key], lines[key] = venue, line
+
+        Venue.objects.bulk_create(
+            list(venues.values()),
+            batch_size=options["batch_size"],
+            update_conflicts=True,
+            unique_fields=["name", "address"],
+            update_fields=[field for field in FIELDS if field not in ("name", "address")],
+        )
+        for message in skipped:
+            self.stderr.write(f"Skipped {message}")
+        self.stdout.write(f"Imported {len(venues)} venues, skipped {len(skipped)}")
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from ai.services import geocode
+from api.models import VenueSuggestion
+
+
+class Command(BaseCommand):
+    help = "Geocode place names ahead of time so venue generation finds them cached"
+
+    def add_arguments(self, parser):
+        parser.add_argument("names", nargs="*", help="Place names to geocode")
+        parser.add_argument("--file", help="File with one place name per line")
+        parser.add_argument("--from-venues", action="store_true", help="Every saved venue suggestion name")
+        parser.add_argument("--refresh", action="store_true", help="Geocode again even when cached")
+
+    def handle(self, *args, **options):
+        names = list(options["names"])
+        if options["file"]:
+            with open(options["file"], encoding="utf-8") as f:
+                names.extend(line.strip() for line in f)
+        if options["from_venues"]:
+            names.extend(VenueSuggestion.objects.values_list("name", flat=True).distinct())
+
+        # One lookup per normalized name
+        queries = {geocode.normalize(name): name for name in names if geocode.normalize(name)}
+        counts = {"cached": 0, "found": 0, "not_found": 0}
+        for query, name in queries.items():
+            if not options["refresh"] and geocode.is_fresh(name):
+                counts["cached"] += 1
+                continue
+            result = geocode.lookup(name, refresh=options["refresh"])
+            counts["found" if result else "not_found"] += 1
+            self.stdout.write(f"{name}: {result['address'] if result else 'not found'}")
+
+        self.stdout.write(
+            f"{len(queries)} names: {counts['found']} geocoded, {counts['not_found']} not found, "
+            f"{counts['cached']} already cached"
+        )
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.1 on 2026-10-18 16:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai', '0002_generationjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CoalescedResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('body', models.JSONField()),
+                ('status_code', models.PositiveSmallIntegerField()),
+                ('created_at', models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
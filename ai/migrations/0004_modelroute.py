@@ -0,0 +1,24 @@
+# Generated by Django 5.2.1 on 2026-10-18 16:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai', '0003_coalescedresult'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ModelRoute',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prompt_kind', models.CharField(max_length=50, unique=True)),
+                ('tier', models.CharField(max_length=20)),
+                ('slo_p95_ms', models.PositiveIntegerField(blank=True, null=True)),
+                ('enabled', models.BooleanField(default=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
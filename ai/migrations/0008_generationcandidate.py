@@ -0,0 +1,29 @@
+# Generated by Django 5.2.1 on 2026-10-18 16:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai', '0007_tokenbucket'),
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GenerationCandidate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prompt_kind', models.CharField(max_length=50)),
+                ('input_hash', models.CharField(db_index=True, max_length=64)),
+                ('content', models.JSONField()),
+                ('score', models.FloatField()),
+                ('checks', models.JSONField(default=dict)),
+                ('served', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='generation_candidates', to='api.event')),
+            ],
+        ),
+    ]
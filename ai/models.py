@@ -0,0 +1,133 @@
+# ai/models.py
+import uuid
+from django.contrib.auth import get_user_model
+from django.db import models
+from django.utils import timezone
+
+from api.models import Event
+
+User = get_user_model()
+
+
+class LLMResponseCache(models.Model):
+    # sha256 of prompt text + model name + generation config
+    key = models.CharField(max_length=64, unique=True)
+    prompt_kind = models.CharField(max_length=50)
+    model = models.CharField(max_length=100)
+    response = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+    last_hit_at = models.DateTimeField(blank=True, null=True)
+    hit_count = models.PositiveIntegerField(default=0)
+
+
+class GenerationJob(models.Model):
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+        ('cancelled', 'Cancelled'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='generation_jobs')
+    endpoint = models.CharField(max_length=50)
+    event_id = models.PositiveIntegerField(blank=True, null=True)
+    request_data = models.JSONField(default=dict)
+    options = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued', db_index=True)
+    result = models.JSONField(blank=True, null=True)
+    http_status = models.PositiveSmallIntegerField(blank=True, null=True)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    worker = models.CharField(max_length=100, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    heartbeat_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+
+# Result of a coalesced generation, shared with workers that waited on it
+class CoalescedResult(models.Model):
+    key = models.CharField(max_length=64, unique=True)
+    body = models.JSONField()
+    status_code = models.PositiveSmallIntegerField()
+    created_at = models.DateTimeField(db_index=True)
+
+
+# Runtime override of the model tier a prompt kind is routed to
+class ModelRoute(models.Model):
+    prompt_kind = models.CharField(max_length=50, unique=True)
+    tier = models.CharField(max_length=20)
+    slo_p95_ms = models.PositiveIntegerField(blank=True, null=True)
+    enabled = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+# Result of a speculative generation started right after an event was created.
+# The next generate-* call with the same input uses it instead of calling the model.
+class GenerationDraft(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('ready', 'Ready'),
+        ('used', 'Used'),
+        ('failed', 'Failed'),
+        ('cancelled', 'Cancelled'),
+    ]
+
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='generation_drafts')
+    prompt_kind = models.CharField(max_length=50)
+    input_hash = models.CharField(max_length=64)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', db_index=True)
+    result = models.JSONField(blank=True, null=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        unique_together = ('event', 'prompt_kind')
+
+
+# Result reusable for near-duplicate inputs; its embedding is row `slot` of
+# the memory-mapped vector file (see ai/services/semantic_cache.py)
+class SemanticCacheEntry(models.Model):
+    slot = models.PositiveIntegerField(unique=True)
+    prompt_kind = models.CharField(max_length=50)
+    constraint_key = models.CharField(max_length=64, db_index=True)
+    result = models.JSONField()
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+
+# Token bucket state shared by every worker (see ai/services/admission.py)
+class TokenBucket(models.Model):
+    key = models.CharField(max_length=100, unique=True)
+    tokens = models.FloatField()
+    updated_at = models.DateTimeField()
+
+
+# One ranked variant of a candidates=N generation. The unserved ones answer
+# "another" requests for the same input without calling the model.
+class GenerationCandidate(models.Model):
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='generation_candidates')
+    prompt_kind = models.CharField(max_length=50)
+    input_hash = models.CharField(max_length=64, db_index=True)
+    content = models.JSONField()
+    score = models.FloatField()
+    checks = models.JSONField(default=dict)
+    served = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+
+# Geocoded place names (see ai/services/geocode.py). found=False caches a
+# lookup that returned nothing, so it is not repeated until it expires.
+class GeocodeCache(models.Model):
+    query = models.CharField(max_length=255, unique=True)
+    found = models.BooleanField(default=True)
+    address = models.TextField(blank=True)
+    lat = models.FloatField(blank=True, null=True)
+    lon = models.FloatField(blank=True, null=True)
+    map_url = models.URLField(blank=True, null=True)
+    fetched_at = models.DateTimeField(default=timezone.now, db_index=True)
@@ -1,23 +1,33 @@
-#Functions contains system prompt and user prompt
-def get_event_generation_prompt(event_data: dict) -> str:
-    system_prompt = (
-                    """
-                    You are a skilled activities planner.
+# Prompt templates.
+# Every prompt is a static system prefix plus a small per-event user section.
+# The prefixes are compiled (dedented) once per process and registered in
+# PROMPT_TEMPLATES and sent as a system instruction, apart from the user
+# section. A prefix long enough for the provider's context cache
+# (AI_CONTEXT_CACHE_MIN_TOKENS) is cached there instead of billed each call.
+import textwrap
+from dataclasses import dataclass
+from typing import Callable
+
+
+EVENT_SYSTEM_PROMPT = (
+                """
+                You are a skilled activities planner.
 
-                    Given an input JSON describing the event goal, type, date, budget, audience, and atmosphere, generate the following items strictly as a JSON object:
+                Given an input JSON describing the event goal, type, date, budget, audience, and atmosphere, generate the following items strictly as a JSON object:
 
-                    - "name": a list of exactly 5 creative and imaginative event names, each clearly connected to the event's goal, audience, type, and atmosphere.
-                    - "description": a detailed event description as a single string that covers the event's purpose, vibe, and benefits for attendees. Do NOT include or mention any event names in this description.
-                    - "expected_attendees": an integer representing the expected number of attendees.
-                    - "suggested_time": a string specifying the suggested event start and end time in "HH:MM - HH:MM" format.
-                    - "suggested_event_duration": a string describing the duration of the event, e.g. "3 hours".
-                    - "slogan": a list of exactly 5 slogans, each based on the event goal and atmosphere.
+                - "name": a list of exactly 5 creative and imaginative event names, each clearly connected to the event's goal, audience, type, and atmosphere.
+                - "description": a detailed event description as a single string that covers the event's purpose, vibe, and benefits for attendees. Do NOT include or mention any event names in this description.
+                - "expected_attendees": an integer representing the expected number of attendees.
+                - "suggested_time": a string specifying the suggested event start and end time in "HH:MM - HH:MM" format.
+                - "suggested_event_duration": a string describing the duration of the event, e.g. "3 hours".
+                - "slogan": a list of exactly 5 slogans, each based on the event goal and atmosphere.
 
-                    Output ONLY the JSON object exactly in the described structure. Do NOT include any explanations, additional text, or formatting outside the JSON.
+                Output ONLY the JSON object exactly in the described structure. Do NOT include any explanations, additional text, or formatting outside the JSON.
 
-                    """
-                    )
+                """
+                )
 
+def _event_user_prompt(event_data: dict) -> str:
     user_prompt = (
         f"Goal: {event_data.get('goal')}\n"
         f"Type: {event_data.get('type')}\n"
@@ -26,59 +36,59 @@ def get_event_generation_prompt(event_data: dict) -> str:
         f"Audience: {event_data.get('target_audience')}\n"
         f"Atmosphere: {event_data.get('atmosphere')}\n"
     )
+    return user_prompt
 
-    return system_prompt + "\n" + user_prompt
-
-def get_task_assignment_generation_prompt(event_data: dict) -> str:
-    event = event_data.get("event", {})
 
-    system_prompt = (
-        """
-            You are a professional event task planning assistant.
+TASK_ASSIGNMENT_SYSTEM_PROMPT = (
+    """
+        You are a professional event task planning assistant.
 
-            Given event data including event_id, event_name, type, start_time, end_time, expected_attendees, and timeline_type, generate a JSON object recommending event roles and staffing counts.
+        Given event data including event_id, event_name, type, start_time, end_time, expected_attendees, and timeline_type, generate a JSON object recommending event roles and staffing counts.
 
-            - Assign roles based on event type, using these predefined sets:
-            * Workshop / Training: ["facilitator", "assistant", "tech_support", "material_handler", "time_keeper"]
-            * Social / Networking: ["host", "greeter", "logistics", "photographer", "music_dj"]
-            * Performance / Showcase: ["stage_manager", "lighting", "sound_engineer", "usher", "safety_officer"]
-            * Speech / Seminar: ["emcee", "speaker_handler", "registration_staff", "audiovisual_support", "time_keeper"]
-            * Recreational / Entertainment: ["activity_leader", "crowd_control", "logistics", "vendor_liaison", "security"]
-            * Market / Exhibition: ["booth_coordinator", "vendor_helper", "floor_manager", "map_distributor", "ticketing"]
-            * Competition / Challenge: ["referee", "score_keeper", "participant_handler", "tech_support", "logistics"]
+        - Assign roles based on event type, using these predefined sets:
+        * Workshop / Training: ["facilitator", "assistant", "tech_support", "material_handler", "time_keeper"]
+        * Social / Networking: ["host", "greeter", "logistics", "photographer", "music_dj"]
+        * Performance / Showcase: ["stage_manager", "lighting", "sound_engineer", "usher", "safety_officer"]
+        * Speech / Seminar: ["emcee", "speaker_handler", "registration_staff", "audiovisual_support", "time_keeper"]
+        * Recreational / Entertainment: ["activity_leader", "crowd_control", "logistics", "vendor_liaison", "security"]
+        * Market / Exhibition: ["booth_coordinator", "vendor_helper", "floor_manager", "map_distributor", "ticketing"]
+        * Competition / Challenge: ["referee", "score_keeper", "participant_handler", "tech_support", "logistics"]
 
-            - Estimate staff counts based on expected_attendees:
-            * General roles: approximately 1 staff per 50 attendees, rounded sensibly.
-            * Technical and host roles: fixed small counts (1-3 staff).
-            
-            - For each role, assign "start_time" and "end_time" as the event's overall start_time and end_time, indicating the time period each staff member is expected to work.
+        - Estimate staff counts based on expected_attendees:
+        * General roles: approximately 1 staff per 50 attendees, rounded sensibly.
+        * Technical and host roles: fixed small counts (1-3 staff).
+        
+        - For each role, assign "start_time" and "end_time" as the event's overall start_time and end_time, indicating the time period each staff member is expected to work.
 
-            - If the timeline_type is "absolute", use ISO 8601 format for all time fields.
+        - If the timeline_type is "absolute", use ISO 8601 format for all time fields.
 
-            - If start_time is missing, omit all time fields in each role and add a top-level key "note" with value "Start time missing".
+        - If start_time is missing, omit all time fields in each role and add a top-level key "note" with value "Start time missing".
 
-            OUTPUT FORMAT:
+        OUTPUT FORMAT:
 
-            Return exactly one JSON object with the following structure:
+        Return exactly one JSON object with the following structure:
 
+        {
+        "task_summary_by_role": [
             {
-            "task_summary_by_role": [
-                {
-                "role": "<role_code>",
-                "description": "<short English task description>",
-                "count": <integer>,
-                "start_time": "<ISO 8601 timestamp>",  // omit if start_time missing
-                "end_time": "<ISO 8601 timestamp>"     // omit if start_time missing
-                },
-                ...
-            ],
-            "note": "Start time missing"  // include only if start_time is missing
-            }
-
-            Do NOT include any explanations, comments, or text outside this JSON object. Do NOT include JSON comments or invalid JSON syntax.
-
-        """
-        )
+            "role": "<role_code>",
+            "description": "<short English task description>",
+            "count": <integer>,
+            "start_time": "<ISO 8601 timestamp>",  // omit if start_time missing
+            "end_time": "<ISO 8601 timestamp>"     // omit if start_time missing
+            },
+            ...
+        ],
+        "note": "Start time missing"  // include only if start_time is missing
+        }
+
+        Do NOT include any explanations, comments, or text outside this JSON object. Do NOT include JSON comments or invalid JSON syntax.
+
+    """
+    )
+
+def _task_assignment_user_prompt(event_data: dict) -> str:
+    event = event_data.get("event", {})
 
     user_prompt = (
         f"event_name: {event.get('event_name')}\n"
@@ -87,52 +97,51 @@ def get_task_assignment_generation_prompt(event_data: dict) -> str:
         f"end_time: {event.get('end_time')}\n"
         f"expected_attendees: {event.get('expected_attendees')}\n"
     )
-
-    return system_prompt + "\n\n" + user_prompt
-
-def get_venue_suggestion_generation_prompt(event_data: dict) -> str:
+    return user_prompt
+
+
+VENUE_SUGGESTION_SYSTEM_PROMPT =                 """
+                                You are an expert venue recommendation assistant for events.
+
+                                You will receive:
+                                - An event object: name, type, expected attendees, time, budget, and audience.
+                                - A specific user-defined address (center location), search radius (in kilometers), and the location's latitude/longitude.
+
+                                Your task:
+                                1. Suggest up to 5 realistic venues within the radius from the provided coordinates that are suitable for the event.
+                                2. Return results strictly as JSON with a `venue_suggestions` list.
+                                3. Each venue must include:
+                                    - name
+                                    - capacity
+                                    - transportation_score (1 to 5, based on ease of public access)
+                                    - is_outdoor (true/false)
+
+                                Important Notes:
+                                - The venue name must exactly match the official name used on Google Maps to ensure accurate geolocation.
+                                - Avoid abbreviations or alternative names; use the full official venue name as found on Google Maps.
+                                - Prefer real-world, well-known, or publicly accessible venues, and also match event type
+                                - remember to create 5 venues!
+                                - Rental cost and capacity must reflect reality: if no rental service or information is available, leave the rental_cost blank.
+                                - Venue type should match the event type:
+
+                                    | Event Type                     | Suitable Venues Examples                        |
+                                    |-------------------------------|--------------------------------------------------|
+                                    | Workshop / Training           | Classrooms, co-working spaces, meeting rooms    |
+                                    | Social / Networking           | Cafés, lounges, rooftop spaces, bars            |
+                                    | Performance / Showcase        | Theaters, plazas, stages, exhibition centers    |
+                                    | Speech / Seminar              | Auditoriums, conference halls, libraries        |
+                                    | Recreational / Entertainment  | Parks, entertainment venues, amusement areas    |
+                                    | Market / Exhibition           | Exhibition halls, gymnasiums, open plazas       |
+                                    | Competition / Challenge       | Gyms, courts, outdoor spaces, arenas            |
+
+                                - Make sure the venue can realistically accommodate the expected number of attendees.
+                                - Prioritize venues with high transportation access and matching audience profiles.
+                                """
+
+def _venue_suggestion_user_prompt(event_data: dict) -> str:
     event = event_data.get("event", {})
     venue = event_data.get("venue_suggestion", {})
 
-    system_prompt =                 """
-                                    You are an expert venue recommendation assistant for events.
-
-                                    You will receive:
-                                    - An event object: name, type, expected attendees, time, budget, and audience.
-                                    - A specific user-defined address (center location), search radius (in kilometers), and the location's latitude/longitude.
-
-                                    Your task:
-                                    1. Suggest up to 5 realistic venues within the radius from the provided coordinates that are suitable for the event.
-                                    2. Return results strictly as JSON with a `venue_suggestions` list.
-                                    3. Each venue must include:
-                                        - name
-                                        - capacity
-                                        - transportation_score (1 to 5, based on ease of public access)
-                                        - is_outdoor (true/false)
-
-                                    Important Notes:
-                                    - The venue name must exactly match the official name used on Google Maps to ensure accurate geolocation.
-                                    - Avoid abbreviations or alternative names; use the full official venue name as found on Google Maps.
-                                    - Prefer real-world, well-known, or publicly accessible venues, and also match event type
-                                    - remember to create 5 venues!
-                                    - Rental cost and capacity must reflect reality: if no rental service or information is available, leave the rental_cost blank.
-                                    - Venue type should match the event type:
-
-                                        | Event Type                     | Suitable Venues Examples                        |
-                                        |-------------------------------|--------------------------------------------------|
-                                        | Workshop / Training           | Classrooms, co-working spaces, meeting rooms    |
-                                        | Social / Networking           | Cafés, lounges, rooftop spaces, bars            |
-                                        | Performance / Showcase        | Theaters, plazas, stages, exhibition centers    |
-                                        | Speech / Seminar              | Auditoriums, conference halls, libraries        |
-                                        | Recreational / Entertainment  | Parks, entertainment venues, amusement areas    |
-                                        | Market / Exhibition           | Exhibition halls, gymnasiums, open plazas       |
-                                        | Competition / Challenge       | Gyms, courts, outdoor spaces, arenas            |
-
-                                    - Make sure the venue can realistically accommodate the expected number of attendees.
-                                    - Prioritize venues with high transportation access and matching audience profiles.
-                                    """
-
-
     user_prompt = (
         f"Event data:\n"
         f"Name: {event.get('name')}\n"
@@ -145,61 +154,75 @@ def get_venue_suggestion_generation_prompt(event_data: dict) -> str:
         f"User-defined center location: {venue.get('name')}\n"
         f"Search radius: {venue.get('radius_km')} km\n"
     )
+    center = venue.get("center")
+    if center:
+        user_prompt += f"Center coordinates: {center.get('lat')}, {center.get('lon')}\n"
+
+    # Catalogue venues already known to be in range and large enough
+    nearby = venue.get("nearby_venues") or []
+    if nearby:
+        user_prompt += "\nKnown venues within the radius that fit the attendees (prefer these, keep their names exactly):\n"
+        for item in nearby:
+            user_prompt += (
+                f"- {item.get('name')}: capacity {item.get('capacity')}, "
+                f"{'outdoor' if item.get('is_outdoor') else 'indoor'}, "
+                f"transportation {item.get('transportation_score')}/5, {item.get('distance_km')} km away\n"
+            )
+    return user_prompt
+
+
+REGISTRATION_FORM_SYSTEM_PROMPT = """
+                You are a professional event registration form designer.
+
+                Your task is to generate a structured JSON object representing a registration form, based on the provided event information.
+
+                The output JSON object must contain:
+
+                1. "event_intro": A short, engaging summary (maximum 2 sentences) that appears at the top of the form to encourage registration.
+                2. "form_title": A concise, action-oriented title that includes the event name (e.g., "Register for the AI Hackathon!").
+                3. "form_fields": A list of fields that attendees must fill in. Each field is an object with the following keys:
+                - "registration_name": a lowercase English slug using only letters and underscores (e.g., "email", "team_name").
+                - "description": a short, user-facing label (can be in the event’s language).
+                - "type": the input type, such as "text", "email", "number", or "select".
+                - "required": a boolean indicating whether the field is mandatory.
+
+                Field generation rules:
+                - Always include the basic required fields: "first_name", "last_name", and "email".
+                - Infer other relevant fields based on the event_type and target audience.
+                * For team-based events, include "team_name".
+                * For student-focused events, include "school", "major", and "graduation_year".
+                * For outdoor or merchandise-based events, include "tshirt_size".
+                * For food or accessibility-related contexts, include "dietary_preferences" and "accessibility_needs" if applicable.
+
+                Output Rules:
+                - Return **only** a valid JSON object in the following format.
+                - Do NOT include any extra explanation, markdown, comments, or text.
+
+                OUTPUT FORMAT (pure JSON):
 
-    return system_prompt.strip() + "\n\n" + user_prompt.strip()
-
-
-def get_registration_form_generation_prompt(event_data: dict) -> str:
-
-    event = event_data.get("event", {})
-    venue = event_data.get("venue", {})
-
-    system_prompt = """
-                    You are a professional event registration form designer.
-
-                    Your task is to generate a structured JSON object representing a registration form, based on the provided event information.
-
-                    The output JSON object must contain:
-
-                    1. "event_intro": A short, engaging summary (maximum 2 sentences) that appears at the top of the form to encourage registration.
-                    2. "form_title": A concise, action-oriented title that includes the event name (e.g., "Register for the AI Hackathon!").
-                    3. "form_fields": A list of fields that attendees must fill in. Each field is an object with the following keys:
-                    - "registration_name": a lowercase English slug using only letters and underscores (e.g., "email", "team_name").
-                    - "description": a short, user-facing label (can be in the event’s language).
-                    - "type": the input type, such as "text", "email", "number", or "select".
-                    - "required": a boolean indicating whether the field is mandatory.
-
-                    Field generation rules:
-                    - Always include the basic required fields: "first_name", "last_name", and "email".
-                    - Infer other relevant fields based on the event_type and target audience.
-                    * For team-based events, include "team_name".
-                    * For student-focused events, include "school", "major", and "graduation_year".
-                    * For outdoor or merchandise-based events, include "tshirt_size".
-                    * For food or accessibility-related contexts, include "dietary_preferences" and "accessibility_needs" if applicable.
-
-                    Output Rules:
-                    - Return **only** a valid JSON object in the following format.
-                    - Do NOT include any extra explanation, markdown, comments, or text.
-
-                    OUTPUT FORMAT (pure JSON):
-
+                {
+                "registration-list": [
                     {
-                    "registration-list": [
+                    "event_intro": "string",
+                    "form_title": "string",
+                    "form_fields": [
                         {
-                        "event_intro": "string",
-                        "form_title": "string",
-                        "form_fields": [
-                            {
-                            "registration_name": "string",
-                            "description": "string"
-                            },
-                            ...
-                        ]
-                        }
+                        "registration_name": "string",
+                        "description": "string",
+                        "type": "string",
+                        "required": true
+                        },
+                        ...
                     ]
                     }
-                    """
+                ]
+                }
+                """
+
+def _registration_form_user_prompt(event_data: dict) -> str:
 
+    event = event_data.get("event", {})
+    venue = event_data.get("venue", {})
 
     user_prompt = (
 
@@ -214,58 +237,52 @@ def get_registration_form_generation_prompt(event_data: dict) -> str:
         f"event_address_name: {venue.get('name')}\n"
         f"event_address: {venue.get('address')}\n"
     )
+    return user_prompt
+
+
+INVITATION_SYSTEM_PROMPT = """
+                You are an expert email invitation writer.
+                Your task is to generate a personalized, emotionally compelling invitation email subject and body for each recipient.
+
+                Input includes:
+                - Event information: event_name, event_description, event_slogan, event_type, event_start_time, event_end_time, event_location, event_address, event_registration_link
+                - A list of recipients, each with their name
+                - Writing constraints: words_limit, tone, and language
+
+                Your Goal:
+                - For each recipient, write:
+                • An engaging subject line.
+                • A personalized email body with their name.
+                - The body must clearly explain what the event is, why it matters, when and where it happens.
+                - Use the event slogan creatively within the message if provided.
+                - Include the registration link in the email body in a natural way.
+                - Match the specified tone (e.g., Formal, Semi-formal, Friendly, Casual, Persuasive).
+                - Write in the given language.
+                - Keep the email body within the specified words_limit.
+                - The email must:
+                • Begin with a greeting using the recipient's name.
+                • End with a signature from the Event Organizer or event team.
+                - Do NOT include any markdown, HTML, bullet points, or explanations — plain text only.
+
+                OUTPUT FORMAT (always JSON):
+                {
+                "invitation_list": [
+                    {
+                    "invitation_letter_subject": "string",
+                    "invitation_letter_body": "string"
+                    },
+                    ... (one per recipient)
+                ]
+                }
+                """
 
-
-    return system_prompt + "\n\n" + user_prompt
-
-
-def get_invitation_generation_prompt(event_data: dict) -> str:
+def _invitation_user_prompt(event_data: dict) -> str:
 
     event = event_data.get("event", {})
     venue = event_data.get("venue", {})
     invitation = event_data.get("invitation", {})
     registration = event_data.get("registration", {})
 
-
-    system_prompt = """
-                    You are an expert email invitation writer.
-                    Your task is to generate a personalized, emotionally compelling invitation email subject and body for each recipient.
-
-                    Input includes:
-                    - Event information: event_name, event_description, event_slogan, event_type, event_start_time, event_end_time, event_location, event_address, event_registration_link
-                    - A list of recipients, each with their name
-                    - Writing constraints: words_limit, tone, and language
-
-                    Your Goal:
-                    - For each recipient, write:
-                    • An engaging subject line.
-                    • A personalized email body with their name.
-                    - The body must clearly explain what the event is, why it matters, when and where it happens.
-                    - Use the event slogan creatively within the message if provided.
-                    - Include the registration link in the email body in a natural way.
-                    - Match the specified tone (e.g., Formal, Semi-formal, Friendly, Casual, Persuasive).
-                    - Write in the given language.
-                    - Keep the email body within the specified words_limit.
-                    - The email must:
-                    • Begin with a greeting using the recipient's name.
-                    • End with a signature from the Event Organizer or event team.
-                    - Do NOT include any markdown, HTML, bullet points, or explanations — plain text only.
-
-                    OUTPUT FORMAT (always JSON):
-                    {
-                    "invitation_list": [
-                        {
-                        "invitation_letter_subject": "string",
-                        "invitation_letter_body": "string"
-                        },
-                        ... (one per recipient)
-                    ]
-                    }
-                    """
-
-
-
-
     user_prompt = (
 
         f"event_name: {event.get('event_name')}\n"
@@ -281,63 +298,58 @@ def get_invitation_generation_prompt(event_data: dict) -> str:
         f"words_limit: {invitation.get('words_limit')}\n"
         f"tone: {invitation.get('tone')}\n"
         f"language: {invitation.get('language')}\n"
-        
 
     )
+    return user_prompt
+
+
+SOCIAL_POST_SYSTEM_PROMPT = """
+                You are a professional social media copywriting assistant.
+
+                Your task is to generate creative, engaging, and platform-tailored social media posts based on the provided event details and content strategy preferences.
+
+                You must strictly follow these rules:
+
+                FORMAT:
+                - Return a JSON object: { "post_list": [...] }
+                - Each item in "post_list" must be an object with:
+                - "content": A full social media caption. It must:
+                    • Include essential event details (event name, date/time, location, and registration link).
+                    • Start with a compelling hook based on the provided hook_type.
+                    • Match the given tone and platform style.
+                    • End with a clear call to action.
+                - "hashtag": A list of 3-6 custom, relevant hashtags that reflect the event's theme, location, and target audience.
+                    • Avoid generic or unrelated trending tags.
+
+                STYLE RULES:
+                - Match tone and writing style to the platform (e.g., Instagram: informal, Facebook: conversational, LinkedIn: professional).
+                - If include_emoji is true, use emojis based on emoji_level:
+                • low: 1-2 emojis max, sparing use.
+                • medium: 3-5 emojis, balanced and expressive.
+                • high: 6-8 max, energetic but not chaotic.
+                - Incorporate provided power_words and hashtag_seeds creatively and naturally.
+                - Each post must be unique — avoid rephrased duplicates.
+                - Keep each post within the specified words_limit.
+                - Write in the specified language.
+                - Do NOT use markdown, HTML, or explanations. Return only the JSON object.
+
+                EXAMPLE OUTPUT:
+                {
+                "post_list": [
+                    {
+                    "content": "🚀 Ready to unleash your AI potential? Join the AI Hackathon on July 20th at National Taiwan University! 24 hours of coding, creativity, and innovation await. Sign up now 👉 https://example.com/hackathon",
+                    "hashtag": ["#AIHackathon", "#CreativeChallenge", "#NTU", "#Hackathon2025"]
+                    }
+                ]
+                }
+                """
 
-
-    return system_prompt + "\n\n" + user_prompt
-
-
-def get_social_post_generation_prompt(event_data: dict) -> str:
+def _social_post_user_prompt(event_data: dict) -> str:
 
     event = event_data.get("event", {})
     venue = event_data.get("venue", {})
     registration = event_data.get("registration", {})
     social_post = event_data.get("social_post", {})
-    
-
-
-    system_prompt = """
-                    You are a professional social media copywriting assistant.
-
-                    Your task is to generate creative, engaging, and platform-tailored social media posts based on the provided event details and content strategy preferences.
-
-                    You must strictly follow these rules:
-
-                    FORMAT:
-                    - Return a JSON object: { "post_list": [...] }
-                    - Each item in "post_list" must be an object with:
-                    - "content": A full social media caption. It must:
-                        • Include essential event details (event name, date/time, location, and registration link).
-                        • Start with a compelling hook based on the provided hook_type.
-                        • Match the given tone and platform style.
-                        • End with a clear call to action.
-                    - "hashtag": A list of 3-6 custom, relevant hashtags that reflect the event's theme, location, and target audience.
-                        • Avoid generic or unrelated trending tags.
-
-                    STYLE RULES:
-                    - Match tone and writing style to the platform (e.g., Instagram: informal, Facebook: conversational, LinkedIn: professional).
-                    - If include_emoji is true, use emojis based on emoji_level:
-                    • low: 1-2 emojis max, sparing use.
-                    • medium: 3-5 emojis, balanced and expressive.
-                    • high: 6-8 max, energetic but not chaotic.
-                    - Incorporate provided power_words and hashtag_seeds creatively and naturally.
-                    - Each post must be unique — avoid rephrased duplicates.
-                    - Keep each post within the specified words_limit.
-                    - Write in the specified language.
-                    - Do NOT use markdown, HTML, or explanations. Return only the JSON object.
-
-                    EXAMPLE OUTPUT:
-                    {
-                    "post_list": [
-                        {
-                        "content": "🚀 Ready to unleash your AI potential? Join the AI Hackathon on July 20th at National Taiwan University! 24 hours of coding, creativity, and innovation await. Sign up now 👉 https://example.com/hackathon",
-                        "hashtag": ["#AIHackathon", "#CreativeChallenge", "#NTU", "#Hackathon2025"]
-                        }
-                    ]
-                    }
-                    """
 
     user_prompt = (
 
@@ -360,68 +372,64 @@ def get_social_post_generation_prompt(event_data: dict) -> str:
         f"power_words: {social_post.get('power_words')}\n"
         f"hashtag_seeds: {social_post.get('hashtag_seeds')}\n"
         f"language: {social_post.get('language')}\n"
-        
 
     )
-
-
-    return system_prompt + "\n\n" + user_prompt
-
-
-def get_poster_copy_generation_prompt(event_data: dict) -> str:
+    return user_prompt
+
+
+POSTER_COPY_SYSTEM_PROMPT = (
+    "You are a professional marketing copywriter for posters. Your goal is to generate engaging and polished text.\n"
+    "Output must be a valid JSON object like: {\"headline\": \"...\", \"subheadline\": \"...\"}\n"
+    "Instructions:\n"
+    "- Headline: short, bold, emotional, no more than 8 words\n"
+    "- Subheadline: one sentence only, clear and under 100 characters\n"
+    "- Language: MUST match the event language precisely (e.g., Traditional Chinese if requested)\n"
+    "- Avoid generic or vague expressions like 'Join us today!'\n"
+    "- Do NOT use emojis, hashtags, or filler words\n"
+    "- Subheadline must add information beyond the headline"
+)
+
+def _poster_copy_user_prompt(event_data: dict) -> str:
     event = event_data.get("event", {})
     poster = event_data.get("poster", {})
 
-    system_prompt = (
-        "You are a professional marketing copywriter for posters. Your goal is to generate engaging and polished text.\n"
-        "Output must be a valid JSON object like: {\"headline\": \"...\", \"subheadline\": \"...\"}\n"
-        "Instructions:\n"
-        "- Headline: short, bold, emotional, no more than 8 words\n"
-        "- Subheadline: one sentence only, clear and under 100 characters\n"
-        "- Language: MUST match the event language precisely (e.g., Traditional Chinese if requested)\n"
-        "- Avoid generic or vague expressions like 'Join us today!'\n"
-        "- Do NOT use emojis, hashtags, or filler words\n"
-        "- Subheadline must add information beyond the headline"
-    )
-
-
     user_prompt = (
         f"Event name: {event.get('event_name')}\n"
         f"Description: {event.get('event_description')}\n"
         f"Event type: {event.get('event_type')}\n"
         f"Slogan: {event.get('event_slogan')}\n"
         f"Audience: {event.get('target_audience')}\n"
+        f"Tone: {poster.get('tone')}\n"
         f"language: {poster.get('language')}\n"
     )
-
-    return system_prompt + "\n\n" + user_prompt
-
-def get_poster_image_prompt(event_data: dict) -> str:
+    return user_prompt
+
+
+POSTER_IMAGE_SYSTEM_PROMPT = (
+    "You are a visual AI agent specialized in creating poster images that combine "
+    "both text and background visuals in a harmonious way.\n"
+    "Generate a poster image as a PNG that includes the following text elements clearly and aesthetically:\n"
+    "- Event headline\n"
+    "- Event subheadline\n"
+    "- Event start and end time\n"
+    "- Event location\n"
+    "Leave a blank space in the bottom-right corner reserved for a QR code.\n\n"
+    "Use the following style guidelines to design the poster:\n"
+    "- Mood: match the tone of the event\n"
+    "- Color scheme: use the specified colors\n"
+    "- Layout style: follow the given layout style\n"
+    "- Font style: apply the given font style\n\n"
+    "Base64-encode the resulting PNG image.\n"
+    "Return ONLY a JSON object exactly in this format:\n"
+    "{\"image_base64\": \"<base64_encoded_png_image>\"}"
+)
+
+def _poster_image_user_prompt(event_data: dict) -> str:
     event = event_data.get("event", {})
     venue = event_data.get("venue", {})
     poster = event_data.get("poster", {})
     poster_text = event_data.get("poster_text", {})
 
-    system_prompt = (
-        "You are a visual AI agent specialized in creating poster images that combine "
-        "both text and background visuals in a harmonious way.\n"
-        "Generate a poster image as a PNG that includes the following text elements clearly and aesthetically:\n"
-        "- Event headline\n"
-        "- Event subheadline\n"
-        "- Event start and end time\n"
-        "- Event location\n"
-        "Leave a blank space in the bottom-right corner reserved for a QR code.\n\n"
-        "Use the following style guidelines to design the poster:\n"
-        "- Mood: match the tone of the event\n"
-        "- Color scheme: use the specified colors\n"
-        "- Layout style: follow the given layout style\n"
-        "- Font style: apply the given font style\n\n"
-        "Base64-encode the resulting PNG image.\n"
-        "Return ONLY a JSON object exactly in this format:\n"
-        "{\"image_base64\": \"<base64_encoded_png_image>\"}"
-    )
-
-
     user_prompt = (
         f"Headline (for reference): {poster_text.get('headline')}\n"
         f"Subheadline (for reference): {poster_text.get('subheadline')}\n"
@@ -436,5 +444,95 @@ def get_poster_image_prompt(event_data: dict) -> str:
         f"Address: {venue.get('address')}\n"
         "Focus on a harmonious visual design that supports text overlay."
     )
+    return user_prompt
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    kind: str
+    system: str
+    user: Callable[[dict], str]
+
+    def render(self, event_data: dict) -> str:
+        # Full prompt text, for providers without a system instruction
+        return self.system + "\n\n" + self.user(event_data).strip()
+
+
+def _compile(kind, system_prompt, user_prompt):
+    return PromptTemplate(kind=kind, system=textwrap.dedent(system_prompt).strip(), user=user_prompt)
+
+
+# candidates=N: the same task, answered with N variants in one response
+SOCIAL_POST_CANDIDATES_RULES = (
+    "CANDIDATES:\n"
+    "- Instead of \"post_list\", return { \"candidates\": [...] } with exactly as many posts as the \"candidates\" line asks for.\n"
+    "- Each candidate has the same \"content\" and \"hashtag\" fields as a post.\n"
+    "- Vary the hook, structure and wording between candidates."
+)
+
+POSTER_COPY_CANDIDATES_RULES = (
+    "Candidates:\n"
+    "- Instead of a single object, return {\"candidates\": [{\"headline\": \"...\", \"subheadline\": \"...\"}, ...]}\n"
+    "- Write exactly as many candidates as the \"candidates\" line asks for, each clearly different from the others"
+)
+
+def _candidates_user_prompt(user_prompt):
+    def prompt(event_data: dict) -> str:
+        text = user_prompt(event_data) + f"candidates: {event_data.get('candidates', 3)}\n"
+        if event_data.get("variant") is not None:
+            # Separate calls per candidate: keep their prompts (and answers) apart
+            text += f"variant: {event_data['variant']}\n"
+        return text
+    return prompt
+
+def _compile_candidates(base: PromptTemplate, rules: str):
+    return PromptTemplate(kind=f"{base.kind}_candidates", system=base.system + "\n\n" + rules,
+                          user=_candidates_user_prompt(base.user))
+
+
+# Prompt kind -> template
+PROMPT_TEMPLATES = {
+    template.kind: template
+    for template in (
+        _compile("event", EVENT_SYSTEM_PROMPT, _event_user_prompt),
+        _compile("task_assignment", TASK_ASSIGNMENT_SYSTEM_PROMPT, _task_assignment_user_prompt),
+        _compile("venue_suggestion", VENUE_SUGGESTION_SYSTEM_PROMPT, _venue_suggestion_user_prompt),
+        _compile("registration_form", REGISTRATION_FORM_SYSTEM_PROMPT, _registration_form_user_prompt),
+        _compile("invitation", INVITATION_SYSTEM_PROMPT, _invitation_user_prompt),
+        _compile("social_post", SOCIAL_POST_SYSTEM_PROMPT, _social_post_user_prompt),
+        _compile("poster_copy", POSTER_COPY_SYSTEM_PROMPT, _poster_copy_user_prompt),
+        _compile("poster_image", POSTER_IMAGE_SYSTEM_PROMPT, _poster_image_user_prompt),
+    )
+}
+PROMPT_TEMPLATES["social_post_candidates"] = _compile_candidates(
+    PROMPT_TEMPLATES["social_post"], SOCIAL_POST_CANDIDATES_RULES
+)
+PROMPT_TEMPLATES["poster_copy_candidates"] = _compile_candidates(
+    PROMPT_TEMPLATES["poster_copy"], POSTER_COPY_CANDIDATES_RULES
+)
+
+
+#Functions contains system prompt and user prompt
+def get_event_generation_prompt(event_data: dict) -> str:
+    return PROMPT_TEMPLATES["event"].render(event_data)
+
+def get_task_assignment_generation_prompt(event_data: dict) -> str:
+    return PROMPT_TEMPLATES["task_assignment"].render(event_data)
+
+def get_venue_suggestion_generation_prompt(event_data: dict) -> str:
+    return PROMPT_TEMPLATES["venue_suggestion"].render(event_data)
+
+def get_registration_form_generation_prompt(event_data: dict) -> str:
+    return PROMPT_TEMPLATES["registration_form"].render(event_data)
+
+def get_invitation_generation_prompt(event_data: dict) -> str:
+    return PROMPT_TEMPLATES["invitation"].render(event_data)
+
+def get_social_post_generation_prompt(event_data: dict) -> str:
+    return PROMPT_TEMPLATES["social_post"].render(event_data)
 
-    return system_prompt + "\n\n" + user_prompt
+def get_poster_copy_generation_prompt(event_data: dict) -> str:
+    return PROMPT_TEMPLATES["poster_copy"].render(event_data)
+
+def get_poster_image_prompt(event_data: dict) -> str:
+    return PROMPT_TEMPLATES["poster_image"].render(event_data)
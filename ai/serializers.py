@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from ai.models import GenerationJob
 
 class EventPreferenceSerializer(serializers.Serializer):
     type = serializers.CharField(max_length=255)
@@ -13,4 +14,13 @@ class InvitationRequestSerializer(serializers.Serializer):
     recipient_email = serializers.EmailField()
     words_limit = serializers.IntegerField()
     tone = serializers.CharField()
-    language = serializers.CharField()
\ No newline at end of file
+    language = serializers.CharField()
+class GenerationJobSerializer(serializers.ModelSerializer):
+    job_id = serializers.UUIDField(source="id", read_only=True)
+
+    class Meta:
+        model = GenerationJob
+        fields = [
+            'job_id', 'endpoint', 'event_id', 'status', 'http_status', 'result', 'error',
+            'attempts', 'created_at', 'started_at', 'finished_at',
+        ]
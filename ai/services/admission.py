@@ -0,0 +1,194 @@
+# Admission control for the /ai/generate-* endpoints.
+# Every request costs tokens, summed over the prompt kinds it generates
+# (AI_ADMISSION_COSTS, so a poster image costs far more than a headline).
+# Two token buckets live in the TokenBucket table, shared by every worker:
+# one per user, checked first and rejected with 429 + Retry-After when empty,
+# and a global one that protects provider capacity. Requests waiting for the
+# global bucket queue in a per-process fair scheduler that serves users
+# round-robin, so a user with many queued requests cannot starve the others.
+# When the TokenBucket table is unavailable, requests are admitted if
+# AI_ADMISSION_FAIL_OPEN is set and told to retry later otherwise.
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+from ai.models import TokenBucket
+from ai.services import metrics
+
+logger = logging.getLogger(__name__)
+
+# Seconds to retry after when the buckets are unavailable and admission fails closed
+UNAVAILABLE_RETRY = 5.0
+
+
+class Throttled(Exception):
+    status_code = 429
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+def _enabled():
+    return getattr(settings, "AI_ADMISSION_ENABLED", True)
+
+
+def get_cost(prompt_kinds) -> float:
+    costs = getattr(settings, "AI_ADMISSION_COSTS", {})
+    default = getattr(settings, "AI_ADMISSION_DEFAULT_COST", 1)
+    return float(sum(costs.get(kind, default) for kind in prompt_kinds))
+
+
+def _limits(scope):
+    if scope == "user":
+        return (getattr(settings, "AI_ADMISSION_USER_RATE", 0.2),
+                getattr(settings, "AI_ADMISSION_USER_BURST", 30))
+    return (getattr(settings, "AI_ADMISSION_GLOBAL_RATE", 5),
+            getattr(settings, "AI_ADMISSION_GLOBAL_BURST", 100))
+
+
+def take(key, cost, rate, burst) -> float:
+    """
+    Take cost tokens from the bucket. Returns 0 when they were taken, else
+    the seconds until the bucket holds enough (nothing is taken then).
+    """
+    # A request costing more than the burst would never fit
+    cost = min(cost, burst)
+    try:
+        with transaction.atomic():
+            now = timezone.now()
+            bucket, _ = TokenBucket.objects.select_for_update().get_or_create(
+                key=key, defaults={"tokens": burst, "updated_at": now}
+            )
+            elapsed = max(0.0, (now - bucket.updated_at).total_seconds())
+            tokens = min(burst, bucket.tokens + elapsed * rate)
+            wait = 0.0
+            if tokens >= cost:
+                tokens -= cost
+            else:
+                wait = (cost - tokens) / rate
+            TokenBucket.objects.filter(id=bucket.id).update(tokens=tokens, updated_at=now)
+            return wait
+    except DatabaseError:
+        if getattr(settings, "AI_ADMISSION_FAIL_OPEN", True):
+            logger.exception("Token bucket %s unavailable, admitting request", key)
+            return 0.0
+        logger.exception("Token bucket %s unavailable, rejecting request", key)
+        return UNAVAILABLE_RETRY
+
+
+def give_back(key, cost, burst):
+    try:
+        with transaction.atomic():
+            bucket = TokenBucket.objects.select_for_update().filter(key=key).first()
+            if bucket is not None:
+                bucket.tokens = min(burst, bucket.tokens + cost)
+                bucket.save(update_fields=["tokens"])
+    except DatabaseError:
+        logger.exception("Refunding token bucket %s failed", key)
+
+
+class FairScheduler:
+    # Waiting room for the global bucket: users take turns, each user's own
+    # requests are served in arrival order
+    def __init__(self):
+        self._waiting = OrderedDict()
+        self._cond = threading.Condition()
+
+    def _is_head(self, user_key, ticket):
+        first_user = next(iter(self._waiting))
+        return first_user == user_key and self._waiting[user_key][0] is ticket
+
+    def _leave(self, user_key, ticket, served):
+        queue = self._waiting[user_key]
+        queue.remove(ticket)
+        if not queue:
+            del self._waiting[user_key]
+        elif served:
+            # Next turn goes to the other users first
+            self._waiting.move_to_end(user_key)
+        metrics.set_gauge("ai_admission_queue_depth", sum(len(q) for q in self._waiting.values()))
+        self._cond.notify_all()
+
+    def acquire(self, user_key, cost, timeout):
+        rate, burst = _limits("global")
+        ticket = object()
+        started = time.monotonic()
+        give_up_at = started + timeout
+        retry_after = None
+
+        with self._cond:
+            self._waiting.setdefault(user_key, deque()).append(ticket)
+            metrics.set_gauge("ai_admission_queue_depth", sum(len(q) for q in self._waiting.values()))
+
+        served = False
+        try:
+            while True:
+                with self._cond:
+                    remaining = give_up_at - time.monotonic()
+                    while remaining > 0 and not self._is_head(user_key, ticket):
+                        self._cond.wait(min(remaining, 1.0))
+                        remaining = give_up_at - time.monotonic()
+                    if remaining <= 0:
+                        raise Throttled("Generation capacity is exhausted, try again later",
+                                        retry_after or cost / rate)
+
+                # Only the head gets here; the bucket (a row lock in the database)
+                # is taken without holding up the other waiting threads
+                retry_after = take("global", cost, rate, burst)
+                if not retry_after:
+                    served = True
+                    metrics.observe("ai_admission_wait_ms", (time.monotonic() - started) * 1000)
+                    return
+
+                # Other workers refill and drain the same bucket, so poll it
+                time.sleep(max(0.0, min(give_up_at - time.monotonic(), retry_after, 1.0)))
+        finally:
+            with self._cond:
+                self._leave(user_key, ticket, served)
+
+
+_scheduler = FairScheduler()
+
+
+def reserve(user_id, prompt_kinds):
+    # Per-user bucket; raises Throttled when the user is over their rate
+    if not _enabled():
+        return
+    rate, burst = _limits("user")
+    retry_after = take(f"user:{user_id}", get_cost(prompt_kinds), rate, burst)
+    if retry_after:
+        metrics.incr("ai_admission_total", scope="user", outcome="rejected")
+        raise Throttled("Too many generation requests, try again later", retry_after)
+    metrics.incr("ai_admission_total", scope="user", outcome="admitted")
+
+
+def acquire(user_id, prompt_kinds, timeout=None):
+    # Global bucket, waiting up to timeout seconds for a fair turn
+    if not _enabled():
+        return
+    if timeout is None:
+        timeout = getattr(settings, "AI_ADMISSION_MAX_WAIT", 10)
+    try:
+        _scheduler.acquire(f"user:{user_id}", get_cost(prompt_kinds), timeout)
+    except Throttled:
+        metrics.incr("ai_admission_total", scope="global", outcome="rejected")
+        raise
+    metrics.incr("ai_admission_total", scope="global", outcome="admitted")
+
+
+def admit(user_id, prompt_kinds, timeout=None):
+    # Both buckets, for a request that runs right away
+    reserve(user_id, prompt_kinds)
+    try:
+        acquire(user_id, prompt_kinds, timeout)
+    except Throttled:
+        # The request did not run, so it does not count against the user
+        give_back(f"user:{user_id}", get_cost(prompt_kinds), _limits("user")[1])
+        raise
@@ -0,0 +1,145 @@
+# Content-addressed LLM response cache.
+# Tier 1 is an in-process LRU, tier 2 is the LLMResponseCache table shared by
+# every worker. Keys are sha256(prompt text + model name + generation config).
+import copy
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.db.models import F
+from django.utils import timezone
+
+from ai.models import LLMResponseCache
+from ai.services import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class LRUCache:
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at <= time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (time.time() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                metrics.incr("ai_cache_evictions_total", tier="local")
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def __len__(self):
+        return len(self._data)
+
+
+_local = LRUCache(getattr(settings, "AI_CACHE_LOCAL_MAX_ENTRIES", 512))
+_writes = 0
+_writes_lock = threading.Lock()
+
+
+def make_key(prompt: str, model: str, generation_config=None) -> str:
+    digest = hashlib.sha256()
+    digest.update(prompt.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(model.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(json.dumps(generation_config or {}, sort_keys=True, default=str).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def get_ttl(prompt_kind: str) -> int:
+    ttls = getattr(settings, "AI_CACHE_TTLS", {})
+    return ttls.get(prompt_kind, getattr(settings, "AI_CACHE_DEFAULT_TTL", 3600))
+
+
+def lookup(key: str, prompt_kind: str):
+    value = _local.get(key)
+    if value is not None:
+        metrics.incr("ai_cache_hits_total", kind=prompt_kind, tier="local")
+        return copy.deepcopy(value)
+
+    try:
+        entry = LLMResponseCache.objects.filter(key=key, expires_at__gt=timezone.now()).first()
+        if entry is not None:
+            LLMResponseCache.objects.filter(pk=entry.pk).update(
+                hit_count=F("hit_count") + 1, last_hit_at=timezone.now()
+            )
+    except DatabaseError:
+        logger.exception("LLM cache lookup failed")
+        entry = None
+
+    if entry is None:
+        metrics.incr("ai_cache_misses_total", kind=prompt_kind)
+        return None
+
+    remaining = (entry.expires_at - timezone.now()).total_seconds()
+    _local.set(key, entry.response, remaining)
+    metrics.incr("ai_cache_hits_total", kind=prompt_kind, tier="db")
+    return copy.deepcopy(entry.response)
+
+
+def store(key: str, prompt_kind: str, model: str, value, ttl=None):
+    ttl = get_ttl(prompt_kind) if ttl is None else ttl
+    if ttl <= 0:
+        return
+
+    value = copy.deepcopy(value)
+    _local.set(key, value, ttl)
+
+    try:
+        LLMResponseCache.objects.update_or_create(
+            key=key,
+            defaults={
+                "prompt_kind": prompt_kind,
+                "model": model,
+                "response": value,
+                "expires_at": timezone.now() + timedelta(seconds=ttl),
+            },
+        )
+        _maybe_prune()
+    except DatabaseError:
+        logger.exception("LLM cache write failed")
+
+
+def _maybe_prune():
+    # Bound the shared tier: drop expired rows, then the least recently used
+    global _writes
+    with _writes_lock:
+        _writes += 1
+        if _writes % getattr(settings, "AI_CACHE_PRUNE_EVERY", 50):
+            return
+
+    LLMResponseCache.objects.filter(expires_at__lte=timezone.now()).delete()
+
+    max_entries = getattr(settings, "AI_CACHE_DB_MAX_ENTRIES", 10000)
+    overflow = LLMResponseCache.objects.count() - max_entries
+    if overflow > 0:
+        stale_ids = list(
+            LLMResponseCache.objects.order_by(F("last_hit_at").asc(nulls_first=True), "created_at")
+            .values_list("id", flat=True)[:overflow]
+        )
+        LLMResponseCache.objects.filter(id__in=stale_ids).delete()
+        metrics.incr("ai_cache_evictions_total", overflow, tier="db")
@@ -0,0 +1,227 @@
+# Multi-candidate generation (candidates=N on social posts and poster copy).
+# N variants are requested in one model call (or N parallel calls with
+# AI_CANDIDATES_MODE = "parallel"), scored locally with cheap heuristics and
+# returned best first. Every candidate is stored as a GenerationCandidate, so
+# "another" is served from the unserved ones instead of a new request.
+import contextvars
+import hashlib
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from ai.models import GenerationCandidate
+from ai.services import metrics
+from ai.services.services import generate_json
+
+EMOJI = re.compile("[\U0001F1E6-\U0001F1FF\U0001F300-\U0001FAFF\u2600-\u27BF]")
+CJK = re.compile(r"[\u4e00-\u9fff]")
+KANA = re.compile(r"[\u3040-\u30ff]")
+HANGUL = re.compile(r"[\uac00-\ud7af]")
+LATIN = re.compile(r"[A-Za-z]")
+# CJK characters count as one word each
+WORD = re.compile(r"[\u3040-\u30ff\u4e00-\u9fff\uac00-\ud7af]|[^\W\u3040-\u30ff\u4e00-\u9fff\uac00-\ud7af]+")
+
+# emoji_level -> allowed number of emojis, as in the social post prompt
+EMOJI_RANGES = {"low": (1, 2), "medium": (3, 5), "high": (6, 8)}
+
+# Check -> weight subtracted from the score when it fails
+WEIGHTS = {"language": 0.4, "length": 0.3, "emoji": 0.15, "hashtags": 0.15}
+
+
+def input_hash(prompt_kind: str, payload: dict) -> str:
+    raw = json.dumps([prompt_kind, payload], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def get_count(value) -> int:
+    # Requested number of candidates, clamped to 1..AI_CANDIDATES_MAX
+    try:
+        count = int(value)
+    except (TypeError, ValueError):
+        return 1
+    return max(1, min(count, getattr(settings, "AI_CANDIDATES_MAX", 5)))
+
+
+def _matches_language(text: str, language: str) -> bool:
+    letters = "".join(ch for ch in text if ch.isalpha())
+    language = (language or "").lower()
+    if not letters or not language:
+        return True
+
+    def share(pattern):
+        return len(pattern.findall(letters)) / len(letters)
+
+    if language.startswith("zh") or "chinese" in language or "\u4e2d\u6587" in language:
+        return share(CJK) >= 0.3
+    if language.startswith("ja") or "japanese" in language:
+        return share(KANA) + share(CJK) >= 0.3
+    if language.startswith("ko") or "korean" in language:
+        return share(HANGUL) >= 0.3
+    if language.startswith("en") or "english" in language:
+        return share(LATIN) >= 0.7
+    return True
+
+
+def _words(text: str) -> int:
+    return len(WORD.findall(text))
+
+
+def _social_post_checks(candidate, options) -> dict:
+    content = candidate.get("content", "")
+    hashtags = candidate.get("hashtag") or []
+    checks = {"language": _matches_language(content, options.get("language"))}
+
+    try:
+        checks["length"] = _words(content) <= int(options.get("words_limit"))
+    except (TypeError, ValueError):
+        checks["length"] = True
+
+    emojis = len(EMOJI.findall(content))
+    if str(options.get("include_emoji", "")).lower() in ("false", "0", "no"):
+        checks["emoji"] = emojis == 0
+    elif options.get("emoji_level") in EMOJI_RANGES:
+        low, high = EMOJI_RANGES[options["emoji_level"]]
+        checks["emoji"] = low <= emojis <= high
+
+    checks["hashtags"] = 3 <= len(hashtags) <= 6 and all(str(tag).startswith("#") for tag in hashtags)
+    return checks
+
+
+def _poster_copy_checks(candidate, options) -> dict:
+    headline = candidate.get("headline", "")
+    subheadline = candidate.get("subheadline", "")
+    text = f"{headline} {subheadline}"
+    return {
+        "language": _matches_language(text, options.get("language")),
+        "length": _words(headline) <= 8 and len(subheadline) < 100,
+        # The poster prompt forbids both
+        "emoji": not EMOJI.search(text),
+        "hashtags": "#" not in text,
+    }
+
+
+CHECKS = {
+    "social_post": (_social_post_checks, "social_post"),
+    "poster_copy": (_poster_copy_checks, "poster"),
+}
+
+
+def score(prompt_kind: str, candidate: dict, payload: dict):
+    # Returns (score between 0 and 1, {check: passed})
+    check, options_key = CHECKS[prompt_kind]
+    checks = check(candidate, payload.get(options_key, {}))
+    penalty = sum(WEIGHTS[name] for name, passed in checks.items() if not passed)
+    return round(max(0.0, 1.0 - penalty), 3), checks
+
+
+def rank(prompt_kind: str, candidates: list, payload: dict) -> list:
+    scored = []
+    for candidate in candidates:
+        value, checks = score(prompt_kind, candidate, payload)
+        scored.append({"content": candidate, "score": value, "checks": checks})
+    # Stable: the model's own order breaks ties
+    return sorted(scored, key=lambda item: -item["score"])
+
+
+def _generate_variants(prompt_kind: str, payload: dict, count: int, **options) -> list:
+    kind = f"{prompt_kind}_candidates"
+    if getattr(settings, "AI_CANDIDATES_MODE", "single_call") != "parallel":
+        return generate_json(kind, dict(payload, candidates=count), **options)["candidates"]
+
+    def generate_one(idx):
+        try:
+            return generate_json(kind, dict(payload, candidates=1, variant=idx), **options)["candidates"]
+        finally:
+            close_old_connections()
+
+    # One call per candidate; each thread runs in a copy of this context
+    # so it keeps the deadline and lane of the request
+    with ThreadPoolExecutor(max_workers=count, thread_name_prefix="ai-candidates") as executor:
+        futures = [executor.submit(contextvars.copy_context().run, generate_one, idx) for idx in range(count)]
+        return [item for future in futures for item in future.result()]
+
+
+def generate(prompt_kind: str, event_id, payload: dict, count: int, **options) -> list:
+    """
+    Generate, rank and store count candidates. Returns them best first as
+    {"candidate_id", "content", "score", "checks"}; the best one is marked
+    as served.
+    """
+    ranked = rank(prompt_kind, _generate_variants(prompt_kind, payload, count, **options), payload)[:count]
+    digest = input_hash(prompt_kind, payload)
+
+    with transaction.atomic():
+        # Candidates of an older input can no longer be served
+        GenerationCandidate.objects.filter(event_id=event_id, prompt_kind=prompt_kind) \
+            .exclude(input_hash=digest).delete()
+        for idx, item in enumerate(ranked):
+            saved = GenerationCandidate.objects.create(
+                event_id=event_id,
+                prompt_kind=prompt_kind,
+                input_hash=digest,
+                content=item["content"],
+                score=item["score"],
+                checks=item["checks"],
+                served=idx == 0,
+            )
+            item["candidate_id"] = saved.id
+
+    metrics.incr("ai_candidates_generated_total", len(ranked), kind=prompt_kind)
+    return ranked
+
+
+def next_candidate(event_id, prompt_kind: str, payload: dict):
+    # Best stored candidate for this input not shown yet, or None
+    with transaction.atomic():
+        candidate = GenerationCandidate.objects.select_for_update().filter(
+            event_id=event_id,
+            prompt_kind=prompt_kind,
+            input_hash=input_hash(prompt_kind, payload),
+            served=False,
+        ).order_by("-score", "id").first()
+        if candidate is not None:
+            candidate.served = True
+            candidate.save(update_fields=["served"])
+
+    metrics.incr("ai_candidates_another_total", kind=prompt_kind, outcome="stored" if candidate else "empty")
+    return candidate
+
+
+def remaining(event_id, prompt_kind: str, payload: dict) -> int:
+    return GenerationCandidate.objects.filter(
+        event_id=event_id,
+        prompt_kind=prompt_kind,
+        input_hash=input_hash(prompt_kind, payload),
+        served=False,
+    ).count()
+
+
+def choose(prompt_kind: str, event_id, payload: dict, count: int, another=False, **options):
+    """
+    Candidate to use for a request, as (content, response extras). With
+    another, the next stored candidate is used when there is one; otherwise
+    a new batch is generated (at least AI_CANDIDATES_DEFAULT, so the next
+    "another" is served from storage).
+    """
+    if another:
+        stored = next_candidate(event_id, prompt_kind, payload)
+        if stored is not None:
+            return dict(stored.content), {
+                "candidate": {"candidate_id": stored.id, "content": stored.content,
+                              "score": stored.score, "checks": stored.checks},
+                "served_from": "storage",
+                "candidates_remaining": remaining(event_id, prompt_kind, payload),
+            }
+        count = max(count, getattr(settings, "AI_CANDIDATES_DEFAULT", 3))
+        # Every stored one was shown already: a cached batch would repeat them
+        options = dict(options, use_cache=False)
+
+    ranked = generate(prompt_kind, event_id, payload, count, **options)
+    return dict(ranked[0]["content"]), {
+        "candidates": ranked,
+        "served_from": "model",
+        "candidates_remaining": len(ranked) - 1,
+    }
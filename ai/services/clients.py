@@ -0,0 +1,225 @@
+# Provider client registry.
+# Clients are created lazily, once per worker process, and reused by every
+# request so the underlying gRPC channel / HTTP keep-alive pool is shared.
+import logging
+import os
+import threading
+import time
+from datetime import timedelta
+
+import httpx
+import openai
+import google.generativeai as genai
+from django.conf import settings
+
+from ai.services import metrics
+from ai.services.fake_provider import FakeClient
+
+logger = logging.getLogger(__name__)
+
+
+class GeminiClient:
+    name = "gemini"
+
+    def __init__(self, api_key, timeout, transport=None, context_cache=True, context_cache_ttl=3600,
+                 context_cache_min_tokens=1024):
+        # genai keeps a single default client (and channel) per process
+        genai.configure(api_key=api_key, transport=transport)
+        self.timeout = timeout
+        self.context_cache = context_cache
+        self.context_cache_ttl = context_cache_ttl
+        self.context_cache_min_tokens = context_cache_min_tokens
+        self._models = {}
+        # (model, prefix) -> lock held while that model is built
+        self._building = {}
+        self._lock = threading.Lock()
+
+    def _current(self, key):
+        with self._lock:
+            entry = self._models.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                return entry[0]
+            return None
+
+    def model(self, model_name, system_instruction=None):
+        # One model object per (model, static system prefix), rebuilt when its
+        # context cache expires
+        key = (model_name, system_instruction)
+        model = self._current(key)
+        if model is not None:
+            return model
+
+        with self._lock:
+            build_lock = self._building.setdefault(key, threading.Lock())
+        # Building may create a context cache over the network: callers of the
+        # same key wait for one build, generations for other keys do not wait
+        with build_lock:
+            model = self._current(key)
+            if model is not None:
+                return model
+            entry = self._build_model(model_name, system_instruction)
+            with self._lock:
+                self._models[key] = entry
+        return entry[0]
+
+    def _build_model(self, model_name, system_instruction):
+        # Returns (model, rebuild_at)
+        ttl = self.context_cache_ttl
+        if (system_instruction and self.context_cache
+                and len(system_instruction) // 4 >= self.context_cache_min_tokens):
+            try:
+                cached = genai.caching.CachedContent.create(
+                    model=model_name,
+                    system_instruction=system_instruction,
+                    ttl=timedelta(seconds=ttl),
+                )
+                metrics.incr("ai_context_cache_created_total", model=model_name)
+                # Recreate shortly before the provider drops the cache
+                return genai.GenerativeModel.from_cached_content(cached), time.monotonic() + ttl * 0.9
+            except Exception:
+                logger.exception("Creating the context cache for %s failed", model_name)
+                metrics.incr("ai_context_cache_failed_total", model=model_name)
+
+        # Prefixes below the provider's context cache minimum are sent as the
+        # system instruction of a process-wide model on every call, and billed
+        # as input each time
+        return genai.GenerativeModel(model_name, system_instruction=system_instruction), time.monotonic() + ttl
+
+    # usage, when given, is filled with the token counts of the call
+    def generate_text(self, prompt: str, model: str, timeout=None, generation_config=None, usage=None,
+                      system_instruction=None) -> str:
+        response = self.model(model, system_instruction).generate_content(
+            prompt,
+            generation_config=generation_config,
+            request_options={"timeout": timeout or self.timeout},
+        )
+        self._read_usage(response, usage)
+        return response.text
+
+    def stream_text(self, prompt: str, model: str, timeout=None, generation_config=None, usage=None,
+                    system_instruction=None):
+        response = self.model(model, system_instruction).generate_content(
+            prompt,
+            generation_config=generation_config,
+            stream=True,
+            request_options={"timeout": timeout or self.timeout},
+        )
+        for chunk in response:
+            # Every chunk carries the running totals
+            self._read_usage(chunk, usage)
+            try:
+                text = chunk.text
+            except ValueError:
+                # Chunks without a text part (e.g. the final finish_reason chunk)
+                continue
+            if text:
+                yield text
+
+    @staticmethod
+    def _read_usage(response, usage):
+        metadata = getattr(response, "usage_metadata", None)
+        if usage is not None and metadata is not None:
+            usage["input_tokens"] = metadata.prompt_token_count
+            usage["output_tokens"] = metadata.candidates_token_count
+            usage["cached_tokens"] = getattr(metadata, "cached_content_token_count", 0)
+
+
+class OpenAIImageClient:
+    name = "openai"
+
+    def __init__(self, api_key, timeout, max_connections, keepalive_expiry):
+        self.timeout = timeout
+        self._client = openai.OpenAI(
+            api_key=api_key,
+            timeout=timeout,
+            max_retries=0,
+            http_client=openai.DefaultHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=max_connections,
+                    keepalive_expiry=keepalive_expiry,
+                )
+            ),
+        )
+
+    def generate_image(self, prompt: str, model: str, size="1024x1024", timeout=None) -> str:
+        response = self._client.images.generate(
+            prompt=prompt,
+            model=model,
+            n=1,
+            size=size,
+            response_format="b64_json",
+            timeout=timeout or self.timeout,
+        )
+        return response.data[0].b64_json
+
+
+def _make_gemini():
+    return GeminiClient(
+        api_key=getattr(settings, "GEMINI_API_KEY", None) or os.getenv("GEMINI_API_KEY"),
+        timeout=getattr(settings, "AI_TEXT_TIMEOUT", 60),
+        transport=getattr(settings, "AI_GEMINI_TRANSPORT", None),
+        context_cache=getattr(settings, "AI_CONTEXT_CACHE", True),
+        context_cache_ttl=getattr(settings, "AI_CONTEXT_CACHE_TTL", 3600),
+        context_cache_min_tokens=getattr(settings, "AI_CONTEXT_CACHE_MIN_TOKENS", 1024),
+    )
+
+
+def _make_openai():
+    return OpenAIImageClient(
+        api_key=getattr(settings, "OPENAI_API_KEY", None) or os.getenv("OPENAI_API_KEY"),
+        timeout=getattr(settings, "AI_IMAGE_TIMEOUT", 120),
+        max_connections=getattr(settings, "AI_HTTP_MAX_CONNECTIONS", 10),
+        keepalive_expiry=getattr(settings, "AI_HTTP_KEEPALIVE_EXPIRY", 60),
+    )
+
+
+def _make_fake():
+    return FakeClient(
+        text_latency_ms=getattr(settings, "AI_FAKE_TEXT_LATENCY_MS", 800),
+        image_latency_ms=getattr(settings, "AI_FAKE_IMAGE_LATENCY_MS", 5000),
+        jitter=getattr(settings, "AI_FAKE_LATENCY_JITTER", 0.25),
+        error_rate=getattr(settings, "AI_FAKE_ERROR_RATE", 0.0),
+        responses=getattr(settings, "AI_FAKE_RESPONSES", {}),
+        context_cache=getattr(settings, "AI_CONTEXT_CACHE", True),
+        context_cache_min_tokens=getattr(settings, "AI_CONTEXT_CACHE_MIN_TOKENS", 1024),
+    )
+
+
+CLIENT_FACTORIES = {
+    "gemini": _make_gemini,
+    "openai": _make_openai,
+    "fake": _make_fake,
+}
+
+_clients = {}
+_clients_pid = None
+_lock = threading.Lock()
+
+
+def get_client(provider: str):
+    global _clients_pid
+
+    with _lock:
+        # Channels and pools must not be shared across a fork
+        if _clients_pid != os.getpid():
+            _clients.clear()
+            _clients_pid = os.getpid()
+
+        client = _clients.get(provider)
+        if client is None:
+            client = CLIENT_FACTORIES[provider]()
+            _clients[provider] = client
+            metrics.incr("ai_client_created_total", provider=provider)
+        else:
+            metrics.incr("ai_client_reused_total", provider=provider)
+
+    return client
+
+
+def get_text_client():
+    return get_client(getattr(settings, "AI_TEXT_PROVIDER", "gemini"))
+
+
+def get_image_client():
+    return get_client(getattr(settings, "AI_IMAGE_PROVIDER", "openai"))
@@ -0,0 +1,83 @@
+# Minimal dependency-graph runner for multi-stage generations.
+# Stages whose dependencies have succeeded run concurrently on a thread pool;
+# a stage whose dependency failed is skipped.
+import contextvars
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.db import close_old_connections
+
+
+def _run_stage(fn):
+    started = time.monotonic()
+    try:
+        body, code = fn()
+        return body, code, None, started, time.monotonic()
+    except Exception as e:
+        return None, 500, str(e), started, time.monotonic()
+    finally:
+        close_old_connections()
+
+
+def run_dag(stages: dict, max_workers: int = 4) -> dict:
+    """
+    stages maps a name to (dependencies, fn); fn() returns (body, status code).
+    Returns per-stage status, timings (ms from the start of the run) and result.
+    """
+    origin = time.monotonic()
+    results = {}
+    pending = dict(stages)
+    running = {}
+
+    def ms(t):
+        return round((t - origin) * 1000, 1)
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ai-dag") as executor:
+        while pending or running:
+            for name, (deps, fn) in list(pending.items()):
+                if any(results.get(dep, {}).get("status") in ("failed", "skipped") for dep in deps):
+                    results[name] = {"status": "skipped", "depends_on": list(deps),
+                                     "error": "A dependency did not succeed"}
+                    del pending[name]
+                elif all(results.get(dep, {}).get("status") == "succeeded" for dep in deps):
+                    # Stages inherit the caller's context (e.g. the request deadline)
+                    running[executor.submit(contextvars.copy_context().run, _run_stage, fn)] = name
+                    del pending[name]
+
+            if not running:
+                # Remaining stages depend on unknown stages
+                for name, (deps, fn) in pending.items():
+                    results[name] = {"status": "skipped", "depends_on": list(deps),
+                                     "error": "Unknown dependency"}
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                body, code, error, started, finished = future.result()
+                results[name] = {
+                    "status": "succeeded" if error is None and code < 400 else "failed",
+                    "http_status": code,
+                    "depends_on": list(stages[name][0]),
+                    "started_ms": ms(started),
+                    "duration_ms": round((finished - started) * 1000, 1),
+                    "result": body,
+                }
+                if error is not None:
+                    results[name]["error"] = error
+
+    return results
+
+
+def critical_path_ms(results: dict) -> float:
+    # Longest chain of measured stage durations through the dependency graph
+    memo = {}
+
+    def chain(name):
+        if name not in memo:
+            stage = results.get(name, {})
+            upstream = [chain(dep) for dep in stage.get("depends_on", [])]
+            memo[name] = stage.get("duration_ms", 0) + max(upstream, default=0)
+        return memo[name]
+
+    return round(max((chain(name) for name in results), default=0), 1)
@@ -0,0 +1,133 @@
+# Offline provider for load tests and benchmarks (AI_TEXT_PROVIDER /
+# AI_IMAGE_PROVIDER = "fake"). Text calls return JSON that matches the
+# response schema of the prompt kind (or a canned answer from
+# AI_FAKE_RESPONSES), images are PNGs drawn with Pillow. Latency and error
+# rate are configurable so the whole generation stack can be exercised
+# without network access or provider quota.
+import base64
+import hashlib
+import io
+import json
+import random
+import re
+import time
+from datetime import datetime, timedelta
+
+from PIL import Image, ImageDraw
+
+from ai.services.schemas import SCHEMAS
+
+
+class FakeProviderError(Exception):
+    # Looks like a provider 503 to the retry policy
+    code = 503
+
+
+class FakeClient:
+    name = "fake"
+
+    def __init__(self, text_latency_ms, image_latency_ms, jitter, error_rate, responses=None,
+                 context_cache=True, context_cache_min_tokens=1024):
+        self.text_latency_ms = text_latency_ms
+        self.image_latency_ms = image_latency_ms
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.responses = responses or {}
+        self.context_cache = context_cache
+        self.context_cache_min_tokens = context_cache_min_tokens
+
+    def generate_text(self, prompt: str, model: str, timeout=None, generation_config=None, usage=None,
+                      system_instruction=None) -> str:
+        self._wait(self.text_latency_ms, timeout)
+        text = self._answer(prompt, generation_config)
+        self._fill_usage(prompt, text, usage, system_instruction)
+        return text
+
+    def stream_text(self, prompt: str, model: str, timeout=None, generation_config=None, usage=None,
+                    system_instruction=None):
+        latency = self._latency(self.text_latency_ms)
+        # A fifth of the latency before the first chunk, the rest spread over the chunks
+        self._wait(latency * 0.2, timeout, jitter=False)
+        text = self._answer(prompt, generation_config)
+        chunks = [text[i:i + 40] for i in range(0, len(text), 40)]
+        for chunk in chunks:
+            time.sleep(latency * 0.8 / len(chunks) / 1000)
+            yield chunk
+        self._fill_usage(prompt, text, usage, system_instruction)
+
+    def generate_image(self, prompt: str, model: str, size="1024x1024", timeout=None) -> str:
+        self._wait(self.image_latency_ms, timeout)
+        return render_poster_png(prompt, size)
+
+    def _latency(self, latency_ms):
+        return max(0.0, latency_ms * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+    def _wait(self, latency_ms, timeout, jitter=True):
+        if random.random() < self.error_rate:
+            raise FakeProviderError("Fake provider error")
+
+        seconds = (self._latency(latency_ms) if jitter else latency_ms) / 1000
+        if timeout is not None and seconds > timeout:
+            time.sleep(timeout)
+            raise TimeoutError("Fake provider timed out")
+        time.sleep(seconds)
+
+    def _answer(self, prompt, generation_config):
+        schema = (generation_config or {}).get("response_schema")
+        kind = next((kind for kind, known in SCHEMAS.items() if known is schema), None)
+        if kind in self.responses:
+            return json.dumps(self.responses[kind], ensure_ascii=False)
+
+        # Same prompt, same answer, so caches behave as they would in production
+        rng = random.Random(hashlib.sha256(prompt.encode("utf-8")).digest())
+        return json.dumps(sample_value(schema or {"type": "object", "properties": {}}, rng), ensure_ascii=False)
+
+    def _fill_usage(self, prompt, text, usage, system_instruction=None):
+        if usage is not None:
+            # Roughly four characters per token. The system prefix is a cache
+            # hit only when GeminiClient would have built a context cache for it
+            prefix = len(system_instruction or "") // 4
+            usage["input_tokens"] = prefix + len(prompt) // 4
+            usage["output_tokens"] = len(text) // 4
+            usage["cached_tokens"] = prefix if self.context_cache and prefix >= self.context_cache_min_tokens else 0
+
+
+def sample_value(schema, rng, name="value"):
+    kind = schema.get("type")
+    if kind == "object":
+        return {key: sample_value(sub, rng, key) for key, sub in schema.get("properties", {}).items()}
+    if kind == "array":
+        count = min(max(schema.get("min_items", 0), rng.randint(2, 5)), schema.get("max_items", 5))
+        return [sample_value(schema["items"], rng, name) for _ in range(count)]
+    if kind == "integer":
+        return rng.randint(1, 5) if "score" in name else rng.randint(2, 200)
+    if kind == "number":
+        return round(rng.uniform(1, 100), 2)
+    if kind == "boolean":
+        return rng.random() < 0.5
+    if name.endswith("_time"):
+        start = datetime(2030, 1, 1, 9) + timedelta(days=rng.randint(0, 364), hours=rng.randint(0, 8))
+        return start.isoformat()
+    if name == "hashtag":
+        return f"#Sample{rng.randint(1, 999)}"
+    return f"Sample {name.replace('_', ' ')} {rng.randint(1, 999)}"
+
+
+def render_poster_png(prompt: str, size="1024x1024") -> str:
+    width, height = (int(part) for part in size.split("x"))
+    seed = hashlib.sha256(prompt.encode("utf-8")).digest()
+    top, bottom = seed[:3], seed[3:6]
+
+    image = Image.new("RGB", (width, height))
+    draw = ImageDraw.Draw(image)
+    for y in range(height):
+        ratio = y / max(1, height - 1)
+        draw.line([(0, y), (width, y)], fill=tuple(int(a + (b - a) * ratio) for a, b in zip(top, bottom)))
+
+    headline = re.search(r"Headline \(for reference\): (.*)", prompt)
+    text = headline.group(1).strip() if headline else "Sample poster"
+    draw.text((width // 12, height // 3), text, fill=(255, 255, 255))
+
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return base64.b64encode(buffer.getvalue()).decode("ascii")
@@ -0,0 +1,260 @@
+# Cached geocoding of venue names.
+# Tier 1 is an in-process LRU, tier 2 the GeocodeCache table shared by every
+# worker; only a name missing from both (or older than AI_GEOCODE_TTL) goes to
+# Nominatim. Names Nominatim does not know are cached too, for the shorter
+# AI_GEOCODE_NEGATIVE_TTL. When a refresh fails, the stale row is used.
+#
+# All lookups share one Nominatim client. Its usage policy (one request per
+# second) is enforced by the "nominatim" TokenBucket, shared by every worker.
+# resolve() geocodes several names at once on a thread pool and returns what
+# finished within its deadline; the rest keep running and fill the cache.
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections
+from django.utils import timezone
+from geopy.exc import GeocoderServiceError
+from geopy.geocoders import Nominatim
+
+from api.models import VenueSuggestion
+from ai.models import GeocodeCache
+from ai.services import admission, metrics
+from ai.services.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "EventIQBot/1.0 (zxcv2442442002@gmail.com)"
+# Cached in the LRU for names Nominatim does not know
+NOT_FOUND = {}
+
+_local = LRUCache(getattr(settings, "AI_GEOCODE_LOCAL_MAX_ENTRIES", 1024))
+_client = None
+_executor = None
+_executor_pid = None
+_lock = threading.Lock()
+
+
+def normalize(name: str) -> str:
+    # "  Taipei 101 " and "TAIPEI　101" are the same query
+    name = unicodedata.normalize("NFKC", name or "").casefold()
+    return re.sub(r"\s+", " ", name).strip(" ,.;")[:255]
+
+
+def map_url(lat, lon) -> str:
+    return f"https://www.google.com/maps/search/?api=1&query={lat},{lon}"
+
+
+def _ttl(found: bool) -> int:
+    if found:
+        return getattr(settings, "AI_GEOCODE_TTL", 30 * 86400)
+    return getattr(settings, "AI_GEOCODE_NEGATIVE_TTL", 86400)
+
+
+def _as_result(entry: GeocodeCache):
+    if not entry.found:
+        return NOT_FOUND
+    return {"address": entry.address, "lat": entry.lat, "lon": entry.lon, "map_url": entry.map_url}
+
+
+def _copy(value):
+    # Callers get their own dict, None for NOT_FOUND
+    return dict(value) if value else None
+
+
+def get_client() -> Nominatim:
+    global _client
+    with _lock:
+        if _client is None:
+            _client = Nominatim(user_agent=getattr(settings, "AI_GEOCODE_USER_AGENT", USER_AGENT))
+    return _client
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor, _executor_pid
+
+    with _lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "AI_GEOCODE_WORKERS", 4),
+                thread_name_prefix="ai-geocode",
+            )
+            _executor_pid = os.getpid()
+    return _executor
+
+
+def _wait_for_turn(give_up_at) -> bool:
+    # Blocks until the shared bucket allows a Nominatim request; False when
+    # that would be after give_up_at
+    rate = getattr(settings, "AI_GEOCODE_RATE", 1.0)
+    burst = getattr(settings, "AI_GEOCODE_BURST", 1)
+    while True:
+        retry_after = admission.take("nominatim", 1, rate, burst)
+        if not retry_after:
+            return True
+        if time.monotonic() + retry_after > give_up_at:
+            metrics.incr("ai_geocode_errors_total", error="RateLimited")
+            return False
+        time.sleep(retry_after)
+
+
+def fetch(query: str, give_up_at=None):
+    """
+    Geocode query with Nominatim: {"address", "lat", "lon", "map_url"},
+    NOT_FOUND, or None when the service failed or no request slot came up
+    before give_up_at (a time.monotonic() value).
+    """
+    if give_up_at is None:
+        give_up_at = time.monotonic() + getattr(settings, "AI_GEOCODE_MAX_WAIT", 60)
+    if not _wait_for_turn(give_up_at):
+        return None
+
+    try:
+        with metrics.timed("ai_geocode_latency_ms"):
+            location = get_client().geocode(query, timeout=getattr(settings, "AI_GEOCODE_TIMEOUT", 10))
+    except GeocoderServiceError as e:
+        metrics.incr("ai_geocode_errors_total", error=type(e).__name__)
+        return None
+
+    if location is None:
+        return NOT_FOUND
+    return {
+        "address": location.address,
+        "lat": location.latitude,
+        "lon": location.longitude,
+        "map_url": map_url(location.latitude, location.longitude),
+    }
+
+
+def _from_cache(query: str):
+    # (cached answer or None when Nominatim has to be asked, GeocodeCache row or None)
+    value = _local.get(query)
+    if value is not None:
+        metrics.incr("ai_geocode_lookups_total", source="local")
+        return value, None
+
+    try:
+        entry = GeocodeCache.objects.filter(query=query).first()
+    except DatabaseError:
+        logger.exception("Geocode cache lookup failed")
+        return None, None
+
+    if entry is not None:
+        age = (timezone.now() - entry.fetched_at).total_seconds()
+        if age < _ttl(entry.found):
+            _local.set(query, _as_result(entry), _ttl(entry.found) - age)
+            metrics.incr("ai_geocode_lookups_total", source="db")
+            return _as_result(entry), entry
+    return None, entry
+
+
+def lookup(place_name: str, refresh=False, max_wait=None):
+    """
+    {"address", "lat", "lon", "map_url"} of a place name, or None when it is
+    unknown or cannot be geocoded right now. refresh skips both cache tiers;
+    max_wait bounds the wait for a Nominatim request slot (default
+    AI_GEOCODE_MAX_WAIT).
+    """
+    query = normalize(place_name)
+    if not query:
+        return None
+
+    if refresh:
+        value, entry = None, GeocodeCache.objects.filter(query=query).first()
+    else:
+        value, entry = _from_cache(query)
+        if value is not None:
+            return _copy(value)
+
+    value = fetch(query, None if max_wait is None else time.monotonic() + max_wait)
+    if value is None:
+        # Nominatim is down or slow: an expired answer beats none
+        metrics.incr("ai_geocode_lookups_total", source="stale" if entry else "failed")
+        return _copy(_as_result(entry)) if entry else None
+
+    metrics.incr("ai_geocode_lookups_total", source="network")
+    _local.set(query, value, _ttl(bool(value)))
+    try:
+        GeocodeCache.objects.update_or_create(
+            query=query,
+            defaults={
+                "found": bool(value),
+                "address": value.get("address", ""),
+                "lat": value.get("lat"),
+                "lon": value.get("lon"),
+                "map_url": value.get("map_url"),
+                "fetched_at": timezone.now(),
+            },
+        )
+    except DatabaseError:
+        logger.exception("Geocode cache write failed")
+    return _copy(value)
+
+
+def _lookup_in_thread(place_name):
+    try:
+        return lookup(place_name)
+    finally:
+        close_old_connections()
+
+
+def resolve(place_names, timeout=None):
+    """
+    Geocode several names concurrently. Returns ({name: result or None},
+    {name: future}) - the names answered within timeout seconds
+    (AI_GEOCODE_DEADLINE) and those still being looked up; their futures
+    resolve to lookup() results and fill the cache either way.
+    """
+    if timeout is None:
+        timeout = getattr(settings, "AI_GEOCODE_DEADLINE", 3)
+
+    resolved, futures = {}, {}
+    for name in dict.fromkeys(place_names):
+        query = normalize(name)
+        value, _ = _from_cache(query) if query else (NOT_FOUND, None)
+        if value is not None:
+            resolved[name] = _copy(value)
+        else:
+            futures[name] = get_executor().submit(_lookup_in_thread, name)
+
+    wait(futures.values(), timeout=timeout)
+    pending = {}
+    for name, future in futures.items():
+        if future.done():
+            resolved[name] = None if future.exception() else future.result()
+        else:
+            pending[name] = future
+    metrics.incr("ai_geocode_pending_total", len(pending))
+    return resolved, pending
+
+
+def backfill_venue(venue_id, future):
+    # Copies a late geocoding result onto the saved VenueSuggestion
+    def apply(done):
+        try:
+            location = done.result()
+            if location:
+                VenueSuggestion.objects.filter(id=venue_id).update(
+                    address=location["address"][:255], map_url=location["map_url"],
+                )
+                metrics.incr("ai_geocode_backfills_total")
+        except Exception:
+            logger.exception("Geocode backfill of venue suggestion %s failed", venue_id)
+        finally:
+            close_old_connections()
+
+    future.add_done_callback(apply)
+
+
+def is_fresh(place_name: str) -> bool:
+    # Whether lookup() would answer without calling Nominatim
+    entry = GeocodeCache.objects.filter(query=normalize(place_name)).first()
+    if entry is None:
+        return False
+    return timezone.now() - entry.fetched_at < timedelta(seconds=_ttl(entry.found))
@@ -0,0 +1,171 @@
+# Background generation jobs (?async=true on the /ai/generate-* endpoints).
+# Jobs live in the GenerationJob table so they survive worker restarts; each
+# worker process runs them on a bounded thread pool. A job is claimed with an
+# atomic queued -> running update, so a job dispatched by several workers
+# still runs once. Running jobs send heartbeats; a job whose worker died is
+# re-queued by recover_jobs(), which every worker runs from its heartbeat
+# thread and on submits and polls (at most every AI_JOB_RECOVER_INTERVAL).
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from ai.models import GenerationJob
+from ai.services import admission, lanes, metrics, resilience
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_pid = None
+_recovered_pid = None
+_recovered_at = 0.0
+_lock = threading.Lock()
+
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor, _executor_pid
+
+    with _lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "AI_JOB_WORKERS", 4),
+                thread_name_prefix="ai-job",
+            )
+            _executor_pid = os.getpid()
+            threading.Thread(target=_heartbeat_loop, name="ai-job-heartbeat", daemon=True).start()
+    return _executor
+
+
+def submit_job(endpoint: str, user, data: dict, event_id=None, options=None) -> GenerationJob:
+    recover_jobs()
+
+    job = GenerationJob.objects.create(
+        user=user,
+        endpoint=endpoint,
+        event_id=event_id,
+        request_data=data,
+        options=options or {},
+    )
+    metrics.incr("ai_jobs_submitted_total", endpoint=endpoint)
+    transaction.on_commit(lambda: dispatch(job.id))
+    return job
+
+
+def dispatch(job_id):
+    get_executor().submit(run_job, job_id)
+
+
+def cancel_job(job: GenerationJob) -> bool:
+    # Only queued jobs can be cancelled; a running generation cannot be interrupted
+    cancelled = GenerationJob.objects.filter(id=job.id, status="queued").update(
+        status="cancelled", finished_at=timezone.now()
+    )
+    if cancelled:
+        metrics.incr("ai_jobs_finished_total", endpoint=job.endpoint, status="cancelled")
+    return bool(cancelled)
+
+
+def run_job(job_id):
+    from ai.views import GENERATION_VIEWS
+
+    try:
+        now = timezone.now()
+        claimed = GenerationJob.objects.filter(id=job_id, status="queued").update(
+            status="running",
+            started_at=now,
+            heartbeat_at=now,
+            worker=worker_id(),
+            attempts=F("attempts") + 1,
+        )
+        if not claimed:
+            return
+
+        job = GenerationJob.objects.select_related("user").get(id=job_id)
+        metrics.observe("ai_job_queue_wait_ms", (now - job.created_at).total_seconds() * 1000,
+                        endpoint=job.endpoint)
+
+        try:
+            view = GENERATION_VIEWS[job.endpoint]()
+            admission.acquire(job.user_id, view.get_prompt_kinds(job.request_data),
+                              getattr(settings, "AI_ADMISSION_JOB_WAIT", 300))
+            with metrics.timed("ai_job_run_ms", endpoint=job.endpoint), lanes.lane("bulk"), \
+                    resilience.deadline(getattr(settings, "AI_JOB_DEADLINE", 600)):
+                body, code = view.run(job.user, job.request_data, job.event_id, **job.options)
+            job.result = body
+            job.http_status = code
+            job.status = "succeeded" if code < 400 else "failed"
+        except admission.Throttled as e:
+            job.result = {"error": str(e), "retry_after": e.retry_after}
+            job.http_status = e.status_code
+            job.status = "failed"
+        except Exception as e:
+            logger.exception("Generation job %s failed", job_id)
+            job.error = f"{e}\n{traceback.format_exc()}"
+            job.http_status = 500
+            job.status = "failed"
+
+        job.finished_at = timezone.now()
+        job.save(update_fields=["result", "http_status", "status", "error", "finished_at"])
+        metrics.incr("ai_jobs_finished_total", endpoint=job.endpoint, status=job.status)
+
+    finally:
+        close_old_connections()
+
+
+def recover_jobs():
+    # Re-queues and dispatches jobs orphaned by a dead worker. The first run
+    # in a process also dispatches everything still waiting in the queue.
+    global _recovered_pid, _recovered_at
+
+    with _lock:
+        first_run = _recovered_pid != os.getpid()
+        if not first_run and time.monotonic() - _recovered_at < getattr(settings, "AI_JOB_RECOVER_INTERVAL", 30):
+            return
+        _recovered_pid = os.getpid()
+        _recovered_at = time.monotonic()
+
+    stale_before = timezone.now() - timedelta(seconds=getattr(settings, "AI_JOB_STALE_AFTER", 120))
+    max_attempts = getattr(settings, "AI_JOB_MAX_ATTEMPTS", 3)
+
+    stale = GenerationJob.objects.filter(status="running", heartbeat_at__lt=stale_before)
+    stale.filter(attempts__gte=max_attempts).update(
+        status="failed", error="Worker stopped while running the job", finished_at=timezone.now()
+    )
+    orphaned = list(stale.filter(attempts__lt=max_attempts).values_list("id", flat=True))
+    requeued = stale.filter(id__in=orphaned).update(status="queued")
+    if requeued:
+        metrics.incr("ai_jobs_recovered_total", requeued)
+
+    if first_run:
+        orphaned = GenerationJob.objects.filter(status="queued").values_list("id", flat=True)
+    # Claiming is atomic, so a job dispatched by several workers still runs once
+    for job_id in orphaned:
+        dispatch(job_id)
+
+
+def _heartbeat_loop():
+    interval = getattr(settings, "AI_JOB_HEARTBEAT", 15)
+    me = worker_id()
+    while True:
+        time.sleep(interval)
+        try:
+            GenerationJob.objects.filter(status="running", worker=me).update(heartbeat_at=timezone.now())
+            metrics.set_gauge("ai_job_queue_depth", _executor._work_queue.qsize(), worker=me)
+            recover_jobs()
+        except Exception:
+            logger.exception("Generation job heartbeat failed")
+        finally:
+            close_old_connections()
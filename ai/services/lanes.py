@@ -0,0 +1,118 @@
+# Priority lanes in front of the provider clients.
+# Every provider call takes a slot in a lane; AI_LANES lists the lanes in
+# priority order with the number of calls each may run at once in a worker.
+# Requests served inline use the "interactive" lane, background jobs and
+# speculative drafts the "bulk" lane. Queued work in a lower lane is held
+# back while a higher lane has anything queued, so bulk work never delays an
+# interactive call that is waiting for a slot.
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+from ai.services import metrics
+from ai.services.resilience import DeadlineExceeded, remaining_budget
+
+DEFAULT_LANE = "interactive"
+
+_lane = ContextVar("ai_lane", default=DEFAULT_LANE)
+
+
+def get_lanes() -> dict:
+    return getattr(settings, "AI_LANES", {DEFAULT_LANE: {"concurrency": 8}})
+
+
+@contextmanager
+def lane(name: str):
+    # Provider calls made inside the block use this lane
+    token = _lane.set(name if name in get_lanes() else DEFAULT_LANE)
+    try:
+        yield
+    finally:
+        _lane.reset(token)
+
+
+def current_lane() -> str:
+    return _lane.get()
+
+
+class Scheduler:
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._running = {}
+        self._waiting = {}
+
+    def _can_start(self, name, ticket, lanes) -> bool:
+        if self._waiting[name][0] is not ticket:
+            return False
+        if self._running.get(name, 0) >= lanes[name].get("concurrency", 1):
+            return False
+        return not self._higher_queued(name, lanes)
+
+    def _higher_queued(self, name, lanes) -> bool:
+        for other in lanes:
+            if other == name:
+                return False
+            if self._waiting.get(other):
+                return True
+        return False
+
+    def _report(self, name):
+        metrics.set_gauge("ai_lane_queue_depth", len(self._waiting[name]), lane=name)
+        metrics.set_gauge("ai_lane_running", self._running.get(name, 0), lane=name)
+
+    def acquire(self, name, timeout=None):
+        lanes = get_lanes()
+        ticket = object()
+        started = time.monotonic()
+        held_back = False
+
+        with self._cond:
+            queue = self._waiting.setdefault(name, deque())
+            queue.append(ticket)
+            self._report(name)
+            while not self._can_start(name, ticket, lanes):
+                if not held_back and self._higher_queued(name, lanes):
+                    metrics.incr("ai_lane_preempted_total", lane=name)
+                    held_back = True
+
+                remaining = None if timeout is None else started + timeout - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    queue.remove(ticket)
+                    self._report(name)
+                    self._cond.notify_all()
+                    metrics.incr("ai_lane_timeouts_total", lane=name)
+                    raise DeadlineExceeded(f"No {name} provider slot became free in time")
+                self._cond.wait(remaining)
+
+            queue.popleft()
+            self._running[name] = self._running.get(name, 0) + 1
+            self._report(name)
+            # The next ticket in this lane may be able to start as well
+            self._cond.notify_all()
+
+        metrics.observe("ai_lane_wait_ms", (time.monotonic() - started) * 1000, lane=name)
+
+    def release(self, name):
+        with self._cond:
+            self._running[name] -= 1
+            self._report(name)
+            self._cond.notify_all()
+
+
+_scheduler = Scheduler()
+
+
+@contextmanager
+def slot():
+    # Holds a slot in the current lane for the provider call(s) in the block;
+    # waits at most for the rest of the deadline budget
+    name = current_lane()
+    _scheduler.acquire(name, remaining_budget())
+    try:
+        yield
+    finally:
+        _scheduler.release(name)
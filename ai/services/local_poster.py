@@ -0,0 +1,197 @@
+# Template-based poster renderer.
+# Draws the poster copy, time and venue over a gradient with Pillow, in well
+# under a second on CPU. Used for engine=local and as the fallback when the
+# image provider is slow, failing or behind an open breaker. Colour scheme
+# and layout are picked from the free-text poster options by keyword; when
+# nothing matches, a stable choice is made from the event name. The
+# bottom-right corner stays clear for the QR code, as in the image prompt.
+import hashlib
+import io
+import os
+import re
+
+import numpy as np
+from django.conf import settings
+from PIL import Image, ImageDraw, ImageFont
+
+from ai.services import metrics
+
+# name -> (gradient top, gradient bottom, text, accent)
+COLOR_SCHEMES = {
+    "blue": ((18, 42, 92), (44, 120, 200), (255, 255, 255), (255, 204, 77)),
+    "red": ((120, 16, 32), (220, 60, 60), (255, 255, 255), (255, 220, 120)),
+    "green": ((12, 70, 52), (60, 160, 110), (255, 255, 255), (240, 230, 140)),
+    "purple": ((48, 20, 90), (150, 70, 190), (255, 255, 255), (255, 190, 230)),
+    "orange": ((170, 60, 10), (250, 160, 60), (255, 255, 255), (60, 30, 10)),
+    "pink": ((240, 150, 180), (255, 220, 230), (70, 20, 50), (200, 40, 110)),
+    "dark": ((10, 10, 14), (50, 50, 64), (245, 245, 245), (0, 200, 200)),
+    "light": ((245, 240, 230), (220, 230, 245), (40, 40, 60), (230, 110, 90)),
+    "gold": ((60, 40, 10), (200, 150, 40), (255, 250, 235), (255, 255, 255)),
+}
+
+# Keyword in the colour scheme option -> scheme
+COLOR_KEYWORDS = {
+    "blue": "blue", "navy": "blue", "teal": "blue", "\u85cd": "blue", "\u85cf\u9752": "blue",
+    "red": "red", "crimson": "red", "\u7d05": "red",
+    "green": "green", "\u7da0": "green",
+    "purple": "purple", "violet": "purple", "\u7d2b": "purple",
+    "orange": "orange", "\u6a59": "orange", "\u6a58": "orange",
+    "pink": "pink", "\u7c89": "pink",
+    "dark": "dark", "black": "dark", "night": "dark", "\u9ed1": "dark",
+    "pastel": "light", "light": "light", "white": "light", "\u767d": "light",
+    "gold": "gold", "yellow": "gold", "\u91d1": "gold", "\u9ec3": "gold",
+}
+
+# Fractions of the poster size: where the headline starts, its font size, and
+# an accent band drawn behind it
+LAYOUTS = {
+    "centered": {"align": "center", "headline_top": 0.26, "headline_size": 0.085, "band": None},
+    "left": {"align": "left", "headline_top": 0.16, "headline_size": 0.095, "band": None},
+    "banner": {"align": "center", "headline_top": 0.1, "headline_size": 0.08, "band": 0.42},
+}
+
+LAYOUT_KEYWORDS = {
+    "minimal": "centered", "center": "centered", "classic": "centered", "elegant": "centered",
+    "modern": "left", "left": "left", "editorial": "left", "magazine": "left",
+    "bold": "banner", "banner": "banner", "block": "banner", "festival": "banner",
+}
+
+# CJK characters wrap one at a time, everything else at spaces
+TOKEN = re.compile(r"[\u3040-\u30ff\u4e00-\u9fff\uac00-\ud7af\uff00-\uffef]|[^\s\u3040-\u30ff\u4e00-\u9fff\uac00-\ud7af\uff00-\uffef]+\s*|\s+")
+
+# Tried in order when AI_POSTER_FONT is not set; the first that exists wins
+FONT_CANDIDATES = (
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/System/Library/Fonts/PingFang.ttc",
+    "C:/Windows/Fonts/msjh.ttc",
+)
+
+_fonts = {}
+
+
+def _pick(option, keywords, choices, seed):
+    option = (option or "").lower()
+    for keyword, name in keywords.items():
+        if keyword in option:
+            return name
+    names = sorted(choices)
+    digest = hashlib.sha256(str(seed).encode("utf-8")).digest()
+    return names[digest[0] % len(names)]
+
+
+def font(size: int):
+    size = max(size, 8)
+    if size not in _fonts:
+        path = getattr(settings, "AI_POSTER_FONT", "") or next(
+            (candidate for candidate in FONT_CANDIDATES if os.path.exists(candidate)), None
+        )
+        # Pillow's bundled font has no CJK glyphs; install one of FONT_CANDIDATES for those
+        _fonts[size] = ImageFont.truetype(path, size) if path else ImageFont.load_default(size=size)
+    return _fonts[size]
+
+
+def _wrap(text: str, face, max_width: float) -> list:
+    lines, line = [], ""
+    for token in TOKEN.findall(text or ""):
+        if line and face.getlength((line + token).rstrip()) > max_width:
+            lines.append(line.rstrip())
+            line = token.lstrip()
+        else:
+            line += token
+    if line.strip():
+        lines.append(line.rstrip())
+    return lines
+
+
+def _gradient(size, top, bottom) -> Image.Image:
+    width, height = size
+    t = np.linspace(0.0, 1.0, height, dtype=np.float32)[:, None, None]
+    rows = np.asarray(top, dtype=np.float32) * (1 - t) + np.asarray(bottom, dtype=np.float32) * t
+    return Image.fromarray(np.broadcast_to(rows, (height, width, 3)).astype(np.uint8), "RGB")
+
+
+def _draw_lines(draw, lines, face, x, y, width, align, fill, line_gap, stroke=0):
+    # Returns the y below the last line
+    for line in lines:
+        line_width = face.getlength(line)
+        left = x + (width - line_width) / 2 if align == "center" else x
+        draw.text((left, y), line, font=face, fill=fill, stroke_width=stroke, stroke_fill=fill)
+        y += face.size + line_gap
+    return y
+
+
+def _when(event: dict) -> str:
+    start, end = event.get("start_time") or "", event.get("end_time") or ""
+    if start[:10] and start[:10] == end[:10]:
+        # Same day: "2026-10-20 10:00 - 12:00"
+        return f"{start} - {end[11:]}"
+    return " - ".join(part for part in (start, end) if part)
+
+
+def render(event_data: dict) -> bytes:
+    """
+    PNG of a poster for the poster_image prompt inputs (event, venue,
+    poster options and poster_text).
+    """
+    event = event_data.get("event", {})
+    venue = event_data.get("venue", {})
+    options = event_data.get("poster", {})
+    poster_text = event_data.get("poster_text", {})
+    seed = event.get("event_name") or event.get("event_id")
+
+    with metrics.timed("ai_local_poster_ms"):
+        width, height = getattr(settings, "AI_LOCAL_POSTER_SIZE", (1024, 1448))
+        scheme_name = _pick(options.get("color_scheme"), COLOR_KEYWORDS, COLOR_SCHEMES, seed)
+        layout_name = _pick(options.get("layout_style"), LAYOUT_KEYWORDS, LAYOUTS, seed)
+        top, bottom, text_color, accent = COLOR_SCHEMES[scheme_name]
+        layout = LAYOUTS[layout_name]
+
+        image = _gradient((width, height), top, bottom)
+        draw = ImageDraw.Draw(image)
+        margin = int(width * 0.08)
+        text_width = width - 2 * margin
+
+        headline_color = text_color
+        if layout["band"]:
+            draw.rectangle((0, 0, width, int(height * layout["band"])), fill=accent)
+            headline_color = top
+
+        # Shrink the headline until it fits in three lines
+        size = int(width * layout["headline_size"])
+        headline = poster_text.get("headline") or event.get("event_name") or ""
+        lines = _wrap(headline, font(size), text_width)
+        while len(lines) > 3 and size > width * 0.04:
+            size = int(size * 0.9)
+            lines = _wrap(headline, font(size), text_width)
+
+        bold = any(word in (options.get("font_style") or "").lower() for word in ("bold", "heavy", "\u7c97"))
+        y = _draw_lines(draw, lines, font(size), margin, int(height * layout["headline_top"]),
+                        text_width, layout["align"], headline_color, int(size * 0.2), stroke=2 if bold else 0)
+
+        sub_face = font(int(width * 0.042))
+        y += int(height * 0.02)
+        subheadline = poster_text.get("subheadline") or event.get("event_slogan") or ""
+        _draw_lines(draw, _wrap(subheadline, sub_face, text_width)[:3], sub_face, margin, y,
+                    text_width, layout["align"], headline_color, int(sub_face.size * 0.3))
+
+        # Time and venue bottom-left, clear of the QR corner
+        qr_side = int(min(width, height) * (getattr(settings, "AI_QR_SIZE_RATIO", 0.2)
+                                            + 2 * getattr(settings, "AI_QR_MARGIN_RATIO", 0.03)))
+        detail_face = font(int(width * 0.032))
+        detail_width = width - margin - qr_side - margin // 2
+        details = [line for part in (_when(event), venue.get("name"), venue.get("address")) if part
+                   for line in _wrap(str(part), detail_face, detail_width)[:2]]
+        line_height = detail_face.size + int(detail_face.size * 0.4)
+        y = height - margin - line_height * len(details)
+        draw.rectangle((margin, y - int(height * 0.02), margin + int(width * 0.12), y - int(height * 0.02) + 6),
+                       fill=accent)
+        _draw_lines(draw, details, detail_face, margin, y, detail_width, "left", text_color,
+                    int(detail_face.size * 0.4))
+
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG", compress_level=3)
+
+    metrics.incr("ai_local_posters_total", scheme=scheme_name, layout=layout_name)
+    return buffer.getvalue()
@@ -0,0 +1,238 @@
+# Serving of generated media (posters, their variants and renditions, QR codes).
+# Replaces django.views.static for MEDIA_URL:
+#   - strong ETags and Last-Modified, answered with 304 when unchanged
+#   - content-hashed names (all generated files) are cached for a year as
+#     immutable, anything else for AI_MEDIA_MAX_AGE seconds
+#   - single byte ranges (206 / 416)
+#   - precompressed siblings (<file>.br, <file>.gz) picked by Accept-Encoding,
+#     and for PNG posters the full-size AVIF/WebP rendition picked by Accept
+#   - with AI_MEDIA_OFFLOAD the body is left to the front proxy
+#     (X-Accel-Redirect for nginx, X-Sendfile for Apache/lighttpd): the worker
+#     only checks the file and sets the headers
+import hashlib
+import mimetypes
+import os
+import re
+from functools import lru_cache
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from PIL import Image
+
+from ai.services import metrics, renditions
+
+# Generated files are named after a content hash (or a uuid) and never rewritten
+HASHED_NAME = re.compile(r"^[0-9a-f]{32}(?:[.-]|$)")
+IMMUTABLE = "public, max-age=31536000, immutable"
+# Content-Encoding -> suffix of the precompressed sibling, preferred first
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+COMPRESSIBLE = ("text/", "application/json", "application/javascript", "image/svg+xml")
+NEGOTIATED_IMAGES = ("image/png", "image/jpeg")
+RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+CHUNK_SIZE = 64 * 1024
+
+
+def _accepts(header: str, token: str) -> bool:
+    # Whether an Accept/Accept-Encoding header lists token with a non-zero q
+    for item in header.lower().split(","):
+        name, _, params = item.strip().partition(";")
+        if name.strip() != token:
+            continue
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                return float(q[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
+
+@lru_cache(maxsize=1024)
+def _fits_rendition(path, mtime_ns, width) -> bool:
+    # Renditions never upscale, so one of this width is the whole image
+    with Image.open(path) as image:
+        return image.width <= width
+
+
+def _image_variant(path: str, accept: str):
+    # Full-size rendition in a format the client prefers, or None
+    size_name, width = max(renditions.get_sizes().items(), key=lambda item: item[1])
+    for fmt in renditions.get_formats():
+        if not _accepts(accept, f"image/{fmt}"):
+            continue
+        candidate = os.path.join(os.path.dirname(path), renditions.rendition_name(os.path.basename(path), size_name, fmt))
+        if os.path.isfile(candidate) and _fits_rendition(path, os.stat(path).st_mtime_ns, width):
+            return candidate, f"image/{fmt}"
+    return None
+
+
+def select(request, path: str):
+    """
+    File to send for a request of path, as (file path, content type,
+    content encoding or None, request headers the choice varied on).
+    """
+    content_type, _ = mimetypes.guess_type(path)
+    content_type = content_type or "application/octet-stream"
+
+    if content_type in NEGOTIATED_IMAGES:
+        variant = _image_variant(path, request.headers.get("Accept", ""))
+        if variant is not None:
+            return variant[0], variant[1], None, ["Accept"]
+        return path, content_type, None, ["Accept"]
+
+    if content_type.startswith(COMPRESSIBLE):
+        accept_encoding = request.headers.get("Accept-Encoding", "")
+        for encoding, suffix in ENCODINGS:
+            if _accepts(accept_encoding, encoding) and os.path.isfile(path + suffix):
+                return path + suffix, content_type, encoding, ["Accept-Encoding"]
+        return path, content_type, None, ["Accept-Encoding"]
+
+    return path, content_type, None, []
+
+
+@lru_cache(maxsize=1024)
+def _digest(path, size, mtime_ns) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            sha.update(chunk)
+    return sha.hexdigest()[:32]
+
+
+def etag(path: str, stat) -> str:
+    # Hashed names are already unique per content; anything else is hashed once per version
+    name = os.path.basename(path)
+    if HASHED_NAME.match(name):
+        return f'"{name}"'
+    return f'"{_digest(path, stat.st_size, stat.st_mtime_ns)}"'
+
+
+def cache_control(path: str) -> str:
+    if HASHED_NAME.match(os.path.basename(path)):
+        return IMMUTABLE
+    return f"public, max-age={getattr(settings, 'AI_MEDIA_MAX_AGE', 3600)}"
+
+
+def parse_range(header: str, size: int):
+    """
+    (first, last) byte of a single "bytes=" range, None to send the whole
+    file (no header, or a form not supported here, like multiple ranges).
+    Raises ValueError when the range cannot be satisfied.
+    """
+    match = RANGE.match(header.strip()) if header else None
+    if match is None:
+        return None
+
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:
+        # Suffix range: the last N bytes
+        length = int(end)
+        if length == 0:
+            raise ValueError("Empty suffix range")
+        return max(size - length, 0), size - 1
+
+    first = int(start)
+    last = min(int(end), size - 1) if end else size - 1
+    if first >= size or first > last:
+        raise ValueError("Range not satisfiable")
+    return first, last
+
+
+def _read_range(path, first, last):
+    with open(path, "rb") as f:
+        f.seek(first)
+        remaining = last - first + 1
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _offload(response, path: str):
+    # Hands the body to the front proxy; False when no proxy is configured
+    mode = getattr(settings, "AI_MEDIA_OFFLOAD", "")
+    if mode == "x-accel-redirect":
+        relative = os.path.relpath(path, settings.MEDIA_ROOT).replace(os.sep, "/")
+        response["X-Accel-Redirect"] = getattr(settings, "AI_MEDIA_ACCEL_PREFIX", "/protected-media/") + quote(relative)
+    elif mode == "x-sendfile":
+        response["X-Sendfile"] = path
+    else:
+        return False
+    return True
+
+
+def serve(request, path: str):
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404("Not found")
+    if not os.path.isfile(full_path):
+        raise Http404("Not found")
+
+    served_path, content_type, encoding, vary = select(request, full_path)
+    stat = os.stat(served_path)
+
+    # Headers shared by every answer, 304s included
+    headers = HttpResponse(content_type=content_type)
+    headers["ETag"] = etag(served_path, stat)
+    headers["Last-Modified"] = http_date(stat.st_mtime)
+    headers["Cache-Control"] = cache_control(full_path)
+    headers["Accept-Ranges"] = "bytes"
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    if vary:
+        patch_vary_headers(headers, vary)
+
+    conditional = get_conditional_response(
+        request, etag=headers["ETag"], last_modified=int(stat.st_mtime), response=headers,
+    )
+    if conditional is not headers:
+        metrics.incr("ai_media_responses_total", status=str(conditional.status_code), mode="conditional")
+        return conditional
+
+    if _offload(headers, served_path):
+        metrics.incr("ai_media_responses_total", status="200", mode="offload")
+        return headers
+
+    byte_range = None
+    # A range of an older version (If-Range no longer matching) gets the whole file
+    if request.headers.get("If-Range", headers["ETag"]) == headers["ETag"]:
+        try:
+            byte_range = parse_range(request.headers.get("Range", ""), stat.st_size)
+        except ValueError:
+            headers.status_code = 416
+            headers["Content-Range"] = f"bytes */{stat.st_size}"
+            metrics.incr("ai_media_responses_total", status="416", mode="range")
+            return headers
+
+    if byte_range is not None:
+        first, last = byte_range
+        body = [] if request.method == "HEAD" else _read_range(served_path, first, last)
+        response = StreamingHttpResponse(body, status=206, content_type=content_type)
+        response["Content-Range"] = f"bytes {first}-{last}/{stat.st_size}"
+        response["Content-Length"] = str(last - first + 1)
+        mode = "range"
+    elif request.method == "HEAD":
+        response = HttpResponse(content_type=content_type)
+        response["Content-Length"] = str(stat.st_size)
+        mode = "head"
+    else:
+        # The WSGI server sends a whole file with sendfile() where it can
+        response = FileResponse(open(served_path, "rb"), content_type=content_type)
+        mode = "file"
+
+    for header in ("ETag", "Last-Modified", "Cache-Control", "Accept-Ranges", "Content-Encoding", "Vary"):
+        if header in headers:
+            response[header] = headers[header]
+    metrics.incr("ai_media_responses_total", status=str(response.status_code), mode=mode)
+    return response
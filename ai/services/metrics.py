@@ -0,0 +1,90 @@
+# In-process metrics for the AI generation stack.
+# Every gunicorn worker keeps its own registry; GET /ai/metrics/ returns the
+# snapshot of the worker that served the request (the pid is included).
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+# Number of most recent observations kept per histogram for percentiles
+HISTOGRAM_WINDOW = 1000
+
+_lock = threading.Lock()
+_counters = defaultdict(float)
+_gauges = {}
+_histograms = defaultdict(lambda: deque(maxlen=HISTOGRAM_WINDOW))
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def incr(name, value=1, **labels):
+    with _lock:
+        _counters[_key(name, labels)] += value
+
+
+def set_gauge(name, value, **labels):
+    with _lock:
+        _gauges[_key(name, labels)] = value
+
+
+def observe(name, value, **labels):
+    with _lock:
+        _histograms[_key(name, labels)].append(value)
+
+
+@contextmanager
+def timed(name, **labels):
+    # Observe the wall time of the block in milliseconds
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        observe(name, (time.monotonic() - started) * 1000, **labels)
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def percentile(name, q, **labels):
+    with _lock:
+        values = sorted(_histograms.get(_key(name, labels), ()))
+    return _percentile(values, q)
+
+
+def counter_value(name, **labels):
+    with _lock:
+        return _counters.get(_key(name, labels), 0)
+
+
+def snapshot() -> dict:
+    with _lock:
+        counters = [
+            {"name": name, "labels": dict(labels), "value": value}
+            for (name, labels), value in sorted(_counters.items())
+        ]
+        gauges = [
+            {"name": name, "labels": dict(labels), "value": value}
+            for (name, labels), value in sorted(_gauges.items())
+        ]
+        histograms = []
+        for (name, labels), values in sorted(_histograms.items()):
+            ordered = sorted(values)
+            histograms.append({
+                "name": name,
+                "labels": dict(labels),
+                "count": len(ordered),
+                "avg": sum(ordered) / len(ordered) if ordered else None,
+                "p50": _percentile(ordered, 0.50),
+                "p95": _percentile(ordered, 0.95),
+                "p99": _percentile(ordered, 0.99),
+                "max": ordered[-1] if ordered else None,
+            })
+
+    return {"pid": os.getpid(), "counters": counters, "gauges": gauges, "histograms": histograms}
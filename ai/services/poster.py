@@ -0,0 +1,103 @@
+# Staged poster pipeline.
+# A poster is built in two stages, each skipped when its inputs are unchanged:
+#   copy  - headline/subheadline, cached by the copy prompt (event details,
+#           tone and language), so a new colour scheme or font keeps the copy
+#   image - the PNG, cached by the full image prompt; the cache holds the path
+#           of the file already in storage
+# Each stage reports whether it was reused and how long it took.
+#
+# The image comes from the image provider, or with engine=local from the
+# template renderer in ai.services.local_poster. A provider call that fails
+# or runs past AI_POSTER_FALLBACK_AFTER seconds (or finds the breaker open)
+# falls back to the local renderer; such images are not cached, so the next
+# request tries the provider again.
+import os
+import time
+
+from django.conf import settings
+
+from ai.prompt.promt import PROMPT_TEMPLATES
+from ai.services import cache, candidates, local_poster, metrics, resilience, storage
+from ai.services.clients import get_image_client
+from ai.services.services import generate_image, generate_json
+
+
+ENGINES = ("provider", "local")
+REUSED_SOURCES = ("cache", "semantic_cache", "storage")
+
+
+def get_engine(value=None) -> str:
+    # Requested engine, AI_POSTER_ENGINE when not given; None for an unknown one
+    engine = (value or getattr(settings, "AI_POSTER_ENGINE", "provider")).lower()
+    return engine if engine in ENGINES else None
+
+
+def _report(stage, started, source):
+    elapsed_ms = round((time.monotonic() - started) * 1000, 1)
+    reused = source in REUSED_SOURCES
+    metrics.incr("ai_poster_stages_total", stage=stage, reused=str(reused).lower())
+    return {"reused": reused, "source": source, "ms": elapsed_ms}
+
+
+def copy_stage(event_id, event_data: dict, count=1, another=False, **options):
+    # Returns (poster text, candidate extras, stage report)
+    started = time.monotonic()
+    if count > 1 or another:
+        poster_text, extras = candidates.choose("poster_copy", event_id, event_data, count, another, **options)
+        source = "storage" if extras["served_from"] == "storage" else "model"
+        return poster_text, extras, _report("copy", started, source)
+
+    trace = {}
+    poster_text = generate_json("poster_copy", event_data, trace=trace, **options)
+    return poster_text, {}, _report("copy", started, trace.get("source", "model"))
+
+
+def save_image(image_base64: str) -> dict:
+    return storage.save_base64(image_base64)
+
+
+def render_local(event_data: dict) -> dict:
+    return storage.save_bytes(local_poster.render(event_data))
+
+
+def _provider_image(event_data: dict):
+    if not getattr(settings, "AI_POSTER_LOCAL_FALLBACK", True):
+        return generate_image("poster_image", event_data)
+
+    # Give up on the provider early enough to render locally within the request
+    wait = getattr(settings, "AI_POSTER_FALLBACK_AFTER", 45)
+    budget = resilience.remaining_budget()
+    with resilience.deadline(wait if budget is None else min(wait, budget)):
+        return generate_image("poster_image", event_data)
+
+
+def image_stage(event_data: dict, use_cache=True, engine=None):
+    # Returns ({"image_url", "filename", "local_path"}, stage report)
+    started = time.monotonic()
+    if get_engine(engine) == "local":
+        return render_local(event_data), _report("image", started, "local")
+
+    prompt = PROMPT_TEMPLATES["poster_image"].render(event_data)
+    model = getattr(settings, "AI_IMAGE_MODEL", "dall-e-3")
+    key = cache.make_key(prompt, model, {"provider": get_image_client().name})
+
+    if use_cache:
+        cached = cache.lookup(key, "poster_image")
+        # The file may have been removed since; render it again then
+        if cached is not None and os.path.exists(cached["local_path"]):
+            storage.touch(cached["local_path"])
+            return cached, _report("image", started, "cache")
+
+    try:
+        image = save_image(_provider_image(event_data))
+    except resilience.ProviderError as e:
+        if not getattr(settings, "AI_POSTER_LOCAL_FALLBACK", True):
+            raise
+        metrics.incr("ai_poster_fallback_total", reason=type(e).__name__)
+        image = render_local(event_data)
+        report = _report("image", started, "local_fallback")
+        report["fallback_reason"] = str(e)
+        return image, report
+
+    cache.store(key, "poster_image", model, image)
+    return image, _report("image", started, "model")
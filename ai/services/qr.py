@@ -0,0 +1,125 @@
+# Server-side QR codes for posters.
+# The poster prompt leaves the bottom-right corner blank for a QR code. The QR
+# of a registration URL is rendered once and cached on disk (named after the
+# URL hash); after a poster is saved, a background thread pastes it into that
+# corner with Pillow and stores the result as the poster's "qr" VisualAsset
+# variant (with its renditions), so clients no longer composite and re-upload
+# it themselves.
+import hashlib
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from uuid import uuid4
+
+import qrcode
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from PIL import Image
+
+from api.models import VisualAsset
+from ai.services import metrics, renditions, storage
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_pid = None
+_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor, _executor_pid
+
+    with _lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "AI_QR_WORKERS", 1),
+                thread_name_prefix="ai-qr",
+            )
+            _executor_pid = os.getpid()
+    return _executor
+
+
+def qr_path(url: str) -> str:
+    digest = hashlib.sha256(url.encode("utf-8")).hexdigest()
+    return os.path.join(settings.MEDIA_ROOT, "qr", f"{digest[:32]}.png")
+
+
+def render_qr(url: str) -> str:
+    # Path of the cached QR image of url, rendered on first use
+    path = qr_path(url)
+    if os.path.exists(path):
+        metrics.incr("ai_qr_renders_total", outcome="cached")
+        return path
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    code = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_M, box_size=10, border=2)
+    code.add_data(url)
+    code.make(fit=True)
+    image = code.make_image(fill_color="black", back_color="white").get_image().convert("RGB")
+
+    # Concurrent renders of the same URL each write their own file; the last rename wins
+    tmp_path = f"{path}.{uuid4().hex}.tmp"
+    image.save(tmp_path, format="PNG")
+    os.replace(tmp_path, path)
+    metrics.incr("ai_qr_renders_total", outcome="rendered")
+    return path
+
+
+def composite(poster_path: str, qr_image_path: str) -> Image.Image:
+    poster = Image.open(poster_path).convert("RGB")
+    width, height = poster.size
+
+    side = int(min(width, height) * getattr(settings, "AI_QR_SIZE_RATIO", 0.2))
+    margin = int(min(width, height) * getattr(settings, "AI_QR_MARGIN_RATIO", 0.03))
+    with Image.open(qr_image_path) as qr_image:
+        # NEAREST keeps the modules sharp, so the code stays scannable
+        code = qr_image.convert("RGB").resize((side, side), Image.NEAREST)
+
+    poster.paste(code, (width - side - margin, height - side - margin))
+    return poster
+
+
+def schedule_composite(visual_asset: VisualAsset, registration_url: str):
+    if not registration_url or not getattr(settings, "AI_POSTER_QR", True):
+        return False
+    transaction.on_commit(lambda: get_executor().submit(_run, visual_asset.id, registration_url))
+    return True
+
+
+def _run(visual_asset_id, registration_url):
+    try:
+        original = VisualAsset.objects.filter(id=visual_asset_id).first()
+        if original is None:
+            # Replaced by a newer poster before the QR was added
+            return
+
+        # The composite goes next to the poster, in the same shard
+        folder, filename = os.path.split(renditions.media_path(original.image_url))
+        # Same poster and URL (a reused poster image): reuse the composited file too
+        url_hash = hashlib.sha256(registration_url.encode("utf-8")).hexdigest()[:12]
+        qr_filename = f"{os.path.splitext(filename)[0]}-qr-{url_hash}.png"
+        if not os.path.exists(os.path.join(folder, qr_filename)):
+            with metrics.timed("ai_qr_composite_ms"):
+                image = composite(os.path.join(folder, filename), render_qr(registration_url))
+                tmp_path = os.path.join(folder, f"{qr_filename}.{uuid4().hex}.tmp")
+                image.save(tmp_path, format="PNG")
+                os.replace(tmp_path, os.path.join(folder, qr_filename))
+        else:
+            storage.touch(os.path.join(folder, qr_filename))
+        renditions.generate_quietly(os.path.join(folder, qr_filename))
+
+        fields = ("event_id", "headline", "subheadline", "tone", "color_scheme", "font_style", "layout_style")
+        VisualAsset.objects.filter(parent=original, variant="qr").delete()
+        VisualAsset.objects.create(
+            parent=original,
+            variant="qr",
+            image_url=storage.url_for(os.path.join(folder, qr_filename)),
+            **{field: getattr(original, field) for field in fields},
+        )
+        metrics.incr("ai_qr_composites_total", outcome="stored")
+    except Exception:
+        logger.exception("QR compositing failed for visual asset %s", visual_asset_id)
+        metrics.incr("ai_qr_composites_total", outcome="failed")
+    finally:
+        close_old_connections()
@@ -0,0 +1,153 @@
+# Responsive renditions of generated images.
+# Each poster PNG gets downscaled copies (AI_IMAGE_RENDITIONS: name -> width)
+# in modern encodings (AI_IMAGE_FORMATS, those this Pillow build supports),
+# stored next to the original as <name>-<rendition>.<format>. They are made
+# in the background when a poster is saved and, for older images, queued on
+# first request; srcset() maps an image URL to the renditions that exist.
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from uuid import uuid4
+
+from django.conf import settings
+from PIL import Image, features
+
+from ai.services import metrics
+
+logger = logging.getLogger(__name__)
+
+# Encoder options per format
+ENCODERS = {
+    "webp": {"format": "WEBP", "quality": 80, "method": 4},
+    "avif": {"format": "AVIF", "quality": 50, "speed": 6},
+}
+
+_executor = None
+_executor_pid = None
+# Images with renditions queued, so a busy list page queues each one once
+_pending = set()
+_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor, _executor_pid
+
+    with _lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "AI_RENDITION_WORKERS", 1),
+                thread_name_prefix="ai-renditions",
+            )
+            _executor_pid = os.getpid()
+    return _executor
+
+
+def get_formats() -> list:
+    return [fmt for fmt in getattr(settings, "AI_IMAGE_FORMATS", ["avif", "webp"]) if features.check(fmt)]
+
+
+def get_sizes() -> dict:
+    return getattr(settings, "AI_IMAGE_RENDITIONS", {"thumbnail": 256, "card": 512, "full": 1024})
+
+
+def media_path(url: str):
+    # Filesystem path of a MEDIA_URL url, None for anything else
+    if not url or not url.startswith(settings.MEDIA_URL):
+        return None
+    return os.path.join(settings.MEDIA_ROOT, url[len(settings.MEDIA_URL):])
+
+
+def rendition_name(filename: str, size_name: str, fmt: str) -> str:
+    return f"{os.path.splitext(filename)[0]}-{size_name}.{fmt}"
+
+
+def _rendition_path(path, size_name, fmt):
+    return os.path.join(os.path.dirname(path), rendition_name(os.path.basename(path), size_name, fmt))
+
+
+def generate(path: str) -> int:
+    # Writes every missing rendition of the image at path; returns how many were written
+    missing = [
+        (size_name, width, fmt)
+        for size_name, width in get_sizes().items()
+        for fmt in get_formats()
+        if not os.path.exists(_rendition_path(path, size_name, fmt))
+    ]
+    if not missing:
+        return 0
+
+    with metrics.timed("ai_rendition_ms"), Image.open(path) as original:
+        original = original.convert("RGB")
+        for size_name, width, fmt in missing:
+            image = original
+            if original.width > width:
+                # Never upscale: "full" of a smaller image is just re-encoded
+                height = round(original.height * width / original.width)
+                image = original.resize((width, height), Image.LANCZOS)
+
+            target = _rendition_path(path, size_name, fmt)
+            tmp_path = f"{target}.{uuid4().hex}.tmp"
+            image.save(tmp_path, **ENCODERS[fmt])
+            os.replace(tmp_path, target)
+            metrics.incr("ai_renditions_total", format=fmt, size=size_name)
+    return len(missing)
+
+
+def generate_quietly(path):
+    try:
+        generate(path)
+    except Exception:
+        logger.exception("Creating renditions of %s failed", path)
+    finally:
+        with _lock:
+            _pending.discard(path)
+
+
+def schedule(url: str):
+    path = media_path(url)
+    if not path:
+        return
+    with _lock:
+        if path in _pending:
+            return
+        _pending.add(path)
+    get_executor().submit(generate_quietly, path)
+
+
+@lru_cache(maxsize=1024)
+def _width(path, mtime_ns) -> int:
+    with Image.open(path) as image:
+        return image.width
+
+
+def srcset(url: str) -> dict:
+    """
+    {"renditions": {format: {size name: url}}, "srcset": {format: "url 256w, ..."}}
+    for an image URL, listing the renditions that exist. Missing ones are
+    queued for the background executor; until then clients use image_url.
+    """
+    path = media_path(url)
+    if path is None or not os.path.exists(path):
+        return {"renditions": {}, "srcset": {}}
+
+    base_url = url.rsplit("/", 1)[0]
+    renditions = {}
+    sources = {}
+    missing = False
+    for fmt in get_formats():
+        entries = []
+        for size_name, width in get_sizes().items():
+            if not os.path.exists(_rendition_path(path, size_name, fmt)):
+                missing = True
+                continue
+            rendition_url = f"{base_url}/{rendition_name(os.path.basename(path), size_name, fmt)}"
+            renditions.setdefault(fmt, {})[size_name] = rendition_url
+            entries.append(f"{rendition_url} {min(width, _width(path, os.stat(path).st_mtime_ns))}w")
+        if entries:
+            sources[fmt] = ", ".join(entries)
+
+    if missing:
+        schedule(url)
+    return {"renditions": renditions, "srcset": sources}
@@ -0,0 +1,248 @@
+# Retries, deadlines and circuit breakers around provider calls.
+# Every provider has a policy (AI_RESILIENCE setting). A call is retried
+# with full-jitter exponential backoff while it stays inside the deadline
+# budget of the current request; a provider that keeps failing trips its
+# breaker and further calls fail fast until the reset timeout has passed.
+import contextvars
+import random
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+import httpx
+import openai
+from django.conf import settings
+
+from ai.services import metrics
+
+
+class ProviderError(ValueError):
+    status_code = 502
+
+
+class MalformedResponse(ProviderError):
+    status_code = 502
+
+
+class CircuitOpenError(ProviderError):
+    status_code = 503
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(ProviderError):
+    status_code = 504
+
+
+@dataclass
+class Policy:
+    max_attempts: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 8.0
+    deadline: float = 90.0
+    failure_threshold: int = 5
+    reset_timeout: float = 30.0
+
+
+BREAKER_STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+class CircuitBreaker:
+    # Once the reset timeout has passed, one caller (the probe) is let through
+    # while everyone else keeps failing fast; its outcome closes or re-opens
+    # the breaker. A probe that never reports back is replaced after another
+    # reset timeout.
+    def __init__(self, provider, failure_threshold, reset_timeout):
+        self.provider = provider
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe = None
+        self.probe_started = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            now = time.monotonic()
+            if self.state == "open":
+                if now - self.opened_at < self.reset_timeout:
+                    return False
+                self._set_state("half_open")
+            elif self.probe == threading.get_ident():
+                # Retries of the probe call itself
+                return True
+            elif self.probe is not None and now - self.probe_started < self.reset_timeout:
+                return False
+            self.probe = threading.get_ident()
+            self.probe_started = now
+            return True
+
+    def release(self):
+        # The probe ended without saying anything about the provider (bad
+        # request, malformed output, caller's deadline): let another one through
+        with self._lock:
+            if self.probe == threading.get_ident():
+                self.probe = None
+
+    def retry_after(self) -> int:
+        return max(1, int(self.reset_timeout - (time.monotonic() - self.opened_at)) + 1)
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.probe = None
+            if self.state != "closed":
+                self._set_state("closed")
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.probe = None
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                if self.state != "open":
+                    metrics.incr("ai_breaker_opened_total", provider=self.provider)
+                self._set_state("open")
+
+    def _set_state(self, state):
+        self.state = state
+        metrics.set_gauge("ai_breaker_state", BREAKER_STATES[state], provider=self.provider)
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+_deadline = contextvars.ContextVar("ai_deadline", default=None)
+
+
+def get_policy(provider: str) -> Policy:
+    return Policy(**getattr(settings, "AI_RESILIENCE", {}).get(provider, {}))
+
+
+def get_breaker(provider: str) -> CircuitBreaker:
+    with _breakers_lock:
+        breaker = _breakers.get(provider)
+        if breaker is None:
+            policy = get_policy(provider)
+            breaker = CircuitBreaker(provider, policy.failure_threshold, policy.reset_timeout)
+            _breakers[provider] = breaker
+    return breaker
+
+
+@contextmanager
+def deadline(seconds: float):
+    # Total time budget for every provider call made inside the block
+    token = _deadline.set(time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_budget():
+    current = _deadline.get()
+    return None if current is None else current - time.monotonic()
+
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+def is_retryable(exc) -> bool:
+    if isinstance(exc, (MalformedResponse, TimeoutError, ConnectionError, httpx.TransportError,
+                        openai.APIConnectionError)):
+        return True
+    # openai.APIStatusError has status_code, google.api_core errors have code
+    code = getattr(exc, "status_code", None) or getattr(exc, "code", None)
+    try:
+        return int(code) in RETRYABLE_STATUS
+    except (TypeError, ValueError):
+        return False
+
+
+def call(provider: str, fn):
+    """
+    Call fn(timeout) under the provider policy; timeout is the time left in
+    the deadline budget. Provider errors are re-raised as ProviderError.
+    """
+    policy = get_policy(provider)
+    breaker = get_breaker(provider)
+
+    budget = remaining_budget()
+    ends_at = time.monotonic() + (policy.deadline if budget is None else min(budget, policy.deadline))
+
+    for attempt in range(1, policy.max_attempts + 1):
+        if not breaker.allow():
+            metrics.incr("ai_breaker_rejected_total", provider=provider)
+            raise CircuitOpenError(f"{provider} is unavailable, try again later", breaker.retry_after())
+
+        remaining = ends_at - time.monotonic()
+        if remaining <= 0:
+            breaker.release()
+            raise DeadlineExceeded(f"{provider} call exceeded its deadline")
+
+        try:
+            result = fn(remaining)
+        except Exception as e:
+            retryable = is_retryable(e)
+            metrics.incr("ai_provider_errors_total", provider=provider, error=type(e).__name__)
+
+            # Bad output is not an outage; everything else retryable counts against the breaker
+            if retryable and not isinstance(e, MalformedResponse):
+                breaker.record_failure()
+            else:
+                breaker.release()
+            if not retryable or attempt == policy.max_attempts:
+                if isinstance(e, ProviderError):
+                    raise
+                raise ProviderError(f"{provider} request failed: {e}") from e
+
+            delay = random.uniform(0, min(policy.max_delay, policy.base_delay * 2 ** (attempt - 1)))
+            if time.monotonic() + delay >= ends_at:
+                breaker.release()
+                raise DeadlineExceeded(f"{provider} call exceeded its deadline") from e
+
+            metrics.incr("ai_retries_total", provider=provider, error=type(e).__name__)
+            time.sleep(delay)
+            continue
+
+        breaker.record_success()
+        return result
+
+
+def stream(provider: str, chunks):
+    # Streams cannot be retried once data was sent; only the breaker and the
+    # deadline budget (checked between chunks) apply
+    breaker = get_breaker(provider)
+    if not breaker.allow():
+        metrics.incr("ai_breaker_rejected_total", provider=provider)
+        raise CircuitOpenError(f"{provider} is unavailable, try again later", breaker.retry_after())
+
+    try:
+        for chunk in chunks:
+            budget = remaining_budget()
+            if budget is not None and budget <= 0:
+                raise DeadlineExceeded(f"{provider} stream exceeded its deadline")
+            yield chunk
+    except DeadlineExceeded:
+        # The request ran out of time; that says nothing about the provider
+        metrics.incr("ai_provider_errors_total", provider=provider, error="DeadlineExceeded")
+        if hasattr(chunks, "close"):
+            chunks.close()
+        raise
+    except Exception as e:
+        metrics.incr("ai_provider_errors_total", provider=provider, error=type(e).__name__)
+        if is_retryable(e):
+            breaker.record_failure()
+        raise
+    else:
+        breaker.record_success()
+    finally:
+        # No-op unless this stream was the probe and ended without a verdict
+        # (deadline, non-retryable error, client gone)
+        breaker.release()
@@ -0,0 +1,165 @@
+# Model routing per prompt kind.
+# AI_MODEL_ROUTES maps a prompt kind to a tier of AI_MODEL_TIERS; rows of the
+# ModelRoute table override it at runtime (re-read every AI_ROUTES_REFRESH
+# seconds). When the recent p95 latency of a route breaches its SLO, calls
+# fall back to the tier's faster fallback tier. Samples expire after
+# AI_ROUTE_WINDOW seconds, so the primary tier is tried again once its
+# breach has aged out.
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import DatabaseError
+
+from ai.models import ModelRoute
+from ai.services import metrics
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Route:
+    kind: str
+    tier: str
+    model: str
+    primary_tier: str
+
+
+class _LatencyWindow:
+    def __init__(self):
+        self._samples = deque(maxlen=metrics.HISTOGRAM_WINDOW)
+        self._lock = threading.Lock()
+
+    def add(self, value):
+        with self._lock:
+            self._samples.append((time.monotonic(), value))
+
+    def p95(self, window, min_samples):
+        since = time.monotonic() - window
+        with self._lock:
+            values = sorted(value for at, value in self._samples if at >= since)
+        if len(values) < min_samples:
+            return None
+        return round(values[min(len(values) - 1, int(len(values) * 0.95))], 1)
+
+
+_windows = {}
+_overrides = {}
+_overrides_loaded_at = None
+_lock = threading.Lock()
+
+
+def _window(kind, tier) -> _LatencyWindow:
+    with _lock:
+        return _windows.setdefault((kind, tier), _LatencyWindow())
+
+
+def get_tiers() -> dict:
+    return getattr(settings, "AI_MODEL_TIERS", {})
+
+
+def _load_overrides() -> dict:
+    global _overrides, _overrides_loaded_at
+
+    refresh = getattr(settings, "AI_ROUTES_REFRESH", 10)
+    if _overrides_loaded_at is not None and time.monotonic() - _overrides_loaded_at < refresh:
+        return _overrides
+
+    try:
+        _overrides = {
+            row.prompt_kind: row for row in ModelRoute.objects.filter(enabled=True, tier__in=get_tiers())
+        }
+    except DatabaseError:
+        # Keep routing on the last known overrides
+        logger.exception("Loading model routes failed")
+    _overrides_loaded_at = time.monotonic()
+    return _overrides
+
+
+def invalidate():
+    global _overrides_loaded_at
+    _overrides_loaded_at = None
+
+
+def get_routes() -> dict:
+    # Prompt kind -> configured route, settings first, then database overrides
+    default_tier = getattr(settings, "AI_DEFAULT_MODEL_TIER", "standard")
+    routes = {}
+    for kind, route in getattr(settings, "AI_MODEL_ROUTES", {}).items():
+        routes[kind] = {"tier": route.get("tier", default_tier), "slo_p95_ms": route.get("slo_p95_ms"),
+                        "source": "settings"}
+
+    for kind, row in _load_overrides().items():
+        slo = row.slo_p95_ms if row.slo_p95_ms is not None else routes.get(kind, {}).get("slo_p95_ms")
+        routes[kind] = {"tier": row.tier, "slo_p95_ms": slo, "source": "database"}
+    return routes
+
+
+def recent_p95(kind, tier):
+    return _window(kind, tier).p95(
+        getattr(settings, "AI_ROUTE_WINDOW", 300),
+        getattr(settings, "AI_ROUTE_MIN_SAMPLES", 20),
+    )
+
+
+def _resolve(kind):
+    # Returns (primary tier, chosen tier, [(tier, fallback), ...] hops taken)
+    tiers = get_tiers()
+    default_tier = getattr(settings, "AI_DEFAULT_MODEL_TIER", "standard")
+    route = get_routes().get(kind, {"tier": default_tier, "slo_p95_ms": None})
+
+    primary = route["tier"] if route["tier"] in tiers else default_tier
+    tier = primary
+    slo = route["slo_p95_ms"]
+    hops = []
+
+    while slo:
+        fallback = tiers[tier].get("fallback")
+        p95 = recent_p95(kind, tier)
+        if fallback is None or fallback == primary or p95 is None or p95 <= slo:
+            break
+        hops.append((tier, fallback))
+        if len(hops) >= len(tiers):
+            break
+        tier = fallback
+
+    return primary, tier, hops
+
+
+def choose(kind: str) -> Route:
+    primary, tier, hops = _resolve(kind)
+    for slow, fallback in hops:
+        metrics.incr("ai_route_fallback_total", kind=kind, tier=slow, fallback=fallback)
+    return Route(kind=kind, tier=tier, model=get_tiers()[tier]["model"], primary_tier=primary)
+
+
+def record(route: Route, elapsed_ms: float, usage=None):
+    _window(route.kind, route.tier).add(elapsed_ms)
+    labels = {"kind": route.kind, "tier": route.tier, "model": route.model}
+    metrics.observe("ai_route_latency_ms", elapsed_ms, **labels)
+    for name in ("input_tokens", "output_tokens", "cached_tokens"):
+        if usage and usage.get(name) is not None:
+            metrics.observe(f"ai_route_{name}", usage[name], **labels)
+
+    # Input tokens served from the prompt prefix cache, per prompt kind
+    if usage and usage.get("input_tokens"):
+        metrics.incr("ai_prompt_input_tokens_total", usage["input_tokens"], kind=route.kind)
+        metrics.incr("ai_prompt_cached_tokens_total", usage.get("cached_tokens") or 0, kind=route.kind)
+
+
+def describe() -> dict:
+    # Configured routes with the tier currently chosen and recent p95 per tier
+    tiers = get_tiers()
+    result = {}
+    for kind, route in get_routes().items():
+        _, tier, _ = _resolve(kind)
+        result[kind] = dict(
+            route,
+            active_tier=tier,
+            active_model=tiers[tier]["model"],
+            recent_p95_ms={name: recent_p95(kind, name) for name in tiers},
+        )
+    return {"tiers": tiers, "routes": result}
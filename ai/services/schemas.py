@@ -0,0 +1,267 @@
+# Structured output for JSON-producing generations.
+# Each prompt kind has a response schema. It is sent to Gemini as
+# response_schema (together with response_mime_type) so the model is
+# constrained to it, and every answer is validated locally against it.
+# A response that does not parse is first repaired locally (Markdown fences,
+# trailing commas, truncated arrays/strings); only a response that cannot be
+# repaired into a valid document is regenerated.
+import json
+import re
+
+from ai.services import metrics
+from ai.services.resilience import MalformedResponse
+
+
+def _object(properties, required=None):
+    schema = {"type": "object", "properties": properties}
+    if required:
+        schema["required"] = required
+    return schema
+
+
+def _list(items, min_items=None, max_items=None):
+    schema = {"type": "array", "items": items}
+    if min_items:
+        schema["min_items"] = min_items
+    if max_items:
+        schema["max_items"] = max_items
+    return schema
+
+
+STRING = {"type": "string"}
+INTEGER = {"type": "integer"}
+BOOLEAN = {"type": "boolean"}
+
+
+# Prompt kind -> response schema (the OpenAPI subset Gemini accepts)
+SCHEMAS = {
+    "event": _object({
+        "name": _list(STRING, min_items=1),
+        "description": STRING,
+        "expected_attendees": INTEGER,
+        "suggested_time": STRING,
+        "suggested_event_duration": STRING,
+        "slogan": _list(STRING, min_items=1),
+    }, required=["name", "description", "expected_attendees", "slogan"]),
+
+    # TaskAssignment.start_time / end_time are NOT NULL
+    "task_assignment": _object({
+        "task_summary_by_role": _list(_object({
+            "role": STRING,
+            "description": STRING,
+            "count": INTEGER,
+            "start_time": STRING,
+            "end_time": STRING,
+        }, required=["role", "description", "count", "start_time", "end_time"]), min_items=1),
+        "note": STRING,
+    }, required=["task_summary_by_role"]),
+
+    "venue_suggestion": _object({
+        "venue_suggestions": _list(_object({
+            "name": STRING,
+            "capacity": INTEGER,
+            "transportation_score": INTEGER,
+            "is_outdoor": BOOLEAN,
+        }, required=["name"]), min_items=1),
+    }, required=["venue_suggestions"]),
+
+    # One Registration per event, see Registration.objects.get(event_id=...)
+    "registration_form": _object({
+        "registration-list": _list(_object({
+            "event_intro": STRING,
+            "form_title": STRING,
+            "form_fields": _list(_object({
+                "registration_name": STRING,
+                "description": STRING,
+                "type": STRING,
+                "required": BOOLEAN,
+            }, required=["registration_name"])),
+        }, required=["form_title", "form_fields"]), min_items=1, max_items=1),
+    }, required=["registration-list"]),
+
+    "invitation": _object({
+        "invitation_list": _list(_object({
+            "invitation_letter_subject": STRING,
+            "invitation_letter_body": STRING,
+        }, required=["invitation_letter_subject", "invitation_letter_body"]), min_items=1),
+    }, required=["invitation_list"]),
+
+    "social_post": _object({
+        "post_list": _list(_object({
+            "content": STRING,
+            "hashtag": _list(STRING),
+        }, required=["content"]), min_items=1),
+    }, required=["post_list"]),
+
+    "poster_copy": _object({
+        "headline": STRING,
+        "subheadline": STRING,
+    }, required=["headline", "subheadline"]),
+}
+
+# candidates=N: N variants of one post / one poster copy in a single response
+SCHEMAS["social_post_candidates"] = _object({
+    "candidates": _list(SCHEMAS["social_post"]["properties"]["post_list"]["items"], min_items=1),
+}, required=["candidates"])
+SCHEMAS["poster_copy_candidates"] = _object({
+    "candidates": _list(SCHEMAS["poster_copy"], min_items=1),
+}, required=["candidates"])
+
+
+def generation_config(prompt_kind: str):
+    schema = SCHEMAS.get(prompt_kind)
+    if schema is None:
+        return None
+    return {"response_mime_type": "application/json", "response_schema": schema}
+
+
+def validate(value, schema, path="$") -> list:
+    # Returns a list of "path: problem" strings, empty when value is valid
+    kind = schema.get("type")
+    if value is None:
+        return [] if schema.get("nullable") else [f"{path}: missing value"]
+
+    if kind == "object":
+        if not isinstance(value, dict):
+            return [f"{path}: expected an object"]
+        errors = [f"{path}.{key}: required" for key in schema.get("required", []) if key not in value]
+        for key, subschema in schema.get("properties", {}).items():
+            if key in value:
+                errors += validate(value[key], subschema, f"{path}.{key}")
+        return errors
+
+    if kind == "array":
+        if not isinstance(value, list):
+            return [f"{path}: expected an array"]
+        errors = []
+        if len(value) < schema.get("min_items", 0):
+            errors.append(f"{path}: expected at least {schema['min_items']} items")
+        if len(value) > schema.get("max_items", len(value)):
+            errors.append(f"{path}: expected at most {schema['max_items']} items")
+        for idx, item in enumerate(value):
+            errors += validate(item, schema["items"], f"{path}[{idx}]")
+        return errors
+
+    if kind == "integer":
+        # Models sometimes answer 80.0 for 80
+        ok = not isinstance(value, bool) and (isinstance(value, int) or
+                                              (isinstance(value, float) and value.is_integer()))
+        return [] if ok else [f"{path}: expected an integer"]
+    if kind == "number":
+        ok = isinstance(value, (int, float)) and not isinstance(value, bool)
+        return [] if ok else [f"{path}: expected a number"]
+    if kind == "boolean":
+        return [] if isinstance(value, bool) else [f"{path}: expected a boolean"]
+    if kind == "string":
+        return [] if isinstance(value, str) else [f"{path}: expected a string"]
+    return []
+
+
+def prune(value, schema):
+    # Drop array items that fail validation (typically the item a truncated
+    # response was cut off in), keeping everything that is complete
+    if schema.get("type") == "object" and isinstance(value, dict):
+        for key, subschema in schema.get("properties", {}).items():
+            if key in value:
+                value[key] = prune(value[key], subschema)
+    elif schema.get("type") == "array" and isinstance(value, list):
+        value = [prune(item, schema["items"]) for item in value if not validate(item, schema["items"])]
+    return value
+
+
+def repair_json(text: str):
+    """
+    Tolerant JSON parser for model output: ignores Markdown fences and text
+    around the document, drops trailing commas and closes a truncated
+    document after its last complete value. Raises ValueError if nothing
+    usable is left.
+    """
+    text = re.sub(r"^```(?:json)?\s*|\s*```$", "", text.strip(), flags=re.MULTILINE)
+    starts = [idx for idx in (text.find("{"), text.find("[")) if idx >= 0]
+    if not starts:
+        raise ValueError("No JSON document in response")
+    text = text[min(starts):]
+
+    out = []
+    stack = []
+    in_string = escaped = False
+    # Length of out and open containers after the last complete value
+    safe = (0, [])
+
+    for ch in text:
+        if in_string:
+            out.append(ch)
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            continue
+
+        if ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+            out.append(ch)
+            safe = (len(out), list(stack))
+            continue
+        elif ch in "}]":
+            if not stack:
+                break
+            _drop_trailing_comma(out)
+            out.append(stack.pop())
+            if not stack:
+                break
+            safe = (len(out), list(stack))
+            continue
+        elif ch == ",":
+            safe = (len(out), list(stack))
+        out.append(ch)
+
+    if stack:
+        length, open_containers = safe
+        out = out[:length]
+        _drop_trailing_comma(out)
+        out.extend(reversed(open_containers))
+
+    try:
+        return json.loads("".join(out))
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Response could not be repaired: {e}")
+
+
+def _drop_trailing_comma(out):
+    while out and out[-1].isspace():
+        out.pop()
+    if out and out[-1] == ",":
+        out.pop()
+
+
+def parse(prompt_kind: str, text: str):
+    """
+    Parse and validate a model response. Raises MalformedResponse (which
+    makes the caller regenerate) when it cannot be turned into a valid one.
+    """
+    schema = SCHEMAS.get(prompt_kind, {})
+    repaired = False
+    try:
+        value = json.loads(text)
+    except json.JSONDecodeError:
+        try:
+            value = repair_json(text)
+        except ValueError as e:
+            metrics.incr("ai_structured_output_total", kind=prompt_kind, outcome="rejected")
+            raise MalformedResponse(f"Response is not valid JSON:\n{text}\nError: {e}")
+        repaired = True
+
+    errors = validate(value, schema)
+    if errors and repaired:
+        value = prune(value, schema)
+        errors = validate(value, schema)
+    if errors:
+        metrics.incr("ai_structured_output_total", kind=prompt_kind, outcome="rejected")
+        raise MalformedResponse(f"Response does not match the {prompt_kind} schema: {'; '.join(errors[:5])}")
+
+    metrics.incr("ai_structured_output_total", kind=prompt_kind, outcome="repaired" if repaired else "ok")
+    return value
@@ -0,0 +1,221 @@
+# Semantic near-duplicate cache.
+# Requests whose free-text fields mean the same thing ("tech meetup for
+# students" / "student tech meetup") reuse an earlier generation. Payloads
+# are normalized and embedded with feature hashing (word and character
+# trigram features, no model needed); the vectors live in a memory-mapped
+# NumPy array shared by every worker process, one row per slot of the
+# SemanticCacheEntry table that holds the results. Fields listed as "exact"
+# (e.g. date and budget) must match exactly, so they are not embedded but
+# partition the entries instead.
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, transaction
+from django.utils import timezone
+
+from ai.models import SemanticCacheEntry
+from ai.services import metrics
+from ai.services.cache import get_ttl
+
+logger = logging.getLogger(__name__)
+
+STOPWORDS = {"a", "an", "and", "the", "for", "of", "to", "in", "on", "at", "with", "by", "or", "from"}
+
+_vectors = None
+_vectors_pid = None
+_lookups = {}
+_lock = threading.Lock()
+
+
+def get_config(prompt_kind: str):
+    return getattr(settings, "AI_SEMANTIC_CACHE", {}).get(prompt_kind)
+
+
+def _dimensions():
+    return getattr(settings, "AI_SEMANTIC_DIMENSIONS", 512)
+
+
+def _capacity():
+    return getattr(settings, "AI_SEMANTIC_CAPACITY", 50000)
+
+
+def _get_vectors():
+    # (capacity x dimensions) float32 array backed by AI_SEMANTIC_CACHE_PATH
+    global _vectors, _vectors_pid
+
+    with _lock:
+        if _vectors is None or _vectors_pid != os.getpid():
+            path = getattr(settings, "AI_SEMANTIC_CACHE_PATH")
+            shape = (_capacity(), _dimensions())
+            vectors = None
+            if os.path.exists(path):
+                try:
+                    vectors = np.load(path, mmap_mode="r+")
+                except (OSError, ValueError):
+                    logger.exception("Semantic cache vectors at %s are unreadable, starting over", path)
+                if vectors is None or vectors.shape != shape or vectors.dtype != np.float32:
+                    # Settings changed (or the file is damaged): the stored vectors no longer fit
+                    vectors = None
+                    SemanticCacheEntry.objects.all().delete()
+            if vectors is None:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                vectors = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=shape)
+            _vectors = vectors
+            _vectors_pid = os.getpid()
+    return _vectors
+
+
+def _count(prompt_kind, outcome):
+    metrics.incr("ai_semantic_cache_lookups_total", kind=prompt_kind, outcome=outcome)
+    with _lock:
+        hits, total = _lookups.get(prompt_kind, (0, 0))
+        hits, total = hits + (outcome == "hit"), total + 1
+        _lookups[prompt_kind] = (hits, total)
+    metrics.set_gauge("ai_semantic_cache_hit_rate", round(hits / total, 4), kind=prompt_kind)
+
+
+def _tokens(text: str):
+    tokens = []
+    for word in re.findall(r"\w+", text.lower()):
+        if word in STOPWORDS:
+            continue
+        # Cheap plural folding: "students" and "student" are the same feature
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+
+def _feature_index(feature: str, dimensions: int):
+    digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+    value = int.from_bytes(digest, "big")
+    return value % dimensions, 1.0 if value >> 63 else -1.0
+
+
+def embed(payload: dict, fields, dimensions=None) -> np.ndarray:
+    dimensions = dimensions or _dimensions()
+    vector = np.zeros(dimensions, dtype=np.float32)
+    for field in fields:
+        for token in _tokens(str(payload.get(field) or "")):
+            index, sign = _feature_index(f"{field}:{token}", dimensions)
+            vector[index] += sign
+            # Character trigrams catch spelling variants and CJK text
+            padded = f"#{token}#"
+            for i in range(len(padded) - 2):
+                index, sign = _feature_index(f"{field}#{padded[i:i + 3]}", dimensions)
+                vector[index] += 0.3 * sign
+
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def constraint_key(prompt_kind: str, payload: dict, exact_fields) -> str:
+    values = [str(payload.get(field, "")).strip().lower() for field in exact_fields]
+    return hashlib.sha256(json.dumps([prompt_kind, values]).encode("utf-8")).hexdigest()
+
+
+def lookup(prompt_kind: str, payload: dict):
+    """
+    Earlier result for a payload similar to this one, as (result, similarity),
+    or None when nothing is above the threshold of the prompt kind.
+    """
+    config = get_config(prompt_kind)
+    if not config:
+        return None
+
+    try:
+        ttl = config.get("ttl", get_ttl(prompt_kind))
+        candidates = list(
+            SemanticCacheEntry.objects.filter(
+                prompt_kind=prompt_kind,
+                constraint_key=constraint_key(prompt_kind, payload, config.get("exact", [])),
+                created_at__gt=timezone.now() - timedelta(seconds=ttl),
+            ).values_list("slot", "id")
+        )
+        if not candidates:
+            _count(prompt_kind, "miss")
+            return None
+
+        query = embed(payload, config["fields"])
+        slots = np.fromiter((slot for slot, _ in candidates), dtype=np.int64, count=len(candidates))
+        # Rows are unit vectors, so the dot product is the cosine similarity
+        similarities = _get_vectors()[slots] @ query
+        best = int(np.argmax(similarities))
+        similarity = float(similarities[best])
+        metrics.observe("ai_semantic_similarity", similarity, kind=prompt_kind)
+
+        if similarity < config.get("threshold", 0.9):
+            _count(prompt_kind, "miss")
+            return None
+
+        entry = SemanticCacheEntry.objects.filter(id=candidates[best][1]).first()
+    except (DatabaseError, OSError, ValueError):
+        logger.exception("Semantic cache lookup failed")
+        return None
+
+    if entry is None:
+        return None
+    _count(prompt_kind, "hit")
+    return entry.result, round(similarity, 4)
+
+
+def _claim_slot(capacity):
+    # Reserves a slot and returns it. The row is written with an empty
+    # constraint_key, which no lookup matches, until its vector is in place.
+    now = timezone.now()
+    for _ in range(3):
+        used = SemanticCacheEntry.objects.count()
+        if used >= capacity:
+            break
+        try:
+            with transaction.atomic():
+                SemanticCacheEntry.objects.create(
+                    slot=used, prompt_kind="", constraint_key="", result={}, created_at=now,
+                )
+            return used
+        except IntegrityError:
+            # Another worker took this slot first; count again
+            continue
+
+    # Full: take over the oldest entry no other worker is claiming right now
+    with transaction.atomic():
+        entry = (
+            SemanticCacheEntry.objects.select_for_update(skip_locked=True)
+            .order_by("created_at").only("id", "slot").first()
+        )
+        if entry is None:
+            return None
+        SemanticCacheEntry.objects.filter(id=entry.id).update(prompt_kind="", constraint_key="", created_at=now)
+    return entry.slot
+
+
+def store(prompt_kind: str, payload: dict, result):
+    config = get_config(prompt_kind)
+    if not config:
+        return
+
+    # The generation already succeeded: a cache failure is logged, never raised
+    try:
+        vectors = _get_vectors()
+        slot = _claim_slot(_capacity())
+        if slot is None:
+            return
+
+        vectors[slot] = embed(payload, config["fields"])
+        vectors.flush()
+
+        SemanticCacheEntry.objects.filter(slot=slot).update(
+            prompt_kind=prompt_kind,
+            constraint_key=constraint_key(prompt_kind, payload, config.get("exact", [])),
+            result=result,
+            created_at=timezone.now(),
+        )
+    except (DatabaseError, OSError, ValueError):
+        logger.exception("Semantic cache write failed")
@@ -1,113 +1,173 @@
-import os
-import re
 import json
-from google import genai
-from dotenv import load_dotenv
-import openai
-import google.generativeai as genai
-from ai.prompt.promt import (
-    get_event_generation_prompt,get_task_assignment_generation_prompt,
-    get_venue_suggestion_generation_prompt,get_registration_form_generation_prompt,
-    get_invitation_generation_prompt,get_social_post_generation_prompt,
-    get_poster_copy_generation_prompt,get_poster_image_prompt
-)
-
-load_dotenv()
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-openai.api_key = os.getenv("OPENAI_API_KEY")  
-
-
-# Remove possible Markdown code block
-def parse_gemini_response(text: str) -> dict:
-    cleaned_text = re.sub(r"^```json\s*|\s*```$", "", text.strip(), flags=re.MULTILINE)
-    return json.loads(cleaned_text)
-    
-def generate_event_from_gemini(event_data: dict) -> dict:
-    prompt = get_event_generation_prompt(event_data)
-
-    model = genai.GenerativeModel("gemini-2.0-flash")
-    response = model.generate_content(prompt)
+import time
+from django.conf import settings
+from ai.services import cache, lanes, metrics, resilience, routing, schemas, semantic_cache
+from ai.services.clients import get_image_client, get_text_client
+from ai.prompt.promt import PROMPT_TEMPLATES
+
+
+def get_timeout(prompt_kind: str, default_setting: str, default: float):
+    timeouts = getattr(settings, "AI_TIMEOUTS", {})
+    return timeouts.get(prompt_kind, getattr(settings, default_setting, default))
+
+
+# Parse, repair and validate a response against the schema of its prompt kind
+def parse_gemini_response(text: str, prompt_kind: str) -> dict:
+    return schemas.parse(prompt_kind, text)
+
+
+# Single entry point for every JSON-producing generation
+def generate_json(prompt_kind: str, payload: dict, timeout=None, use_cache=True, trace=None) -> dict:
+    # The static prefix goes to the provider as a system instruction (context
+    # cached when long enough), the per-event user section as the prompt
+    template = PROMPT_TEMPLATES[prompt_kind]
+    prompt = template.user(payload).strip()
+    route = routing.choose(prompt_kind)
+    model = route.model
+    config = schemas.generation_config(prompt_kind)
+
+    cache_key = cache.make_key(template.render(payload), model, config)
+    if use_cache:
+        source = "cache"
+        cached = cache.lookup(cache_key, prompt_kind)
+        if cached is None:
+            # Near-duplicate inputs (same date and budget, similar wording)
+            source = "semantic_cache"
+            hit = semantic_cache.lookup(prompt_kind, payload)
+            cached = hit[0] if hit else None
+        if cached is not None:
+            if trace is not None:
+                trace["source"] = source
+            return cached
+
+    if trace is not None:
+        trace["source"] = "model"
+    client = get_text_client()
+    timeout = timeout or get_timeout(prompt_kind, "AI_TEXT_TIMEOUT", 60)
+    attempts = []
+
+    # A response that cannot be repaired is regenerated like a transient provider error
+    def attempt(remaining):
+        attempts.append(remaining)
+        usage = {}
+        started = time.monotonic()
+        try:
+            with metrics.timed("ai_provider_latency_ms", provider=client.name, kind=prompt_kind):
+                text = client.generate_text(prompt, model=model, timeout=min(timeout, remaining),
+                                            generation_config=config, usage=usage,
+                                            system_instruction=template.system)
+        finally:
+            # Failed calls (mostly timeouts) count towards the route latency too
+            routing.record(route, (time.monotonic() - started) * 1000, usage)
+        return parse_gemini_response(text, prompt_kind)
+
+    with lanes.slot():
+        result = resilience.call(client.name, attempt)
+    if len(attempts) > 1:
+        metrics.incr("ai_structured_output_total", kind=prompt_kind, outcome="regenerated")
+
+    # Refreshed results replace the cached entry as well
+    cache.store(cache_key, prompt_kind, model, result)
+    semantic_cache.store(prompt_kind, payload, result)
+    return result
+
+
+# Streaming variant of generate_json: yields raw text chunks as they arrive
+def stream_json(prompt_kind: str, payload: dict, timeout=None, use_cache=True):
+    # The static prefix goes to the provider as a system instruction (context
+    # cached when long enough), the per-event user section as the prompt
+    template = PROMPT_TEMPLATES[prompt_kind]
+    prompt = template.user(payload).strip()
+    route = routing.choose(prompt_kind)
+    model = route.model
+    config = schemas.generation_config(prompt_kind)
+
+    cache_key = cache.make_key(template.render(payload), model, config)
+    if use_cache:
+        cached = cache.lookup(cache_key, prompt_kind)
+        if cached is None:
+            hit = semantic_cache.lookup(prompt_kind, payload)
+            cached = hit[0] if hit else None
+        if cached is not None:
+            yield json.dumps(cached, ensure_ascii=False)
+            return
+
+    client = get_text_client()
+    started = time.monotonic()
+    chunks = []
+    usage = {}
+    timeout = timeout or get_timeout(prompt_kind, "AI_TEXT_TIMEOUT", 60)
+    budget = resilience.remaining_budget()
+    if budget is not None:
+        timeout = max(min(timeout, budget), 1)
+    with lanes.slot():
+        for text in resilience.stream(client.name, client.stream_text(
+            prompt,
+            model=model,
+            timeout=timeout,
+            generation_config=config,
+            usage=usage,
+            system_instruction=template.system,
+        )):
+            if not chunks:
+                metrics.observe("ai_stream_first_chunk_ms", (time.monotonic() - started) * 1000,
+                                provider=client.name, kind=prompt_kind)
+            chunks.append(text)
+            yield text
+    elapsed_ms = (time.monotonic() - started) * 1000
+    metrics.observe("ai_provider_latency_ms", elapsed_ms, provider=client.name, kind=prompt_kind)
+    routing.record(route, elapsed_ms, usage)
 
     try:
-        result = parse_gemini_response(response.text)
-    except json.JSONDecodeError as e:
-        raise ValueError(f"Response is not valid JSON:\n{response.text}\nError: {e}")
+        result = parse_gemini_response("".join(chunks), prompt_kind)
+        cache.store(cache_key, prompt_kind, model, result)
+        semantic_cache.store(prompt_kind, payload, result)
+    except resilience.MalformedResponse:
+        # The caller reports the invalid JSON when it parses the full text
+        pass
 
-    return result
 
-def generate_task_assignment_from_gemini(event_data: dict) -> dict:
-    prompt = get_task_assignment_generation_prompt(event_data)
-    model = genai.GenerativeModel("gemini-2.0-flash")
-    response = model.generate_content(prompt)
+def generate_image(prompt_kind: str, payload: dict, timeout=None) -> str:
+    prompt = PROMPT_TEMPLATES[prompt_kind].render(payload)
+    client = get_image_client()
+    model = getattr(settings, "AI_IMAGE_MODEL", "dall-e-3")
 
-    try:
-        return parse_gemini_response(response.text)
-    except json.JSONDecodeError as e:
-        raise ValueError(f"Response is not valid JSON:\n{response.text}\nError: {e}")
-    
+    timeout = timeout or get_timeout(prompt_kind, "AI_IMAGE_TIMEOUT", 120)
 
-def generate_venue_suggestion_from_gemini(event_data: dict) -> dict:
-    prompt = get_venue_suggestion_generation_prompt(event_data)
-    model = genai.GenerativeModel("gemini-2.0-flash")
-    response = model.generate_content(prompt)
+    def attempt(remaining):
+        with metrics.timed("ai_provider_latency_ms", provider=client.name, kind=prompt_kind):
+            return client.generate_image(prompt, model=model, timeout=min(timeout, remaining))
 
-    try:
-        return parse_gemini_response(response.text)
-    except json.JSONDecodeError as e:
-        raise ValueError(f"Response is not valid JSON:\n{response.text}\nError: {e}")
+    with lanes.slot():
+        return resilience.call(client.name, attempt)
 
-def generate_registration_form_from_gemini(event_data: dict) -> dict:
-    prompt = get_registration_form_generation_prompt(event_data)
-    model = genai.GenerativeModel("gemini-2.0-flash")
-    response = model.generate_content(prompt)
 
-    try:
-        return parse_gemini_response(response.text)
-    except json.JSONDecodeError as e:
-        raise ValueError(f"Response is not valid JSON:\n{response.text}\nError: {e}")
-    
-def generate_invitation_from_gemini(event_data: dict) -> dict:
-    prompt = get_invitation_generation_prompt(event_data)
-    model = genai.GenerativeModel("gemini-2.0-flash")
-    response = model.generate_content(prompt)
+def generate_event_from_gemini(event_data: dict, **options) -> dict:
+    return generate_json("event", event_data, **options)
 
-    try:
-        return parse_gemini_response(response.text)
-    except json.JSONDecodeError as e:
-        raise ValueError(f"Response is not valid JSON:\n{response.text}\nError: {e}")
-    
+def stream_event_from_gemini(event_data: dict, **options):
+    return stream_json("event", event_data, **options)
 
-def generate_social_post_gemini(event_data: dict) -> dict:
-    prompt = get_social_post_generation_prompt(event_data)
-    model = genai.GenerativeModel("gemini-2.0-flash")
-    response = model.generate_content(prompt)
+def generate_task_assignment_from_gemini(event_data: dict, **options) -> dict:
+    return generate_json("task_assignment", event_data, **options)
 
-    try:
-        return parse_gemini_response(response.text)
-    except json.JSONDecodeError as e:
-        raise ValueError(f"Response is not valid JSON:\n{response.text}\nError: {e}")
-    
+def generate_venue_suggestion_from_gemini(event_data: dict, **options) -> dict:
+    return generate_json("venue_suggestion", event_data, **options)
 
-def generate_poster_text_gemini(event_data: dict) -> dict:
-    prompt = get_poster_copy_generation_prompt(event_data)
-    model = genai.GenerativeModel("gemini-2.0-flash") 
-    response = model.generate_content(prompt)
+def generate_registration_form_from_gemini(event_data: dict, **options) -> dict:
+    return generate_json("registration_form", event_data, **options)
 
-    try:
-        return parse_gemini_response(response.text)
-    except json.JSONDecodeError as e:
-        raise ValueError(f"Response is not valid JSON:\n{response.text}\nError: {e}")
+def generate_invitation_from_gemini(event_data: dict, **options) -> dict:
+    return generate_json("invitation", event_data, **options)
 
+def generate_social_post_gemini(event_data: dict, **options) -> dict:
+    return generate_json("social_post", event_data, **options)
 
-def generate_poster_image_openai(event_data: dict) -> str:
-    prompt = get_poster_image_prompt(event_data) 
+def stream_social_post_gemini(event_data: dict, **options):
+    return stream_json("social_post", event_data, **options)
 
-    response = openai.Image.create(
-        prompt=prompt,
-        model="dall-e-3",
-        n=1,
-        size="1024x1024",
-        response_format="b64_json"
-    )
+def generate_poster_text_gemini(event_data: dict, **options) -> dict:
+    return generate_json("poster_copy", event_data, **options)
 
-    return response['data'][0]['b64_json']
\ No newline at end of file
+def generate_poster_image_openai(event_data: dict, **options) -> str:
+    return generate_image("poster_image", event_data, **options)
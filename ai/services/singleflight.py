@@ -0,0 +1,135 @@
+# Single-flight coalescing of identical concurrent generations.
+# Inside a worker, concurrent callers with the same key wait for the first
+# one (the leader) and share its result. Across gunicorn workers the leader
+# takes a PostgreSQL advisory lock on the key; a worker that was waiting on
+# the lock reuses the result the previous holder stored in CoalescedResult
+# instead of calling the model and writing the same rows again. Followers
+# wait no longer than the deadline budget of their own request; one that runs
+# out answers 503 instead of holding its thread and connection.
+import copy
+import hashlib
+import json
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from ai.models import CoalescedResult
+from ai.services import metrics, resilience
+
+# Seconds between attempts to take the advisory lock
+LOCK_POLL = 0.1
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+_calls = {}
+_lock = threading.Lock()
+
+
+def _normalize(value):
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+def _wait_budget():
+    budget = resilience.remaining_budget()
+    if budget is None:
+        budget = getattr(settings, "AI_REQUEST_DEADLINE", 90)
+    return max(budget, 0)
+
+
+def _busy(label):
+    metrics.incr("ai_coalesce_timeouts_total", endpoint=label)
+    retry_after = getattr(settings, "AI_COALESCE_RETRY_AFTER", 5)
+    return ({"error": "An identical generation is still running, try again later",
+             "retry_after": retry_after}, 503), None
+
+
+def make_key(endpoint: str, scope, data: dict, options=None) -> str:
+    raw = json.dumps([endpoint, scope, _normalize(data), options or {}], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def do(key: str, fn, label: str):
+    """
+    Run fn() once for all concurrent callers of key.
+    Returns (result, shared) where shared is None for the caller that ran
+    fn, "local" for callers in the same worker and "db" for a result
+    produced by another worker.
+    """
+    with _lock:
+        call = _calls.get(key)
+        leader = call is None
+        if leader:
+            call = _Call()
+            _calls[key] = call
+
+    if not leader:
+        metrics.incr("ai_coalesced_requests_total", endpoint=label, scope="local")
+        if not call.done.wait(_wait_budget()):
+            return _busy(label)
+        if call.error is not None:
+            raise call.error
+        result, shared = call.result
+        return copy.deepcopy(result), shared or "local"
+
+    try:
+        call.result = _run_across_workers(key, fn, label)
+        return call.result
+    except Exception as e:
+        call.error = e
+        raise
+    finally:
+        with _lock:
+            _calls.pop(key, None)
+        call.done.set()
+
+
+def _run_across_workers(key, fn, label):
+    if connection.vendor != "postgresql":
+        return fn(), None
+
+    lock_id = int.from_bytes(bytes.fromhex(key[:16]), "big", signed=True)
+    waiting_since = timezone.now()
+
+    give_up_at = time.monotonic() + _wait_budget()
+    with connection.cursor() as cursor:
+        while True:
+            cursor.execute("SELECT pg_try_advisory_lock(%s)", [lock_id])
+            if cursor.fetchone()[0]:
+                break
+            if time.monotonic() + LOCK_POLL > give_up_at:
+                return _busy(label)
+            time.sleep(LOCK_POLL)
+    try:
+        shared = CoalescedResult.objects.filter(key=key, created_at__gte=waiting_since).first()
+        if shared is not None:
+            metrics.incr("ai_coalesced_requests_total", endpoint=label, scope="db")
+            return (shared.body, shared.status_code), "db"
+
+        body, code = fn()
+
+        now = timezone.now()
+        CoalescedResult.objects.update_or_create(
+            key=key, defaults={"body": body, "status_code": code, "created_at": now}
+        )
+        keep = timedelta(seconds=getattr(settings, "AI_COALESCE_RESULT_TTL", 300))
+        CoalescedResult.objects.filter(created_at__lt=now - keep).delete()
+        return (body, code), None
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_unlock(%s)", [lock_id])
@@ -0,0 +1,171 @@
+# Speculative pre-generation.
+# Right after an event is created (opt-in: AI_SPECULATIVE_GENERATION or
+# "speculate": true in the request) the task and venue generations the user
+# is about to ask for are started in the background and kept as
+# GenerationDraft rows. The generate-* views claim a draft whose input hash
+# still matches instead of calling the model again.
+# Speculative work runs on its own small thread pool, yields to interactive
+# requests, has a tighter deadline and can be cancelled at any time; a
+# cancelled draft that is already running has its result discarded.
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from ai.models import GenerationDraft
+from ai.services import lanes, metrics, resilience
+from ai.services.services import generate_json
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_pid = None
+_interactive = 0
+_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor, _executor_pid
+
+    with _lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "AI_SPECULATIVE_WORKERS", 1),
+                thread_name_prefix="ai-speculative",
+            )
+            _executor_pid = os.getpid()
+    return _executor
+
+
+@contextmanager
+def interactive():
+    # Marks an interactive generation in flight; speculative work waits for these
+    global _interactive
+    with _lock:
+        _interactive += 1
+    try:
+        yield
+    finally:
+        with _lock:
+            _interactive -= 1
+
+
+def input_hash(prompt_kind: str, payload: dict) -> str:
+    raw = json.dumps([prompt_kind, payload], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def schedule(event_id, prompt_kind: str, payload: dict):
+    in_flight = GenerationDraft.objects.filter(status__in=("pending", "running")).count()
+    if in_flight >= getattr(settings, "AI_SPECULATIVE_MAX_PENDING", 20):
+        metrics.incr("ai_speculative_dropped_total", kind=prompt_kind)
+        return None
+
+    draft, _ = GenerationDraft.objects.update_or_create(
+        event_id=event_id,
+        prompt_kind=prompt_kind,
+        defaults={
+            "input_hash": input_hash(prompt_kind, payload),
+            "status": "pending",
+            "result": None,
+            "error": "",
+            "created_at": timezone.now(),
+            "started_at": None,
+            "finished_at": None,
+        },
+    )
+    metrics.incr("ai_speculative_scheduled_total", kind=prompt_kind)
+    transaction.on_commit(lambda: get_executor().submit(_run, draft.id, prompt_kind, payload))
+    return draft
+
+
+def _run(draft_id, prompt_kind, payload):
+    try:
+        # Never compete with interactive requests: wait for a quiet moment
+        # and give up after AI_SPECULATIVE_MAX_DEFER seconds
+        give_up_at = time.monotonic() + getattr(settings, "AI_SPECULATIVE_MAX_DEFER", 30)
+        while _interactive >= getattr(settings, "AI_SPECULATIVE_MAX_INTERACTIVE", 2):
+            if time.monotonic() >= give_up_at:
+                GenerationDraft.objects.filter(id=draft_id, status="pending").update(
+                    status="cancelled", error="Deferred too long", finished_at=timezone.now()
+                )
+                metrics.incr("ai_speculative_finished_total", kind=prompt_kind, status="deferred")
+                return
+            time.sleep(0.5)
+
+        claimed = GenerationDraft.objects.filter(id=draft_id, status="pending").update(
+            status="running", started_at=timezone.now()
+        )
+        if not claimed:
+            return
+
+        try:
+            with lanes.lane("bulk"), resilience.deadline(getattr(settings, "AI_SPECULATIVE_DEADLINE", 60)):
+                result = generate_json(prompt_kind, payload)
+        except Exception as e:
+            logger.warning("Speculative %s generation failed: %s", prompt_kind, e)
+            GenerationDraft.objects.filter(id=draft_id, status="running").update(
+                status="failed", error=str(e), finished_at=timezone.now()
+            )
+            metrics.incr("ai_speculative_finished_total", kind=prompt_kind, status="failed")
+            return
+
+        # A draft cancelled while running keeps its cancelled status
+        stored = GenerationDraft.objects.filter(id=draft_id, status="running").update(
+            status="ready", result=result, finished_at=timezone.now()
+        )
+        metrics.incr("ai_speculative_finished_total", kind=prompt_kind,
+                     status="ready" if stored else "discarded")
+    finally:
+        close_old_connections()
+
+
+def claim(event_id, prompt_kind: str, payload: dict):
+    """
+    Result of the event's draft for prompt_kind if it was generated from the
+    same input, else None. A draft still running is waited for (up to
+    AI_SPECULATIVE_WAIT seconds); one still queued is cancelled, since the
+    caller is about to generate the same thing itself.
+    """
+    expected = input_hash(prompt_kind, payload)
+    wait_until = time.monotonic() + getattr(settings, "AI_SPECULATIVE_WAIT", 20)
+
+    while True:
+        draft = GenerationDraft.objects.filter(event_id=event_id, prompt_kind=prompt_kind).first()
+        if draft is None or draft.status in ("used", "failed", "cancelled"):
+            return None
+
+        if draft.input_hash != expected:
+            cancel(event_id, [prompt_kind])
+            metrics.incr("ai_speculative_claims_total", kind=prompt_kind, outcome="stale")
+            return None
+
+        if draft.status == "ready":
+            used = GenerationDraft.objects.filter(id=draft.id, status="ready").update(status="used")
+            if used:
+                metrics.incr("ai_speculative_claims_total", kind=prompt_kind, outcome="hit")
+                return draft.result
+            return None
+
+        if draft.status == "running" and time.monotonic() < wait_until:
+            time.sleep(0.2)
+            continue
+
+        cancel(event_id, [prompt_kind])
+        metrics.incr("ai_speculative_claims_total", kind=prompt_kind, outcome=f"miss_{draft.status}")
+        return None
+
+
+def cancel(event_id, prompt_kinds=None) -> int:
+    drafts = GenerationDraft.objects.filter(event_id=event_id, status__in=("pending", "running"))
+    if prompt_kinds:
+        drafts = drafts.filter(prompt_kind__in=prompt_kinds)
+    return drafts.update(status="cancelled", finished_at=timezone.now())
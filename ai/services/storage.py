@@ -0,0 +1,193 @@
+# Content-addressed storage for generated posters.
+# An image is written under MEDIA_ROOT/generated_posters/ab/cd/<hash>.png,
+# where <hash> is the first 32 hex digits of its sha256 and ab/cd its first
+# four, so no directory grows past a few hundred files and an image generated
+# twice is stored once. The base64 payload is decoded in chunks straight into
+# a temporary file, so the decoded image is never held in memory as a whole.
+#
+# Files stay until collect() finds them unreferenced: neither the image of a
+# VisualAsset nor a rendition of one. It runs from the gc_media management
+# command and from a sweeper thread in each worker that saves posters.
+import base64
+import hashlib
+import logging
+import os
+import random
+import threading
+import time
+from uuid import uuid4
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from api.models import VisualAsset
+from ai.services import metrics, renditions
+
+logger = logging.getLogger(__name__)
+
+FOLDER = "generated_posters"
+# Base64 characters decoded per step; a multiple of 4
+CHUNK_CHARS = 256 * 1024
+
+_sweeper_pid = None
+_lock = threading.Lock()
+
+
+def root() -> str:
+    return os.path.join(settings.MEDIA_ROOT, FOLDER)
+
+
+def shard_path(digest: str, suffix: str = ".png") -> str:
+    return os.path.join(root(), digest[:2], digest[2:4], f"{digest}{suffix}")
+
+
+def url_for(path: str) -> str:
+    relative = os.path.relpath(path, settings.MEDIA_ROOT).replace(os.sep, "/")
+    return f"{settings.MEDIA_URL}{relative}"
+
+
+def touch(path: str):
+    # A file about to be referenced again must not look old to the sweeper
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        pass
+
+
+def _decode_into(image_base64: str, f, sha):
+    pending = ""
+    for start in range(0, len(image_base64), CHUNK_CHARS):
+        chunk = pending + "".join(image_base64[start:start + CHUNK_CHARS].split())
+        usable = len(chunk) - len(chunk) % 4
+        data = base64.b64decode(chunk[:usable])
+        pending = chunk[usable:]
+        sha.update(data)
+        f.write(data)
+    if pending:
+        raise ValueError("Truncated base64 image data")
+
+
+def _save(write, suffix) -> dict:
+    # write(f, sha) fills the temp file and the hash; the file then moves to its shard
+    folder = root()
+    os.makedirs(folder, exist_ok=True)
+    tmp_path = os.path.join(folder, f"{uuid4().hex}.tmp")
+    sha = hashlib.sha256()
+    try:
+        with open(tmp_path, "wb") as f:
+            write(f, sha)
+
+        path = shard_path(sha.hexdigest()[:32], suffix)
+        if os.path.exists(path):
+            touch(path)
+            metrics.incr("ai_poster_store_total", outcome="deduplicated")
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+            metrics.incr("ai_poster_store_total", outcome="stored")
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    start_sweeper()
+    return {"image_url": url_for(path), "filename": os.path.basename(path), "local_path": path}
+
+
+def save_base64(image_base64: str, suffix: str = ".png") -> dict:
+    """
+    Store a base64-encoded image; returns {"image_url", "filename",
+    "local_path"}. An identical image already stored is reused.
+    """
+    return _save(lambda f, sha: _decode_into(image_base64, f, sha), suffix)
+
+
+def save_bytes(data: bytes, suffix: str = ".png") -> dict:
+    # Same as save_base64, for an image already in memory
+    def write(f, sha):
+        sha.update(data)
+        f.write(data)
+
+    return _save(write, suffix)
+
+
+def referenced_paths() -> set:
+    # Every file a VisualAsset (original or variant) still needs, renditions included
+    keep = set()
+    for url in VisualAsset.objects.values_list("image_url", flat=True).iterator():
+        path = renditions.media_path(url)
+        if not path:
+            continue
+        path = os.path.normpath(path)
+        keep.add(path)
+        folder, name = os.path.split(path)
+        for size_name in renditions.get_sizes():
+            for fmt in renditions.ENCODERS:
+                keep.add(os.path.join(folder, renditions.rendition_name(name, size_name, fmt)))
+    return keep
+
+
+def collect(grace=None, dry_run=False) -> dict:
+    """
+    Delete stored files no VisualAsset references. Files modified within the
+    last grace seconds (AI_MEDIA_GC_GRACE) are kept: a poster is written
+    before its VisualAsset is saved, and its QR variant and renditions after.
+    Returns {"scanned", "deleted", "bytes"}.
+    """
+    if grace is None:
+        grace = getattr(settings, "AI_MEDIA_GC_GRACE", 3600)
+    keep = referenced_paths()
+    cutoff = time.time() - grace
+    stats = {"scanned": 0, "deleted": 0, "bytes": 0}
+
+    # Empty shard directories are left in place; there are at most 65536 and
+    # removing one could race with a save creating a file in it
+    for folder, _, files in os.walk(root()):
+        for name in files:
+            path = os.path.normpath(os.path.join(folder, name))
+            stats["scanned"] += 1
+            if path in keep:
+                continue
+            try:
+                stat = os.stat(path)
+                if stat.st_mtime > cutoff:
+                    continue
+                if not dry_run:
+                    os.remove(path)
+            except FileNotFoundError:
+                # Removed by another worker's sweep
+                continue
+            stats["deleted"] += 1
+            stats["bytes"] += stat.st_size
+
+    if not dry_run:
+        metrics.incr("ai_media_gc_deleted_total", stats["deleted"])
+        metrics.incr("ai_media_gc_bytes_total", stats["bytes"])
+    return stats
+
+
+def start_sweeper():
+    # Once per process; AI_MEDIA_GC_INTERVAL = 0 leaves collection to the command
+    global _sweeper_pid
+
+    if not getattr(settings, "AI_MEDIA_GC_INTERVAL", 21600):
+        return
+    with _lock:
+        if _sweeper_pid == os.getpid():
+            return
+        _sweeper_pid = os.getpid()
+    threading.Thread(target=_sweep_loop, name="ai-media-sweeper", daemon=True).start()
+
+
+def _sweep_loop():
+    interval = getattr(settings, "AI_MEDIA_GC_INTERVAL", 21600)
+    while True:
+        # Jitter keeps the workers from all sweeping at the same moment
+        time.sleep(interval * random.uniform(0.9, 1.1))
+        try:
+            with metrics.timed("ai_media_gc_ms"):
+                stats = collect()
+            logger.info("Media sweep deleted %(deleted)s of %(scanned)s files (%(bytes)s bytes)", stats)
+        except Exception:
+            logger.exception("Media sweep failed")
+        finally:
+            close_old_connections()
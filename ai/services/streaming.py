@@ -0,0 +1,133 @@
+# Helpers for streaming generations to the client as server-sent events
+import json
+
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+class IncrementalJSONParser:
+    """
+    Feed the model output chunk by chunk and get back the top-level fields
+    of the JSON object as soon as they are complete.
+
+    A top-level scalar or object is reported once as ("key",) -> value.
+    A top-level array is reported item by item as ("key", index) -> item,
+    so each name, slogan or post surfaces as soon as it closes.
+    Anything before the first "{" (e.g. a ```json fence) is ignored.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self._pos = 0
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._reading_key = False
+        self._key = None
+        self._value_start = None
+        self._value_is_array = False
+        self._item_start = None
+        self._item_index = 0
+
+    def feed(self, chunk: str) -> list:
+        self.text += chunk
+        events = []
+
+        while self._pos < len(self.text):
+            i = self._pos
+            ch = self.text[i]
+            self._pos += 1
+
+            if not self._stack:
+                if ch == "{":
+                    self._stack.append("{")
+                    self._reading_key = True
+                continue
+
+            depth = len(self._stack)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    self._close_string(i, depth, events)
+                continue
+
+            if ch.isspace():
+                continue
+
+            self._mark_start(i, ch, depth)
+
+            if ch == '"':
+                self._in_string = True
+                self._string_start = i
+            elif ch == ":" and depth == 1:
+                self._reading_key = False
+            elif ch == ",":
+                if depth == 1:
+                    self._close_scalar_value(i, events)
+                    self._reading_key = True
+                elif depth == 2 and self._value_is_array:
+                    self._close_scalar_item(i, events)
+            elif ch in "{[":
+                self._stack.append(ch)
+            elif ch in "}]":
+                if depth == 1:
+                    self._close_scalar_value(i, events)
+                elif depth == 2 and self._value_is_array:
+                    self._close_scalar_item(i, events)
+
+                closed = self._stack.pop()
+                depth = len(self._stack)
+
+                if depth == 1 and self._value_start is not None:
+                    if closed == "{":
+                        self._emit(events, (self._key,), self._value_start, i + 1)
+                    self._value_start = None
+                elif depth == 2 and self._value_is_array and self._item_start is not None:
+                    self._emit(events, (self._key, self._item_index), self._item_start, i + 1)
+                    self._item_start = None
+                    self._item_index += 1
+
+        return events
+
+    def _mark_start(self, i, ch, depth):
+        if depth == 1 and not self._reading_key and self._value_start is None and ch not in ",:}":
+            self._value_start = i
+            self._value_is_array = ch == "["
+            self._item_index = 0
+        elif depth == 2 and self._value_is_array and self._item_start is None and ch not in ",]":
+            self._item_start = i
+
+    def _close_string(self, i, depth, events):
+        if depth == 1 and self._reading_key:
+            self._key = json.loads(self.text[self._string_start:i + 1])
+        elif depth == 1 and self._value_start == self._string_start:
+            self._emit(events, (self._key,), self._value_start, i + 1)
+            self._value_start = None
+        elif depth == 2 and self._value_is_array and self._item_start == self._string_start:
+            self._emit(events, (self._key, self._item_index), self._item_start, i + 1)
+            self._item_start = None
+            self._item_index += 1
+
+    def _close_scalar_value(self, i, events):
+        if self._value_start is not None and self.text[self._value_start] not in '{["':
+            self._emit(events, (self._key,), self._value_start, i)
+            self._value_start = None
+
+    def _close_scalar_item(self, i, events):
+        if self._item_start is not None and self.text[self._item_start] not in '{["':
+            self._emit(events, (self._key, self._item_index), self._item_start, i)
+            self._item_start = None
+            self._item_index += 1
+
+    def _emit(self, events, path, start, end):
+        try:
+            events.append((list(path), json.loads(self.text[start:end])))
+        except ValueError:
+            pass
@@ -0,0 +1,162 @@
+# Venue catalogue search.
+# Each worker keeps the Venue table as NumPy arrays sorted by latitude. A
+# radius query binary-searches the latitude band the circle can touch and
+# runs a vectorized haversine over that slice only, so a query costs a few
+# milliseconds even for a catalogue of a million venues. The arrays are
+# rebuilt when the table changes (checked at most every
+# AI_VENUE_INDEX_CHECK seconds).
+#
+# The catalogue is used three ways by venue suggestion: matches within the
+# radius that fit the expected attendees go into the prompt; with at least
+# AI_VENUE_CATALOGUE_ANSWER_MIN matches the model is not called at all; and
+# model suggestions that turn out to lie outside the radius are rejected.
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Count, Max
+
+from api.models import Venue
+from ai.services import geocode
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.195
+
+
+def haversine_km(lat, lon, lats, lons):
+    # Distances in km from (lat, lon) to each of the points in lats/lons (degrees)
+    lat, lon = np.radians(lat), np.radians(lon)
+    lats, lons = np.radians(lats), np.radians(lons)
+    a = np.sin((lats - lat) / 2) ** 2 + np.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class VenueIndex:
+    def __init__(self, rows):
+        # rows: (id, name, address, lat, lon, capacity)
+        rows = sorted(rows, key=lambda row: row[3])
+        self.ids = np.array([row[0] for row in rows], dtype=np.int64)
+        self.lats = np.array([row[3] for row in rows], dtype=np.float64)
+        self.lons = np.array([row[4] for row in rows], dtype=np.float64)
+        self.capacities = np.array([row[5] for row in rows], dtype=np.int64)
+        # Venues are unique on (name, address); several can share a name
+        self.by_key = {}
+        self.by_name = {}
+        for idx, row in enumerate(rows):
+            name = geocode.normalize(row[1])
+            self.by_key[(name, geocode.normalize(row[2]))] = idx
+            self.by_name.setdefault(name, []).append(idx)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def query(self, lat, lon, radius_km, min_capacity=0, limit=None) -> list:
+        # [(venue id, distance km)] inside the radius, nearest first
+        band = radius_km / KM_PER_DEGREE_LAT
+        start = np.searchsorted(self.lats, lat - band, side="left")
+        end = np.searchsorted(self.lats, lat + band, side="right")
+        if start == end:
+            return []
+
+        distances = haversine_km(lat, lon, self.lats[start:end], self.lons[start:end])
+        mask = (distances <= radius_km) & (self.capacities[start:end] >= min_capacity)
+        hits = np.flatnonzero(mask)
+        order = hits[np.argsort(distances[hits], kind="stable")][:limit]
+        return [(int(self.ids[start + idx]), float(distances[idx])) for idx in order]
+
+    def _position(self, name, address=None):
+        # The venue with this name and address; without a matching address,
+        # only a name no other venue shares identifies one
+        name = geocode.normalize(name)
+        if address:
+            idx = self.by_key.get((name, geocode.normalize(address)))
+            if idx is not None:
+                return idx
+        matches = self.by_name.get(name, [])
+        return matches[0] if len(matches) == 1 else None
+
+    def find(self, name: str, address=None):
+        # Id of the catalogue venue, else None
+        idx = self._position(name, address)
+        return None if idx is None else int(self.ids[idx])
+
+    def locate(self, name: str, address=None):
+        # (lat, lon) of the catalogue venue, else None
+        idx = self._position(name, address)
+        return None if idx is None else (float(self.lats[idx]), float(self.lons[idx]))
+
+
+_index = None
+_signature = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def get_index() -> VenueIndex:
+    global _index, _signature, _checked_at
+
+    with _lock:
+        if _index is not None and time.monotonic() - _checked_at < getattr(settings, "AI_VENUE_INDEX_CHECK", 30):
+            return _index
+        _checked_at = time.monotonic()
+        signature = tuple(Venue.objects.aggregate(count=Count("id"), updated=Max("updated_at")).values())
+        if _index is None or signature != _signature:
+            _index = VenueIndex(Venue.objects.values_list("id", "name", "address", "lat", "lon", "capacity"))
+            _signature = signature
+        return _index
+
+
+def parse_radius(value):
+    # radius_km from the request as a positive float, else None
+    try:
+        radius = float(value)
+    except (TypeError, ValueError):
+        return None
+    return radius if radius > 0 else None
+
+
+def locate_center(name: str):
+    # (lat, lon) of the user-defined center location
+    if not name:
+        return None
+    point = get_index().locate(name)
+    if point is not None:
+        return point
+    # Called while building the request input, so it only waits as long as venue geocoding does
+    location = geocode.lookup(name, max_wait=getattr(settings, "AI_GEOCODE_DEADLINE", 3))
+    return (location["lat"], location["lon"]) if location else None
+
+
+def nearby(lat, lon, radius_km, min_capacity=0, limit=None) -> list:
+    """
+    Catalogue venues within radius_km of (lat, lon) holding at least
+    min_capacity people, nearest first, as suggestion dicts with distance_km.
+    """
+    hits = get_index().query(lat, lon, radius_km, min_capacity, limit)
+    venues = Venue.objects.in_bulk([venue_id for venue_id, _ in hits])
+    return [
+        {
+            "name": venues[venue_id].name,
+            "address": venues[venue_id].address,
+            "capacity": venues[venue_id].capacity,
+            "transportation_score": venues[venue_id].transportation_score,
+            "is_outdoor": venues[venue_id].is_outdoor,
+            "map_url": venues[venue_id].map_url or geocode.map_url(venues[venue_id].lat, venues[venue_id].lon),
+            "distance_km": round(distance, 2),
+        }
+        for venue_id, distance in hits
+        if venue_id in venues
+    ]
+
+
+def known(places) -> dict:
+    # {(name, address): Venue} for the (name, address) pairs found in the catalogue
+    index = get_index()
+    ids = {place: index.find(*place) for place in places if place[0]}
+    rows = Venue.objects.in_bulk([venue_id for venue_id in ids.values() if venue_id is not None])
+    return {place: rows[venue_id] for place, venue_id in ids.items() if venue_id in rows}
+
+
+def distance_km(center, point) -> float:
+    return float(haversine_km(center[0], center[1], np.array([point[0]]), np.array([point[1]]))[0])
@@ -0,0 +1,135 @@
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from ai.models import TokenBucket
+from ai.services import admission
+from ai.services.admission import FairScheduler, Throttled
+from ai.views import error_response, retry_response
+
+
+def _age_bucket(key, seconds):
+    # As if the last take happened seconds ago
+    bucket = TokenBucket.objects.get(key=key)
+    bucket.updated_at -= timedelta(seconds=seconds)
+    bucket.save(update_fields=["updated_at"])
+
+
+class TakeTests(TestCase):
+    def test_new_bucket_starts_full(self):
+        self.assertEqual(admission.take("user:1", 10, rate=1, burst=10), 0)
+        self.assertAlmostEqual(TokenBucket.objects.get(key="user:1").tokens, 0, places=2)
+
+    def test_empty_bucket_reports_wait_and_takes_nothing(self):
+        admission.take("user:1", 8, rate=2, burst=10)
+        wait = admission.take("user:1", 6, rate=2, burst=10)
+        # 2 tokens left, 4 missing at 2 tokens/s
+        self.assertAlmostEqual(wait, 2, places=1)
+        self.assertAlmostEqual(TokenBucket.objects.get(key="user:1").tokens, 2, places=1)
+
+    def test_bucket_refills_over_time(self):
+        admission.take("user:1", 10, rate=2, burst=10)
+        self.assertGreater(admission.take("user:1", 4, rate=2, burst=10), 0)
+        _age_bucket("user:1", 2)
+        self.assertEqual(admission.take("user:1", 4, rate=2, burst=10), 0)
+
+    def test_refill_is_capped_at_burst(self):
+        admission.take("user:1", 1, rate=2, burst=10)
+        _age_bucket("user:1", 3600)
+        self.assertEqual(admission.take("user:1", 10, rate=2, burst=10), 0)
+        self.assertGreater(admission.take("user:1", 1, rate=2, burst=10), 0)
+
+    def test_cost_above_burst_still_fits(self):
+        self.assertEqual(admission.take("user:1", 50, rate=1, burst=10), 0)
+
+
+class ThrottledTests(SimpleTestCase):
+    def test_retry_after_is_rounded_up(self):
+        self.assertEqual(Throttled("slow down", 2.1).retry_after, 3)
+        self.assertEqual(Throttled("slow down", 4).retry_after, 4)
+        self.assertEqual(Throttled("slow down", 0.01).retry_after, 1)
+
+    def test_retry_after_header(self):
+        response = retry_response(*error_response(Throttled("slow down", 7.5)))
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "8")
+
+
+@override_settings(
+    AI_ADMISSION_ENABLED=True,
+    AI_ADMISSION_COSTS={"event": 5},
+    AI_ADMISSION_USER_RATE=0.5,
+    AI_ADMISSION_USER_BURST=10,
+    AI_ADMISSION_GLOBAL_RATE=1,
+    AI_ADMISSION_GLOBAL_BURST=5,
+)
+class AdmitTests(TestCase):
+    def test_user_over_rate_is_throttled(self):
+        admission.reserve(1, ["event"])
+        admission.reserve(1, ["event"])
+        with self.assertRaises(Throttled) as raised:
+            admission.reserve(1, ["event"])
+        # 5 tokens missing at 0.5 tokens/s
+        self.assertEqual(raised.exception.retry_after, 10)
+        # Other users have their own bucket
+        admission.reserve(2, ["event"])
+
+    def test_global_rejection_refunds_the_user(self):
+        admission.take("global", 5, rate=1, burst=5)
+        with self.assertRaises(Throttled) as raised:
+            admission.admit(1, ["event"], timeout=0)
+        self.assertEqual(raised.exception.retry_after, 5)
+        self.assertAlmostEqual(TokenBucket.objects.get(key="user:1").tokens, 10, places=1)
+
+
+class FairSchedulerTests(SimpleTestCase):
+    def _start(self, scheduler, name, user_key, timeout=5):
+        thread = threading.Thread(target=scheduler.acquire, args=(user_key, 1, timeout), name=name)
+        thread.start()
+        return thread
+
+    def _wait_for_queue(self, scheduler, depth):
+        for _ in range(500):
+            with scheduler._cond:
+                if sum(len(queue) for queue in scheduler._waiting.values()) == depth:
+                    return
+            time.sleep(0.01)
+        self.fail(f"queue never reached {depth}")
+
+    def test_users_take_turns(self):
+        scheduler = FairScheduler()
+        served = []
+        gate = threading.Event()
+
+        def take(key, cost, rate, burst):
+            # The first request holds the bucket until everyone else queued
+            if not served:
+                gate.wait(5)
+            served.append(threading.current_thread().name)
+            return 0
+
+        with mock.patch.object(admission, "take", side_effect=take):
+            threads = [self._start(scheduler, "a1", "user:a")]
+            time.sleep(0.05)
+            for depth, (name, user_key) in enumerate((("a2", "user:a"), ("a3", "user:a"), ("b1", "user:b")), 2):
+                threads.append(self._start(scheduler, name, user_key))
+                self._wait_for_queue(scheduler, depth)
+            gate.set()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(served, ["a1", "b1", "a2", "a3"])
+        self.assertEqual(scheduler._waiting, {})
+
+    def test_gives_up_after_timeout(self):
+        scheduler = FairScheduler()
+        with mock.patch.object(admission, "take", return_value=12.3):
+            started = time.monotonic()
+            with self.assertRaises(Throttled) as raised:
+                scheduler.acquire("user:a", 1, timeout=0.2)
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertEqual(raised.exception.retry_after, 13)
+        self.assertEqual(scheduler._waiting, {})
@@ -0,0 +1,98 @@
+import os
+import shutil
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from ai.services.media import parse_range
+
+CONTENT = bytes(range(256)) * 4
+
+
+class ParseRangeTests(SimpleTestCase):
+    def test_ranges(self):
+        cases = {
+            "bytes=0-99": (0, 99),
+            "bytes=100-": (100, 1023),
+            "bytes=-24": (1000, 1023),
+            "bytes=-5000": (0, 1023),
+            "bytes=1000-5000": (1000, 1023),
+        }
+        for header, expected in cases.items():
+            with self.subTest(header=header):
+                self.assertEqual(parse_range(header, 1024), expected)
+
+    def test_whole_file(self):
+        for header in ("", "bytes=-", "bytes=0-1,5-9", "items=0-9"):
+            with self.subTest(header=header):
+                self.assertIsNone(parse_range(header, 1024))
+
+    def test_unsatisfiable(self):
+        for header in ("bytes=1024-", "bytes=20-10", "bytes=-0"):
+            with self.subTest(header=header), self.assertRaises(ValueError):
+                parse_range(header, 1024)
+
+
+class ServeRangeTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = os.path.join(settings.MEDIA_ROOT, "range-tests")
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, "sample.bin"), "wb") as f:
+            f.write(CONTENT)
+        self.url = settings.MEDIA_URL + "range-tests/sample.bin"
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _body(self, response):
+        return b"".join(response.streaming_content)
+
+    def test_whole_file(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertEqual(self._body(response), CONTENT)
+
+    def test_partial_content(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=10-19")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], "bytes 10-19/1024")
+        self.assertEqual(response["Content-Length"], "10")
+        self.assertEqual(self._body(response), CONTENT[10:20])
+
+    def test_suffix_range(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=-100")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], "bytes 924-1023/1024")
+        self.assertEqual(self._body(response), CONTENT[-100:])
+
+    def test_head_range_has_no_body(self):
+        response = self.client.head(self.url, HTTP_RANGE="bytes=0-9")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Length"], "10")
+        self.assertEqual(self._body(response), b"")
+
+    def test_range_not_satisfiable(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=2048-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], "bytes */1024")
+
+    def test_if_range_matching_etag(self):
+        etag = self.client.get(self.url)["ETag"]
+        response = self.client.get(self.url, HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE=etag)
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(self._body(response), CONTENT[:10])
+
+    def test_if_range_stale_etag_sends_whole_file(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._body(response), CONTENT)
+
+    def test_stale_if_range_ignores_unsatisfiable_range(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=2048-", HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_not_modified(self):
+        etag = self.client.get(self.url)["ETag"]
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
@@ -0,0 +1,130 @@
+import threading
+
+from django.test import SimpleTestCase, override_settings
+
+from ai.services import resilience
+from ai.services.resilience import CircuitBreaker, CircuitOpenError
+
+RESET = 60
+
+
+def _open_breaker():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=RESET)
+    breaker.record_failure()
+    breaker.record_failure()
+    return breaker
+
+
+def _expire(breaker):
+    # As if the reset timeout had passed since the breaker opened
+    breaker.opened_at -= RESET + 1
+
+
+def _allow_from_threads(breaker, count):
+    # count threads call allow() at the same time; returns their answers
+    barrier = threading.Barrier(count)
+    results = []
+    lock = threading.Lock()
+
+    def worker():
+        barrier.wait()
+        allowed = breaker.allow()
+        with lock:
+            results.append(allowed)
+
+    threads = [threading.Thread(target=worker) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def test_opens_after_threshold(self):
+        breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=RESET)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, "closed")
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, "open")
+        self.assertFalse(breaker.allow())
+        self.assertGreaterEqual(breaker.retry_after(), 1)
+
+    def test_half_open_lets_exactly_one_probe_through(self):
+        breaker = _open_breaker()
+        _expire(breaker)
+
+        results = _allow_from_threads(breaker, 8)
+        self.assertEqual(results.count(True), 1)
+        self.assertEqual(breaker.state, "half_open")
+        # Other callers keep failing fast while the probe is out
+        self.assertFalse(breaker.allow())
+
+    def test_probe_retries_are_allowed(self):
+        breaker = _open_breaker()
+        _expire(breaker)
+        self.assertTrue(breaker.allow())
+        self.assertTrue(breaker.allow())
+
+    def test_probe_success_closes(self):
+        breaker = _open_breaker()
+        _expire(breaker)
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, "closed")
+        self.assertEqual(_allow_from_threads(breaker, 4), [True] * 4)
+
+    def test_probe_failure_reopens(self):
+        breaker = _open_breaker()
+        _expire(breaker)
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, "open")
+        self.assertFalse(breaker.allow())
+
+    def test_released_probe_lets_another_through(self):
+        breaker = _open_breaker()
+        _expire(breaker)
+        self.assertTrue(breaker.allow())
+        breaker.release()
+        self.assertEqual(_allow_from_threads(breaker, 4).count(True), 1)
+
+    def test_stale_probe_is_replaced(self):
+        breaker = _open_breaker()
+        _expire(breaker)
+        self.assertTrue(breaker.allow())
+        self.assertEqual(_allow_from_threads(breaker, 4).count(True), 0)
+        # The probe never reported back
+        breaker.probe_started -= RESET + 1
+        self.assertEqual(_allow_from_threads(breaker, 4).count(True), 1)
+
+
+@override_settings(AI_RESILIENCE={"flaky": {
+    "max_attempts": 2, "base_delay": 0, "max_delay": 0, "failure_threshold": 2, "reset_timeout": 60,
+}})
+class CallTests(SimpleTestCase):
+    def tearDown(self):
+        resilience._breakers.pop("flaky", None)
+
+    def test_open_breaker_fails_fast(self):
+        calls = []
+
+        def fn(timeout):
+            calls.append(timeout)
+            raise TimeoutError("provider timed out")
+
+        with self.assertRaises(resilience.ProviderError):
+            resilience.call("flaky", fn)
+        self.assertEqual(len(calls), 2)
+
+        with self.assertRaises(CircuitOpenError) as raised:
+            resilience.call("flaky", fn)
+        self.assertEqual(len(calls), 2)
+        self.assertGreaterEqual(raised.exception.retry_after, 1)
+
+    def test_deadline_limits_the_timeout(self):
+        timeouts = []
+        with resilience.deadline(5):
+            resilience.call("flaky", lambda timeout: timeouts.append(timeout))
+        self.assertLessEqual(timeouts[0], 5)
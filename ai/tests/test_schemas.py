@@ -0,0 +1,39 @@
+from django.test import SimpleTestCase
+
+from ai.services.resilience import MalformedResponse
+from ai.services.schemas import parse, repair_json
+
+
+class RepairJSONTests(SimpleTestCase):
+    def test_fenced_document(self):
+        text = 'Here you go:\n```json\n{"name": "Expo", "tags": ["a", "b"]}\n```\nEnjoy!'
+        self.assertEqual(repair_json(text), {"name": "Expo", "tags": ["a", "b"]})
+
+    def test_trailing_commas(self):
+        self.assertEqual(repair_json('{"tags": ["a", "b",], "n": 1,}'), {"tags": ["a", "b"], "n": 1})
+
+    def test_truncated_inside_string(self):
+        text = '{"name": "Expo", "tags": ["a", "b", "unfinish'
+        self.assertEqual(repair_json(text), {"name": "Expo", "tags": ["a", "b"]})
+
+    def test_truncated_inside_nested_object(self):
+        text = '{"posts": [{"text": "one"}, {"text": "two", "hashtags": ["#x"'
+        self.assertEqual(repair_json(text), {"posts": [{"text": "one"}, {"text": "two", "hashtags": []}]})
+
+    def test_braces_inside_strings(self):
+        self.assertEqual(repair_json('{"text": "a } ] \\" b"}'), {"text": 'a } ] " b'})
+
+    def test_no_document(self):
+        with self.assertRaises(ValueError):
+            repair_json("Sorry, I cannot help with that.")
+
+
+class ParseTests(SimpleTestCase):
+    def test_truncated_response_drops_the_incomplete_item(self):
+        text = '```json\n{"venue_suggestions": [{"name": "Hall A", "capacity": 120}, {"name": "Ga'
+        value = parse("venue_suggestion", text)
+        self.assertEqual(value["venue_suggestions"], [{"name": "Hall A", "capacity": 120}])
+
+    def test_invalid_response_is_rejected(self):
+        with self.assertRaises(MalformedResponse):
+            parse("venue_suggestion", '{"venue_suggestions": "none"}')
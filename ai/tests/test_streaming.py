@@ -0,0 +1,89 @@
+import json
+
+from django.test import SimpleTestCase
+
+from ai.services.clients import get_text_client
+from ai.services.schemas import generation_config
+from ai.services.streaming import IncrementalJSONParser, sse_event
+
+
+DOCUMENT = json.dumps({
+    "event_name": "Spring \"Hack\" Night",
+    "budget": 1500,
+    "taglines": ["Build, break, repeat", "Code after dark"],
+    "venue": {"name": "Hall A", "seats": 120},
+    "posts": [{"text": "Day one"}, {"text": "Day two"}],
+})
+
+
+def _feed_in_chunks(text, size):
+    parser = IncrementalJSONParser()
+    events = []
+    for start in range(0, len(text), size):
+        events.extend(parser.feed(text[start:start + size]))
+    return events
+
+
+class IncrementalJSONParserTests(SimpleTestCase):
+    def test_fields_are_emitted_in_document_order(self):
+        expected = [
+            (["event_name"], 'Spring "Hack" Night'),
+            (["budget"], 1500),
+            (["taglines", 0], "Build, break, repeat"),
+            (["taglines", 1], "Code after dark"),
+            (["venue"], {"name": "Hall A", "seats": 120}),
+            (["posts", 0], {"text": "Day one"}),
+            (["posts", 1], {"text": "Day two"}),
+        ]
+        # Whatever the chunking, the same fields come out in the same order
+        for size in (1, 3, 7, len(DOCUMENT)):
+            with self.subTest(chunk_size=size):
+                self.assertEqual(_feed_in_chunks(DOCUMENT, size), expected)
+
+    def test_field_is_emitted_once_it_closes(self):
+        parser = IncrementalJSONParser()
+        self.assertEqual(parser.feed('{"title": "Launch'), [])
+        self.assertEqual(parser.feed(' party", "names": ["A'), [(["title"], "Launch party")])
+        self.assertEqual(parser.feed('da", '), [(["names", 0], "Ada")])
+        self.assertEqual(parser.feed('"Grace"'), [(["names", 1], "Grace")])
+        self.assertEqual(parser.feed("]}"), [])
+
+    def test_scalar_waits_for_its_delimiter(self):
+        parser = IncrementalJSONParser()
+        # 12 could still become 120
+        self.assertEqual(parser.feed('{"seats": 12'), [])
+        self.assertEqual(parser.feed("0}"), [(["seats"], 120)])
+
+    def test_markdown_fence_is_ignored(self):
+        events = _feed_in_chunks('```json\n{"name": "Expo", "done": true}\n```', 4)
+        self.assertEqual(events, [(["name"], "Expo"), (["done"], True)])
+
+    def test_truncated_document_keeps_completed_fields(self):
+        events = _feed_in_chunks('{"name": "Expo", "slogans": ["One", "Tw', 5)
+        self.assertEqual(events, [(["name"], "Expo"), (["slogans", 0], "One")])
+
+    def test_fake_provider_stream(self):
+        # Rebuilding the document from the emitted fields gives the full answer
+        chunks = list(get_text_client().stream_text(
+            "prompt", "model", generation_config=generation_config("social_post"),
+        ))
+        self.assertGreater(len(chunks), 1)
+
+        parser = IncrementalJSONParser()
+        rebuilt = {}
+        for chunk in chunks:
+            for path, value in parser.feed(chunk):
+                if len(path) == 2:
+                    self.assertEqual(len(rebuilt.setdefault(path[0], [])), path[1])
+                    rebuilt[path[0]].append(value)
+                else:
+                    rebuilt[path[0]] = value
+        self.assertEqual(rebuilt, json.loads("".join(chunks)))
+
+
+class SSEEventTests(SimpleTestCase):
+    def test_format(self):
+        self.assertEqual(
+            sse_event("field", {"path": ["name"], "value": "Café"}),
+            'event: field\ndata: {"path": ["name"], "value": "Café"}\n\n',
+        )
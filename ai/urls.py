@@ -2,7 +2,8 @@ from django.urls import path
 from ai.views import (
     GenerateEventAPIView,TaskAssignmentGenerationAPIView,VenueSuggestionGenerationAPIView,
     RegistrationFormGenerationAPIView,InvitationGenerationAPIView,SocialPostGenerationAPIView,
-    PosterGenerationAPIView
+    PosterGenerationAPIView,GenerateKitAPIView,GenerationJobAPIView,AIMetricsAPIView,
+    ModelRouteAPIView,GenerationDraftAPIView
 )
 
 urlpatterns = [
@@ -13,5 +14,10 @@ urlpatterns = [
     path('generate-invitation/<int:event_id>/', InvitationGenerationAPIView.as_view(), name='invitaion-generate'),
     path('generate-social-post/<int:event_id>/', SocialPostGenerationAPIView.as_view(), name='social-post-generate'),
     path('generate-poster/<int:event_id>/', PosterGenerationAPIView.as_view(), name='poster-generate'),
+    path('generate-kit/<int:event_id>/', GenerateKitAPIView.as_view(), name='kit-generate'),
+    path('jobs/<uuid:job_id>/', GenerationJobAPIView.as_view(), name='generation-job'),
+    path('metrics/', AIMetricsAPIView.as_view(), name='ai-metrics'),
+    path('routes/', ModelRouteAPIView.as_view(), name='model-routes'),
+    path('drafts/<int:event_id>/', GenerationDraftAPIView.as_view(), name='generation-drafts'),
 
 ]
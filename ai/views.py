@@ -1,30 +1,36 @@
-import base64
-import os
-from uuid import uuid4
-import qrcode
 from django.conf import settings
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from datetime import datetime, time
-from ai.serializers import EventPreferenceSerializer,InvitationRequestSerializer
+from ai.serializers import EventPreferenceSerializer,InvitationRequestSerializer,GenerationJobSerializer
 from api.models import Event,EventEditor,TaskAssignment,VenueSuggestion,Registration,EmailLog,SocialPost,VisualAsset
+from ai.models import GenerationJob,GenerationDraft,ModelRoute
 from django.contrib.auth import get_user_model
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
-from geopy.geocoders import Nominatim
-from geopy.exc import GeocoderTimedOut, GeocoderUnavailable
 from django.utils.timezone import localtime,make_aware
 from django.shortcuts import get_object_or_404
-import traceback
+from django.http import StreamingHttpResponse
+from django.views.decorators.http import require_safe
+from django.urls import reverse
+from django.db import transaction
+import logging
 from ai.services.services import (
     generate_event_from_gemini,generate_task_assignment_from_gemini,
     generate_venue_suggestion_from_gemini,generate_registration_form_from_gemini,
-    generate_invitation_from_gemini,generate_social_post_gemini,generate_poster_text_gemini,
-    generate_poster_image_openai
+    generate_invitation_from_gemini,generate_social_post_gemini,
+    stream_event_from_gemini,stream_social_post_gemini,parse_gemini_response
 )
+from ai.services import (
+    admission, candidates, geocode, media, metrics, poster, qr, renditions, resilience, routing, schemas,
+    singleflight, speculation, venues,
+)
+from ai.services.jobs import submit_job,cancel_job,recover_jobs
+from ai.services.dag import run_dag,critical_path_ms
+from ai.services.streaming import IncrementalJSONParser,sse_event
 
 
+logger = logging.getLogger(__name__)
 User = get_user_model()
 
 
@@ -32,75 +38,270 @@ User = get_user_model()
 def has_role(user, event_id, roles):
     return EventEditor.objects.filter(event_id=event_id, user=user, role__in=roles).exists()
 
-# Create Event
-class GenerateEventAPIView(APIView):
+# ?stream=1 switches an endpoint to server-sent events
+def wants_stream(request):
+    return request.query_params.get("stream", "").lower() in ("1", "true")
+
+def event_stream_response(events):
+    response = StreamingHttpResponse(events, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+# ?async=true (or "async": true in the body) queues the generation as a job
+def wants_async(request):
+    value = request.query_params.get("async", request.data.get("async", ""))
+    return str(value).lower() in ("1", "true")
+
+# "Cache-Control: no-cache" forces a fresh generation instead of a cached one
+def use_cache(request):
+    return "no-cache" not in request.headers.get("Cache-Control", "").lower()
+
+# "X-Request-Timeout: <seconds>" shortens the provider time budget of a request
+def request_deadline(request, default):
+    try:
+        return min(float(request.headers["X-Request-Timeout"]), default)
+    except (KeyError, ValueError):
+        return default
+
+# Provider failures map to 502/503/504 instead of a generic 500
+def error_response(e, message=None):
+    body = {"error": message or str(e)}
+    if isinstance(e, (resilience.CircuitOpenError, admission.Throttled)):
+        body["retry_after"] = e.retry_after
+    return body, getattr(e, "status_code", status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+# Response that tells the client when to retry (open circuit, throttled request)
+def retry_response(body, code):
+    response = Response(body, status=code)
+    if isinstance(body, dict) and "retry_after" in body:
+        response["Retry-After"] = str(body["retry_after"])
+    return response
+
+# Use the speculative draft generated for this input when there is one.
+# trace, when given, gets "source": speculative, cache, semantic_cache or model
+def claim_or_generate(event_id, prompt_kind, payload, generate, trace=None, **options):
+    if options.get("use_cache", True):
+        result = speculation.claim(event_id, prompt_kind, payload)
+        if result is not None:
+            if trace is not None:
+                trace["source"] = "speculative"
+            return result
+    else:
+        speculation.cancel(event_id, [prompt_kind])
+    return generate(payload, trace=trace, **options)
+
+# "candidates": N asks for N ranked variants, "another": true for the next stored one
+def candidate_options(data):
+    another = str(data.get("another", "")).lower() in ("1", "true")
+    return candidates.get_count(data.get("candidates")), another
+
+# Plain JSON copy of the request body, stored on queued jobs
+def request_body(request):
+    data = request.data.dict() if hasattr(request.data, "dict") else dict(request.data)
+    data.pop("async", None)
+    return data
+
+
+# Base class of the /ai/generate-* endpoints.
+# Subclasses implement run(), which does the generation and returns
+# (body, status code); post() runs it inline or queues it as a job.
+class GenerationAPIView(APIView):
     permission_classes = [IsAuthenticated]
+    job_name = None
+    # Prompt kinds generated by run(), which set the admission cost
+    prompt_kinds = ()
 
-    def post(self, request):
-        serializer = EventPreferenceSerializer(data=request.data)
-        if not serializer.is_valid():
-            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    def post(self, request, event_id=None):
+        if event_id is not None and not has_role(request.user, event_id, ['owner', 'editor']):
+            return Response({"error": "Permission denied"}, status=status.HTTP_403_FORBIDDEN)
 
-        data = serializer.validated_data
+        options = {"use_cache": use_cache(request)}
 
+        if wants_async(request):
+            errors = self.validate(request.data)
+            if errors:
+                return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+            # Queued jobs wait for the global bucket when they run
+            try:
+                admission.reserve(request.user.id, self.get_prompt_kinds(request.data))
+            except admission.Throttled as e:
+                return retry_response(*error_response(e))
+
+            job = submit_job(self.job_name, request.user, request_body(request), event_id, options)
+            return Response({
+                "job_id": str(job.id),
+                "status": job.status,
+                "status_url": reverse("generation-job", args=[job.id]),
+            }, status=status.HTTP_202_ACCEPTED)
+
+        # Identical concurrent requests (double submits, two editors) share one generation
+        key = singleflight.make_key(
+            self.job_name,
+            event_id if event_id is not None else f"user:{request.user.id}",
+            request_body(request),
+            options,
+        )
+        seconds = request_deadline(request, getattr(settings, "AI_REQUEST_DEADLINE", 90))
+
+        # Only the request that runs the generation is charged; followers that
+        # share its result make no provider call. A throttled leader raises,
+        # so nothing is shared and followers get the same 429.
+        def generate():
+            admission.admit(request.user.id, self.get_prompt_kinds(request.data))
+            # The provider budget starts once the request is admitted
+            with resilience.deadline(seconds):
+                return self.run(request.user, request.data, event_id, **options)
+
+        # Followers wait for the leader's admission as well as its generation
+        waiting = seconds + getattr(settings, "AI_ADMISSION_MAX_WAIT", 10)
         try:
-            ai_response = generate_event_from_gemini(data)
-
-            # Parse the date string and preset it to 00:00 and 23:59:59 on the current day
-            date_str = data.get("date")
-            event_date = datetime.strptime(date_str, "%Y-%m-%d").date()
-            start_time = make_aware(datetime.combine(event_date, time(0, 0, 0)))
-            end_time = make_aware(datetime.combine(event_date, time(23, 59, 59)))
-
-            event = Event.objects.create(
-                name=ai_response["name"][0],  # default the first list of name
-                description=ai_response["description"],
-                slogan=ai_response["slogan"][0],
-                target_audience=data.get("target_audience"),
-                expected_attendees=ai_response["expected_attendees"],
-                start_time=start_time,
-                end_time=end_time,
-                type=data.get("type"),
-                budget=data.get("budget"),
-                status="draft",
-                created_by=request.user
-            )
-            EventEditor.objects.create(
-                event=event,
-                user=request.user,
-                role='owner'
-            )
+            with speculation.interactive(), resilience.deadline(waiting):
+                (body, code), shared = singleflight.do(key, generate, self.job_name)
+        except admission.Throttled as e:
+            return retry_response(*error_response(e))
+        response = retry_response(body, code)
+        if shared:
+            response["X-Coalesced"] = shared
+        return response
+
+    # ?stream=1 responses go through the same admission as post(); the
+    # deadline is opened inside the generator so it covers the whole stream
+    def stream_response(self, request, events):
+        try:
+            admission.admit(request.user.id, self.get_prompt_kinds(request.data))
+        except admission.Throttled as e:
+            return retry_response(*error_response(e))
 
-             
-            response_data = ai_response.copy()
-            response_data["event_id"] = event.id
+        seconds = request_deadline(request, getattr(settings, "AI_REQUEST_DEADLINE", 90))
 
-            
-            return Response(response_data , status=status.HTTP_201_CREATED)
+        def admitted():
+            with speculation.interactive(), resilience.deadline(seconds):
+                yield from events
 
-        except Exception as e:
-            return Response(
-                {"error": f"Failed to generate or save event: {str(e)}"},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+        return event_stream_response(admitted())
 
-# Create TaskAssighnment
-class TaskAssignmentGenerationAPIView(APIView):
-    permission_classes = [IsAuthenticated]
+    # Prompt kinds a request generates, which set its admission cost
+    def get_prompt_kinds(self, data):
+        return self.prompt_kinds
 
-    def post(self, request, event_id):
+    # Errors that should reject a job before it is queued
+    def validate(self, data):
+        return None
+
+    def run(self, user, data, event_id=None, **options):
+        raise NotImplementedError
 
-        if not has_role(request.user, event_id, ['owner', 'editor']):
-            return Response({"error": "Permission denied"}, status=status.HTTP_403_FORBIDDEN)
 
- 
+# Create Event
+class GenerateEventAPIView(GenerationAPIView):
+    job_name = "generate-event"
+    prompt_kinds = ("event",)
+
+    def post(self, request):
+        if wants_stream(request):
+            serializer = EventPreferenceSerializer(data=request.data)
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            return self.stream(request, serializer.validated_data)
+
+        return super().post(request)
+
+    def validate(self, data):
+        serializer = EventPreferenceSerializer(data=data)
+        return None if serializer.is_valid() else serializer.errors
+
+    def run(self, user, data, event_id=None, **options):
+        serializer = EventPreferenceSerializer(data=data)
+        if not serializer.is_valid():
+            return serializer.errors, status.HTTP_400_BAD_REQUEST
+
         try:
-            event = Event.objects.get(id=event_id)
-        except Event.DoesNotExist:
-            return Response({"error": "Event not found"}, status=status.HTTP_404_NOT_FOUND)
+            ai_response = generate_event_from_gemini(serializer.validated_data, **options)
+            response_data = self.save_event(ai_response, serializer.validated_data, user)
+            self.speculate(response_data["event_id"], data)
+            return response_data, status.HTTP_201_CREATED
 
+        except Exception as e:
+            return error_response(e, f"Failed to generate or save event: {str(e)}")
+
+    # ?stream=1: emit each name/slogan/field as soon as it is generated
+    def stream(self, request, data):
+        user = request.user
+        raw_data = request_body(request)
+        chunks = stream_event_from_gemini(data, use_cache=use_cache(request))
+
+        def events():
+            parser = IncrementalJSONParser()
+            try:
+                for chunk in chunks:
+                    for path, value in parser.feed(chunk):
+                        yield sse_event("field", {"path": path, "value": value})
+
+                ai_response = parse_gemini_response(parser.text, "event")
+                response_data = self.save_event(ai_response, data, user)
+                self.speculate(response_data["event_id"], raw_data)
+                yield sse_event("done", response_data)
+
+            except Exception as e:
+                yield sse_event("error", {"error": f"Failed to generate or save event: {str(e)}"})
+
+        return self.stream_response(request, events())
+
+    # Opt-in: start the task (and, given a "venue": {"name", "radius_km"}, venue)
+    # generations in the background so they are ready when the user asks
+    def speculate(self, event_id, data):
+        enabled = data.get("speculate", getattr(settings, "AI_SPECULATIVE_GENERATION", False))
+        if str(enabled).lower() not in ("1", "true"):
+            return
+
+        event = Event.objects.get(id=event_id)
+        speculation.schedule(event.id, "task_assignment", TaskAssignmentGenerationAPIView.build_input(event))
+        venue = data.get("venue")
+        if isinstance(venue, dict) and venue.get("name"):
+            speculation.schedule(
+                event.id, "venue_suggestion", VenueSuggestionGenerationAPIView.build_input(event, venue)
+            )
 
-        event_data = {
+    def save_event(self, ai_response, data, user):
+        # Parse the date string and preset it to 00:00 and 23:59:59 on the current day
+        date_str = data.get("date")
+        event_date = datetime.strptime(date_str, "%Y-%m-%d").date()
+        start_time = make_aware(datetime.combine(event_date, time(0, 0, 0)))
+        end_time = make_aware(datetime.combine(event_date, time(23, 59, 59)))
+
+        event = Event.objects.create(
+            name=ai_response["name"][0],  # default the first list of name
+            description=ai_response["description"],
+            slogan=ai_response["slogan"][0],
+            target_audience=data.get("target_audience"),
+            expected_attendees=ai_response["expected_attendees"],
+            start_time=start_time,
+            end_time=end_time,
+            type=data.get("type"),
+            budget=data.get("budget"),
+            status="draft",
+            created_by=user
+        )
+        EventEditor.objects.create(
+            event=event,
+            user=user,
+            role='owner'
+        )
+
+        response_data = ai_response.copy()
+        response_data["event_id"] = event.id
+        return response_data
+
+# Create TaskAssighnment
+class TaskAssignmentGenerationAPIView(GenerationAPIView):
+    job_name = "generate-tasks"
+    prompt_kinds = ("task_assignment",)
+
+    @staticmethod
+    def build_input(event):
+        return {
             "event": {
                 "event_name": event.name,
                 "start_time": event.start_time.isoformat() if event.start_time else None,
@@ -108,76 +309,56 @@ class TaskAssignmentGenerationAPIView(APIView):
                 "expected_attendees": event.expected_attendees,
                 "type": event.type,
             }
-        
         }
 
+    def run(self, user, data, event_id=None, **options):
         try:
-            result = generate_task_assignment_from_gemini(event_data)
+            event = Event.objects.get(id=event_id)
+        except Event.DoesNotExist:
+            return {"error": "Event not found"}, status.HTTP_404_NOT_FOUND
+
+        event_data = self.build_input(event)
 
-            
-            TaskAssignment.objects.filter(event=event).delete()  
+        try:
+            result = claim_or_generate(
+                event.id, "task_assignment", event_data, generate_task_assignment_from_gemini, **options
+            )
 
             task_data_list = result.get("task_summary_by_role", [])
             updated_task_data_list = []
 
-            for task in task_data_list:
-                saved = TaskAssignment.objects.create(
-                    event=event,
-                    role=task.get("role"),
-                    description=task.get("description", ""),
-                    count=task.get("count", 0),
-                    start_time=task.get("start_time"),
-                    end_time=task.get("end_time"),
-                )
-                
-                task["id"] = saved.id
-                task["event_id"] = event.id
-                updated_task_data_list.append(task)
-
-            result["task_summary_by_role"] = updated_task_data_list
-            
-
-            return Response(result, status=status.HTTP_200_OK)
-
+            with transaction.atomic():
+                TaskAssignment.objects.filter(event=event).delete()
 
-        except ValueError as e:
-            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        
+                for task in task_data_list:
+                    saved = TaskAssignment.objects.create(
+                        event=event,
+                        role=task.get("role"),
+                        description=task.get("description", ""),
+                        count=task.get("count", 0),
+                        start_time=task.get("start_time"),
+                        end_time=task.get("end_time"),
+                    )
 
-# Create VenueSuggestion
-class VenueSuggestionGenerationAPIView(APIView):
-    permission_classes = [IsAuthenticated]
+                    task["id"] = saved.id
+                    task["event_id"] = event.id
+                    updated_task_data_list.append(task)
 
-    def geocode_place_name(self, place_name: str):
-        try:
-            geolocator = Nominatim(user_agent="EventIQBot/1.0 (zxcv2442442002@gmail.com)")
-            location = geolocator.geocode(place_name, timeout=10)
-            if location:
-                address = location.address
-                lat = location.latitude
-                lon = location.longitude
-                map_url = f"https://www.google.com/maps/search/?api=1&query={lat},{lon}"
-                return address, map_url
-            else:
-                return None, None
-        except (GeocoderTimedOut, GeocoderUnavailable) as e:
-            return None, None
+            result["task_summary_by_role"] = updated_task_data_list
 
-    def post(self, request, event_id):
+            return result, status.HTTP_200_OK
 
-        if not has_role(request.user, event_id, ['owner', 'editor']):
-            return Response({"error": "Permission denied"}, status=status.HTTP_403_FORBIDDEN)
+        except ValueError as e:
+            return error_response(e)
 
-    
-        try:
-            event = Event.objects.get(id=event_id)
-        except Event.DoesNotExist:
-            return Response({"error": "Event not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        name = request.data.get("name", "")
-        radius_km = request.data.get("radius_km", "")
+# Create VenueSuggestion
+class VenueSuggestionGenerationAPIView(GenerationAPIView):
+    job_name = "generate-venues"
+    prompt_kinds = ("venue_suggestion",)
 
-        
+    @staticmethod
+    def build_input(event, data):
         input_data = {
             "event": {
                 "event_id": event.id,
@@ -190,69 +371,140 @@ class VenueSuggestionGenerationAPIView(APIView):
                 "target_audience": event.target_audience,
             },
             "venue_suggestion": {
-                "radius_km": radius_km,
-                "name": name,
-               
+                "radius_km": data.get("radius_km", ""),
+                "name": data.get("name", ""),
             }
         }
 
-        try:
-            result = generate_venue_suggestion_from_gemini(input_data)
-            suggestions = result.get("venue_suggestions", [])
+        # Catalogue venues in the radius that hold the expected attendees go into the prompt
+        radius = venues.parse_radius(data.get("radius_km"))
+        center = venues.locate_center(data.get("name", "")) if radius else None
+        if center:
+            input_data["venue_suggestion"]["center"] = {"lat": round(center[0], 6), "lon": round(center[1], 6)}
+            input_data["venue_suggestion"]["nearby_venues"] = venues.nearby(
+                center[0], center[1], radius, event.expected_attendees or 0,
+                limit=getattr(settings, "AI_VENUE_PROMPT_CANDIDATES", 10),
+            )
+        return input_data
 
-            updated_suggestions = []
+    def run(self, user, data, event_id=None, **options):
+        try:
+            event = Event.objects.get(id=event_id)
+        except Event.DoesNotExist:
+            return {"error": "Event not found"}, status.HTTP_404_NOT_FOUND
 
-            for idx, venue in enumerate(suggestions):
-               
-                address, map_url = self.geocode_place_name(venue.get("name"))
+        input_data = self.build_input(event, data)
+        search = input_data["venue_suggestion"]
+        radius = venues.parse_radius(search["radius_km"])
+        center = search.get("center")
+        nearby = search.get("nearby_venues", [])
 
-                
-                venue["address"] = address if address else venue.get("address", "")
-                venue["map_url"] = map_url if map_url else venue.get("map_url")
+        try:
+            answer_min = getattr(settings, "AI_VENUE_CATALOGUE_ANSWER_MIN", 5)
+            if answer_min and len(nearby) >= answer_min:
+                # The catalogue alone has enough venues in range: no model call
+                result = {"venue_suggestions": [dict(venue) for venue in nearby[:answer_min]], "source": "catalogue"}
+                metrics.incr("ai_venue_suggestions_total", source="catalogue")
+            else:
+                trace = {}
+                result = claim_or_generate(
+                    event.id, "venue_suggestion", input_data, generate_venue_suggestion_from_gemini,
+                    trace=trace, **options
+                )
+                result["source"] = trace.get("source", "model")
+                metrics.incr("ai_venue_suggestions_total", source=result["source"])
+            suggestions = result.get("venue_suggestions", [])
 
-                
+            # Catalogue venues are located already; the rest are geocoded at
+            # once, and whatever misses the deadline is reported as pending
+            # and filled in when it arrives
+            catalogue = venues.known([(venue.get("name"), venue.get("address")) for venue in suggestions])
+            locations, pending = geocode.resolve([
+                venue.get("name") for venue in suggestions
+                if (venue.get("name"), venue.get("address")) not in catalogue
+            ])
+            geocoding = {"catalogue": [], "resolved": [], "not_found": [], "pending": list(pending)}
+            rejected = []
 
-              
-                if idx == 0:
-                 
-                    VenueSuggestion.objects.filter(event=event).delete()
+            updated_suggestions = []
 
-                    saved = VenueSuggestion.objects.create(
-                        event=event,
-                        name=venue.get("name"),
-                        address=venue["address"],
-                        capacity=venue.get("capacity"),
-                        transportation_score=venue.get("transportation_score"),
-                        map_url=venue["map_url"],
-                        is_outdoor=venue.get("is_outdoor"),
-                    )
+            for venue in suggestions:
+
+                name = venue.get("name")
+                if (name, venue.get("address")) in catalogue:
+                    known = catalogue[(name, venue.get("address"))]
+                    location = {
+                        "address": known.address,
+                        "lat": known.lat,
+                        "lon": known.lon,
+                        "map_url": known.map_url or geocode.map_url(known.lat, known.lon),
+                    }
+                    venue["geocode"] = "catalogue"
+                else:
+                    location = locations.get(name)
+                    venue["geocode"] = "pending" if name in pending else "resolved" if location else "not_found"
+                if venue["geocode"] != "pending":
+                    geocoding[venue["geocode"]].append(name)
+
+                # Suggestions the model placed outside the radius are dropped;
+                # ungeocoded ones cannot be checked and are kept
+                if location and center and radius:
+                    venue["distance_km"] = round(venues.distance_km(
+                        (center["lat"], center["lon"]), (location["lat"], location["lon"])
+                    ), 2)
+                    if venue["distance_km"] > radius:
+                        rejected.append({"name": name, "distance_km": venue["distance_km"]})
+                        metrics.incr("ai_venue_rejected_total")
+                        continue
+
+                venue["address"] = location["address"] if location else venue.get("address", "")
+                venue["map_url"] = location["map_url"] if location else venue.get("map_url")
+                updated_suggestions.append(venue)
 
-    
- 
-                venue["id"] = saved.id  
-                venue["event_id"] = event.id
+            # Every accepted suggestion is kept, so none of the geocoding is
+            # wasted; the first (top-ranked) one is the event's venue. When all
+            # were rejected, the previous suggestions stay.
+            if updated_suggestions:
+                with transaction.atomic():
+                    VenueSuggestion.objects.filter(event=event).delete()
 
-                updated_suggestions.append(venue)
+                    for venue in updated_suggestions:
+                        saved = VenueSuggestion.objects.create(
+                            event=event,
+                            name=venue.get("name"),
+                            address=venue["address"],
+                            capacity=venue.get("capacity"),
+                            transportation_score=venue.get("transportation_score"),
+                            map_url=venue["map_url"],
+                            is_outdoor=venue.get("is_outdoor"),
+                        )
+                        venue["id"] = saved.id
+                        venue["event_id"] = event.id
+                        future = pending.get(venue.get("name"))
+                        if future is not None:
+                            transaction.on_commit(
+                                lambda venue_id=saved.id, future=future: geocode.backfill_venue(venue_id, future)
+                            )
 
             result["venue_suggestions"] = updated_suggestions
-            return Response(result, status=status.HTTP_200_OK)
+            result["geocoding"] = geocoding
+            result["rejected"] = rejected
+            return result, status.HTTP_200_OK
 
         except ValueError as e:
-            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            return error_response(e)
 
 # Create RegistrationFormField
-class RegistrationFormGenerationAPIView(APIView):
-    permission_classes = [IsAuthenticated]
-
-    def post(self, request, event_id):
-        if not has_role(request.user, event_id, ['owner', 'editor']):
-            return Response({"error": "Permission denied"}, status=status.HTTP_403_FORBIDDEN)
+class RegistrationFormGenerationAPIView(GenerationAPIView):
+    job_name = "generate-forms"
+    prompt_kinds = ("registration_form",)
 
+    def run(self, user, data, event_id=None, **options):
         try:
             event = Event.objects.get(id=event_id)
-            venue = VenueSuggestion.objects.get(event_id=event_id)
+            venue = VenueSuggestion.objects.filter(event_id=event_id).earliest("id")
         except (Event.DoesNotExist, VenueSuggestion.DoesNotExist):
-            return Response({"error": "Event or Venue not found"}, status=status.HTTP_404_NOT_FOUND)
+            return {"error": "Event or Venue not found"}, status.HTTP_404_NOT_FOUND
 
         event_data = {
             "event": {
@@ -272,52 +524,53 @@ class RegistrationFormGenerationAPIView(APIView):
         }
 
         try:
-            result = generate_registration_form_from_gemini(event_data)
-
-            
-            Registration.objects.filter(event=event).delete()
+            result = generate_registration_form_from_gemini(event_data, **options)
 
             registration_list = result.get("registration-list", [])
             updated_list = []
 
-            for registration in registration_list:
-                saved = Registration.objects.create(
-                    event=event,
-                    event_intro=registration.get("event_intro", ""),
-                    form_title=registration.get("form_title", ""),
-                    form_fields=registration.get("form_fields", ""),
-                )
+            # Readers (the poster's QR code) see the old form or the new one, never neither
+            with transaction.atomic():
+                Registration.objects.filter(event=event).delete()
 
-                
-                registration["id"] = saved.id
-                registration["event_id"] = event.id
-                updated_list.append(registration)
+                for registration in registration_list:
+                    saved = Registration.objects.create(
+                        event=event,
+                        event_intro=registration.get("event_intro", ""),
+                        form_title=registration.get("form_title", ""),
+                        form_fields=registration.get("form_fields", ""),
+                    )
 
-            result["registration-list"] = updated_list
-            return Response(result, status=status.HTTP_200_OK)
+                    registration["id"] = saved.id
+                    registration["event_id"] = event.id
+                    updated_list.append(registration)
 
+            result["registration-list"] = updated_list
+            return result, status.HTTP_200_OK
 
         except Exception as e:
-            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            return error_response(e)
 
 
-class InvitationGenerationAPIView(APIView):
-    permission_classes = [IsAuthenticated]
+class InvitationGenerationAPIView(GenerationAPIView):
+    job_name = "generate-invitation"
+    prompt_kinds = ("invitation",)
 
-    def post(self, request, event_id):
-       
-        if not has_role(request.user, event_id, ['owner', 'editor']):
-            return Response({"error": "Permission denied"}, status=status.HTTP_403_FORBIDDEN)
+    def validate(self, data):
+        serializer = InvitationRequestSerializer(data=data)
+        return None if serializer.is_valid() else serializer.errors
 
-        
-        event = get_object_or_404(Event, id=event_id)
-        venue = get_object_or_404(VenueSuggestion, event_id=event_id)
-        registration = get_object_or_404(Registration, event_id=event_id)
+    def run(self, user, data, event_id=None, **options):
+        try:
+            event = Event.objects.get(id=event_id)
+            venue = VenueSuggestion.objects.filter(event_id=event_id).earliest("id")
+            registration = Registration.objects.get(event_id=event_id)
+        except (Event.DoesNotExist, VenueSuggestion.DoesNotExist, Registration.DoesNotExist):
+            return {"error": "Event, venue or registration not found"}, status.HTTP_404_NOT_FOUND
 
-        
-        serializer = InvitationRequestSerializer(data=request.data)
+        serializer = InvitationRequestSerializer(data=data)
         if not serializer.is_valid():
-            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            return serializer.errors, status.HTTP_400_BAD_REQUEST
         data = serializer.validated_data
 
         event_data = {
@@ -346,11 +599,11 @@ class InvitationGenerationAPIView(APIView):
         }
 
         try:
-            result = generate_invitation_from_gemini(event_data)
+            result = generate_invitation_from_gemini(event_data, **options)
 
             invitation_list = result.get("invitation_list", [])
             if not invitation_list:
-                return Response({"error": "No invitation content returned from Gemini."}, status=500)
+                return {"error": "No invitation content returned from Gemini."}, status.HTTP_500_INTERNAL_SERVER_ERROR
 
             updated_list = []
             for invitation in invitation_list:
@@ -366,45 +619,44 @@ class InvitationGenerationAPIView(APIView):
                 updated_list.append(invitation)
 
             result["invitation_list"] = updated_list
-            return Response(result, status=status.HTTP_200_OK)
+            return result, status.HTTP_200_OK
 
         except Exception as e:
-            print("🛑 Internal error generating invitation:")
-            traceback.print_exc()
-            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            logger.exception("Generating invitations for event %s failed", event_id)
+            return error_response(e)
 
-# Create posts on the Social media 
-class SocialPostGenerationAPIView(APIView):
-    permission_classes = [IsAuthenticated]
+# Create posts on the Social media
+class SocialPostGenerationAPIView(GenerationAPIView):
+    job_name = "generate-social-post"
+    prompt_kinds = ("social_post",)
 
     def post(self, request, event_id):
-        if not has_role(request.user, event_id, ['owner', 'editor']):
-            return Response({"error": "Permission denied"}, status=status.HTTP_403_FORBIDDEN)
+        if wants_stream(request):
+            if not has_role(request.user, event_id, ['owner', 'editor']):
+                return Response({"error": "Permission denied"}, status=status.HTTP_403_FORBIDDEN)
+
+            event_data, error = self.build_event_data(request.data, event_id)
+            if error:
+                return Response(*error)
+            return self.stream(request, event_data)
 
+        return super().post(request, event_id)
+
+    def build_event_data(self, data, event_id):
         try:
             event = Event.objects.get(id=event_id)
         except Event.DoesNotExist:
-            return Response({"error": "Event not found"}, status=status.HTTP_404_NOT_FOUND)
-        
+            return None, ({"error": "Event not found"}, status.HTTP_404_NOT_FOUND)
+
         try:
-            venue = VenueSuggestion.objects.get(event_id=event_id)
+            venue = VenueSuggestion.objects.filter(event_id=event_id).earliest("id")
         except VenueSuggestion.DoesNotExist:
-            return Response({"error": "VenueSuggestion not found"}, status=status.HTTP_404_NOT_FOUND)
-    
+            return None, ({"error": "VenueSuggestion not found"}, status.HTTP_404_NOT_FOUND)
+
         try:
             registration = Registration.objects.get(event_id=event_id)
         except Registration.DoesNotExist:
-            return Response({"error": "Registration not found"}, status=status.HTTP_404_NOT_FOUND)
-        
-        platform = request.data.get("platform", "")
-        tone = request.data.get("tone", "")
-        hook_type = request.data.get("hook_type", "")
-        words_limit = request.data.get("words_limit", "")
-        include_emoji = request.data.get("include_emoji", "")
-        emoji_level = request.data.get("emoji_level", "")
-        power_words = request.data.get("power_words", "")
-        hashtag_seeds = request.data.get("hashtag_seeds", "")
-        language = request.data.get("language", "")
+            return None, ({"error": "Registration not found"}, status.HTTP_404_NOT_FOUND)
 
         event_data = {
             "event": {
@@ -419,76 +671,121 @@ class SocialPostGenerationAPIView(APIView):
             },
             "venue": {
                 "name": venue.name,
-                "address": venue.address,  
+                "address": venue.address,
             },
             "registration": {
                 "registration_url": registration.registration_url,
             },
             "social_post": {
-                "platform": platform,
-                "words_limit": words_limit,  
-                "tone": tone,
-                "hook_type": hook_type,  
-                "include_emoji": include_emoji,  
-                "emoji_level": emoji_level,  
-                "power_words": power_words,  
-                "hashtag_seeds": hashtag_seeds,  
-                "language": language, 
+                "platform": data.get("platform", ""),
+                "words_limit": data.get("words_limit", ""),
+                "tone": data.get("tone", ""),
+                "hook_type": data.get("hook_type", ""),
+                "include_emoji": data.get("include_emoji", ""),
+                "emoji_level": data.get("emoji_level", ""),
+                "power_words": data.get("power_words", ""),
+                "hashtag_seeds": data.get("hashtag_seeds", ""),
+                "language": data.get("language", ""),
             }
         }
+        return event_data, None
 
-        try:
-            result = generate_social_post_gemini(event_data)
-            SocialPost.objects.filter(event=event).delete()
-
-            post_list = result.get("post_list", [])
-            updated_post_list = []
+    def run(self, user, data, event_id=None, **options):
+        event_data, error = self.build_event_data(data, event_id)
+        if error:
+            return error
 
-            for post in post_list:
-                saved = SocialPost.objects.create(
-                    event=event,
-                    platform=platform,
-                    tone=tone,
-                    language=language,
-                    content=post.get("content", ""),
-                )
-                
-                post["id"] = saved.id
-                post["event_id"] = event.id
-                updated_post_list.append(post)
-
-            result["post_list"] = updated_post_list
+        count, another = candidate_options(data)
+        try:
+            if count > 1 or another:
+                post, extras = candidates.choose("social_post", event_id, event_data, count, another, **options)
+                result = self.save_posts({"post_list": [post]}, event_data)
+                result.update(extras)
+                return result, status.HTTP_200_OK
 
-            return Response(result, status=status.HTTP_200_OK)
+            result = generate_social_post_gemini(event_data, **options)
+            return self.save_posts(result, event_data), status.HTTP_200_OK
 
+        except ValueError as e:
+            return error_response(e)
+
+    # ?stream=1: emit each post as soon as it is generated
+    def stream(self, request, event_data):
+        chunks = stream_social_post_gemini(event_data, use_cache=use_cache(request))
+
+        def events():
+            parser = IncrementalJSONParser()
+            try:
+                for chunk in chunks:
+                    for path, value in parser.feed(chunk):
+                        yield sse_event("field", {"path": path, "value": value})
+
+                result = parse_gemini_response(parser.text, "social_post")
+                yield sse_event("done", self.save_posts(result, event_data))
+
+            except Exception as e:
+                yield sse_event("error", {"error": str(e)})
+
+        return self.stream_response(request, events())
+
+    def save_posts(self, result, event_data):
+        event_id = event_data["event"]["event_id"]
+        social_post = event_data["social_post"]
+        SocialPost.objects.filter(event_id=event_id).delete()
+
+        post_list = result.get("post_list", [])
+        updated_post_list = []
+
+        for post in post_list:
+            saved = SocialPost.objects.create(
+                event_id=event_id,
+                platform=social_post["platform"],
+                tone=social_post["tone"],
+                language=social_post["language"],
+                content=post.get("content", ""),
+            )
 
+            post["id"] = saved.id
+            post["event_id"] = event_id
+            updated_post_list.append(post)
 
-        except ValueError as e:
-            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        result["post_list"] = updated_post_list
+        return result
 
 
 # Create poster
-class PosterGenerationAPIView(APIView):
-    permission_classes = [IsAuthenticated]
-
-    def post(self, request, event_id):
-        if not has_role(request.user, event_id, ['owner', 'editor']):
-            return Response({"error": "Permission denied"}, status=status.HTTP_403_FORBIDDEN)
+class PosterGenerationAPIView(GenerationAPIView):
+    job_name = "generate-poster"
+    prompt_kinds = ("poster_copy", "poster_image")
+
+    def get_prompt_kinds(self, data):
+        # engine=local renders the image without a provider call
+        if poster.get_engine(data.get("engine")) == "local":
+            return ("poster_copy",)
+        return self.prompt_kinds
+
+    def validate(self, data):
+        if poster.get_engine(data.get("engine")) is None:
+            return {"engine": [f"Must be one of: {', '.join(poster.ENGINES)}"]}
+        return None
+
+    def run(self, user, data, event_id=None, **options):
+        errors = self.validate(data)
+        if errors:
+            return errors, status.HTTP_400_BAD_REQUEST
 
         try:
             event = Event.objects.get(id=event_id)
-            venue = VenueSuggestion.objects.get(event_id=event_id)
+            venue = VenueSuggestion.objects.filter(event_id=event_id).earliest("id")
         except (Event.DoesNotExist, VenueSuggestion.DoesNotExist):
-            return Response({"error": "Event or venue not found"}, status=status.HTTP_404_NOT_FOUND)
+            return {"error": "Event or venue not found"}, status.HTTP_404_NOT_FOUND
 
-        
-        tone = request.data.get("tone", "")
-        color_scheme = request.data.get("color_scheme", "")
-        layout_style = request.data.get("layout_style", "")
-        font_style = request.data.get("font_style", "")
-        language = request.data.get("language", "")
+        tone = data.get("tone", "")
+        color_scheme = data.get("color_scheme", "")
+        layout_style = data.get("layout_style", "")
+        font_style = data.get("font_style", "")
+        language = data.get("language", "")
 
-        
         event_data = {
             "event": {
                 "event_id": event.id,
@@ -513,37 +810,26 @@ class PosterGenerationAPIView(APIView):
             }
         }
 
+        count, another = candidate_options(data)
         try:
-        
-            poster_text = generate_poster_text_gemini(event_data)
+            # Each stage is skipped when its inputs are unchanged (see ai.services.poster)
+            poster_text, extras, copy_report = poster.copy_stage(event_id, event_data, count, another, **options)
             headline = poster_text["headline"]
             subheadline = poster_text["subheadline"]
 
-           
             event_data["poster_text"] = {
                 "headline": headline,
                 "subheadline": subheadline
             }
 
-         
-            image_base64 = generate_poster_image_openai(event_data)
-
-    
-            img_bytes = base64.b64decode(image_base64)
-            folder = os.path.join(settings.MEDIA_ROOT, "generated_posters")
-            os.makedirs(folder, exist_ok=True)
-            filename = f"{uuid4().hex}.png"
-            filepath = os.path.join(folder, filename)
-
-            with open(filepath, "wb") as f:
-                f.write(img_bytes)
-
-            media_url = f"{settings.MEDIA_URL}generated_posters/{filename}"
+            image, image_report = poster.image_stage(
+                event_data, use_cache=options.get("use_cache", True), engine=data.get("engine"),
+            )
 
             VisualAsset.objects.filter(event=event).delete()
             visual_asset = VisualAsset.objects.create(
                 event=event,
-                image_url=media_url,
+                image_url=image["image_url"],
                 headline=headline,
                 subheadline=subheadline,
                 tone=tone,
@@ -552,14 +838,193 @@ class PosterGenerationAPIView(APIView):
                 layout_style=layout_style,
             )
 
-            return Response({
-                "image_url": media_url,
-                "filename": filename,
-                "local_path": filepath,
+            # Smaller WebP/AVIF renditions and the registration QR (pasted into
+            # the reserved corner) are made in the background
+            transaction.on_commit(lambda: renditions.schedule(visual_asset.image_url))
+            registration = Registration.objects.filter(event_id=event_id).first()
+            variants = {}
+            if qr.schedule_composite(visual_asset, registration and registration.registration_url):
+                variants["qr"] = "pending"
+
+            return {
+                **image,
                 "headline": headline,
                 "subheadline": subheadline,
-                "visual_asset_id": visual_asset.id
-            }, status=status.HTTP_200_OK)
+                "visual_asset_id": visual_asset.id,
+                "variants": variants,
+                "stages": {"copy": copy_report, "image": image_report},
+                **extras,
+            }, status.HTTP_200_OK
 
         except ValueError as e:
-            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            return error_response(e)
+
+
+# Job name -> view that runs it (used by ai.services.jobs)
+GENERATION_VIEWS = {
+    view.job_name: view
+    for view in (
+        GenerateEventAPIView, TaskAssignmentGenerationAPIView, VenueSuggestionGenerationAPIView,
+        RegistrationFormGenerationAPIView, InvitationGenerationAPIView, SocialPostGenerationAPIView,
+        PosterGenerationAPIView,
+    )
+}
+
+
+# One-shot "event kit": every artifact of an event in a single request.
+# Stage -> (dependencies, view); independent stages run in parallel.
+KIT_STAGES = {
+    "tasks": ((), TaskAssignmentGenerationAPIView),
+    "venues": ((), VenueSuggestionGenerationAPIView),
+    "forms": (("venues",), RegistrationFormGenerationAPIView),
+    # The poster reads the Registration (its URL becomes the QR code)
+    "poster": (("forms",), PosterGenerationAPIView),
+    "social_post": (("forms",), SocialPostGenerationAPIView),
+    "invitation": (("forms",), InvitationGenerationAPIView),
+}
+
+class GenerateKitAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, event_id):
+        if not has_role(request.user, event_id, ['owner', 'editor']):
+            return Response({"error": "Permission denied"}, status=status.HTTP_403_FORBIDDEN)
+
+        if not Event.objects.filter(id=event_id).exists():
+            return Response({"error": "Event not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        # Each stage reads its own options from the body, e.g. {"venues": {"name": ..., "radius_km": ...}}.
+        # Invitations need recipient data, so that stage only runs when "invitation" is given.
+        requested = request.data.get("stages") or [
+            name for name in KIT_STAGES if name != "invitation" or "invitation" in request.data
+        ]
+        unknown = [name for name in requested if name not in KIT_STAGES]
+        if unknown:
+            return Response({"error": f"Unknown stages: {', '.join(unknown)}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        for name in requested:
+            errors = KIT_STAGES[name][1]().validate(request.data.get(name) or {})
+            if errors:
+                return Response({name: errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            prompt_kinds = [
+                kind for name in requested
+                for kind in KIT_STAGES[name][1]().get_prompt_kinds(request.data.get(name) or {})
+            ]
+            admission.admit(request.user.id, prompt_kinds)
+        except admission.Throttled as e:
+            return retry_response(*error_response(e))
+
+        user = request.user
+        options = {"use_cache": use_cache(request)}
+
+        def stage(view_class, data):
+            return lambda: view_class().run(user, data, event_id, **options)
+
+        stages = {}
+        for name in requested:
+            deps, view_class = KIT_STAGES[name]
+            # A dependency left out of the request is assumed to exist already
+            deps = tuple(dep for dep in deps if dep in requested)
+            stages[name] = (deps, stage(view_class, request.data.get(name) or {}))
+
+        with metrics.timed("ai_kit_wall_ms"), speculation.interactive(), \
+                resilience.deadline(request_deadline(request, getattr(settings, "AI_KIT_DEADLINE", 300))):
+            results = run_dag(stages, max_workers=getattr(settings, "AI_KIT_WORKERS", 4))
+
+        all_succeeded = all(result["status"] == "succeeded" for result in results.values())
+        return Response({
+            "event_id": event_id,
+            "stages": results,
+            "wall_ms": max((r.get("started_ms", 0) + r.get("duration_ms", 0) for r in results.values()), default=0),
+            "sum_of_stages_ms": round(sum(r.get("duration_ms", 0) for r in results.values()), 1),
+            "critical_path_ms": critical_path_ms(results),
+        }, status=status.HTTP_200_OK if all_succeeded else status.HTTP_207_MULTI_STATUS)
+
+
+# Status, result and cancellation of ?async=true generations
+class GenerationJobAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, job_id):
+        recover_jobs()
+        job = get_object_or_404(GenerationJob, id=job_id, user=request.user)
+        return Response(GenerationJobSerializer(job).data, status=status.HTTP_200_OK)
+
+    def delete(self, request, job_id):
+        job = get_object_or_404(GenerationJob, id=job_id, user=request.user)
+        if not cancel_job(job):
+            return Response(
+                {"error": f"Job is {job.status} and can no longer be cancelled"},
+                status=status.HTTP_409_CONFLICT
+            )
+        job.refresh_from_db()
+        return Response(GenerationJobSerializer(job).data, status=status.HTTP_200_OK)
+
+
+# Per-worker generation metrics (client reuse, latency, ...)
+class AIMetricsAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response(metrics.snapshot(), status=status.HTTP_200_OK)
+
+
+# Speculative drafts of an event: GET lists them, DELETE cancels pending work
+class GenerationDraftAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, event_id):
+        if not has_role(request.user, event_id, ['owner', 'editor']):
+            return Response({"error": "Permission denied"}, status=status.HTTP_403_FORBIDDEN)
+
+        drafts = GenerationDraft.objects.filter(event_id=event_id).values(
+            "prompt_kind", "status", "error", "created_at", "started_at", "finished_at"
+        )
+        return Response({"event_id": event_id, "drafts": list(drafts)}, status=status.HTTP_200_OK)
+
+    def delete(self, request, event_id):
+        if not has_role(request.user, event_id, ['owner', 'editor']):
+            return Response({"error": "Permission denied"}, status=status.HTTP_403_FORBIDDEN)
+
+        cancelled = speculation.cancel(event_id)
+        return Response({"event_id": event_id, "cancelled": cancelled}, status=status.HTTP_200_OK)
+
+
+# Model routing table: GET shows the active routes, staff can PUT an override
+# {"prompt_kind": "poster_copy", "tier": "fast", "slo_p95_ms": 4000, "enabled": true}
+class ModelRouteAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response(routing.describe(), status=status.HTTP_200_OK)
+
+    def put(self, request):
+        if not request.user.is_staff:
+            return Response({"error": "Permission denied"}, status=status.HTTP_403_FORBIDDEN)
+
+        prompt_kind = request.data.get("prompt_kind")
+        tier = request.data.get("tier")
+        if prompt_kind not in schemas.SCHEMAS:
+            return Response({"error": f"Unknown prompt kind: {prompt_kind}"}, status=status.HTTP_400_BAD_REQUEST)
+        if tier not in routing.get_tiers():
+            return Response({"error": f"Unknown tier: {tier}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        ModelRoute.objects.update_or_create(
+            prompt_kind=prompt_kind,
+            defaults={
+                "tier": tier,
+                "slo_p95_ms": request.data.get("slo_p95_ms"),
+                "enabled": request.data.get("enabled", True),
+            },
+        )
+        # Other workers pick the change up within AI_ROUTES_REFRESH seconds
+        routing.invalidate()
+        return Response(routing.describe(), status=status.HTTP_200_OK)
+
+
+# Generated media under MEDIA_URL; public like the static() route it replaces
+@require_safe
+def serve_media(request, path):
+    return media.serve(request, path)
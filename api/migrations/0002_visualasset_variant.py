@@ -0,0 +1,24 @@
+# Generated by Django 5.2.1 on 2026-10-18 16:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='visualasset',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='variants', to='api.visualasset'),
+        ),
+        migrations.AddField(
+            model_name='visualasset',
+            name='variant',
+            field=models.CharField(default='original', max_length=30),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.1 on 2026-10-18 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_visualasset_variant'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Venue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('address', models.CharField(blank=True, default='', max_length=255)),
+                ('lat', models.FloatField()),
+                ('lon', models.FloatField()),
+                ('capacity', models.PositiveIntegerField()),
+                ('is_outdoor', models.BooleanField(default=False)),
+                ('transportation_score', models.PositiveSmallIntegerField(default=3)),
+                ('map_url', models.URLField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('name', 'address')},
+            },
+        ),
+    ]
@@ -55,6 +55,9 @@ class VisualAsset(models.Model):
     font_style = models.CharField(max_length=100, blank=True)
     layout_style = models.CharField(max_length=100, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Derived images (e.g. 'qr': poster with the registration QR code) point at the original
+    variant = models.CharField(max_length=30, default='original')
+    parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='variants')
 
 class SocialPost(models.Model):
     PLATFORM_CHOICES = [
@@ -80,6 +83,23 @@ class VenueSuggestion(models.Model):
     is_outdoor = models.BooleanField(default=False)
 
 
+# Known venues, searched by distance before (or instead of) asking the model
+# for suggestions; see ai/services/venues.py
+class Venue(models.Model):
+    name = models.CharField(max_length=255)
+    address = models.CharField(max_length=255, blank=True, default='')
+    lat = models.FloatField()
+    lon = models.FloatField()
+    capacity = models.PositiveIntegerField()
+    is_outdoor = models.BooleanField(default=False)
+    transportation_score = models.PositiveSmallIntegerField(default=3)
+    map_url = models.URLField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('name', 'address')
+
+
 class EmailLog(models.Model):
     STATUS_CHOICES = [
         ('sent', 'Sent'),
@@ -0,0 +1,14 @@
+from rest_framework import serializers
+from api.models import VisualAsset
+from ai.services import renditions
+
+class VisualAssetSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = VisualAsset
+        fields = '__all__'
+
+    # Adds "renditions" ({format: {size: url}}) and "srcset" ({format: "url 256w, ..."})
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        data.update(renditions.srcset(instance.image_url))
+        return data
@@ -10,6 +10,7 @@ from .views.Venue_views import VenueSuggestionDetailAPIView,VenueSuggestionListC
 from .views.Invitation_views import EmailLogListCreateAPIView,EmailLogDetailAPIView,EmailLogAutoSendAPIView,SingleInvitationSendAPIView
 from .views.SocialPost_views import SocialPostDetailAPIView,SocialPostListCreateAPIView
 from .views.Registration_views import GoogleFormCreateAPIView,RegistrationDetailAPIView,RegistrationListCreateAPIView
+from .views.VisualAsset_views import VisualAssetListAPIView,VisualAssetDetailAPIView
 urlpatterns = [
     #event
     path("events/", EventListAPIView.as_view(), name="event-list"),
@@ -48,4 +49,8 @@ urlpatterns = [
     path('oauth2callback', google_auth_callback, name='google_auth_callback'),
     path('events/<int:event_id>/registration/', RegistrationListCreateAPIView.as_view(), name='registration-list-create'),
     path('registration/<int:pk>/', RegistrationDetailAPIView.as_view(), name='registration-detail'),
+
+    #visual-assets
+    path('events/<int:event_id>/visual-assets/', VisualAssetListAPIView.as_view(), name='visual-asset-list'),
+    path('visual-assets/<int:pk>/', VisualAssetDetailAPIView.as_view(), name='visual-asset-detail'),
 ]
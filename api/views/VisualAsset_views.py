@@ -0,0 +1,57 @@
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+
+from api.models import VisualAsset, EventEditor
+from api.serializers.VisualAssetSerializer import VisualAssetSerializer
+
+# Permission Tools
+def has_role(user, event, roles):
+    return EventEditor.objects.filter(event=event, user=user, role__in=roles).exists()
+
+class VisualAssetListAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    # ?variant=original|qr limits the list to one variant
+    def get(self, request, event_id):
+        if not has_role(request.user, event_id, ['owner', 'editor', 'viewer']):
+            return Response({"error": "Access denied"}, status=status.HTTP_403_FORBIDDEN)
+
+        assets = VisualAsset.objects.filter(event_id=event_id).order_by('-created_at')
+        variant = request.query_params.get('variant')
+        if variant:
+            assets = assets.filter(variant=variant)
+        serializer = VisualAssetSerializer(assets, many=True)
+        return Response(serializer.data)
+
+
+class VisualAssetDetailAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get_object(self, pk, user):
+        try:
+            asset = VisualAsset.objects.get(pk=pk)
+            if not has_role(user, asset.event_id, ['owner', 'editor', 'viewer']):
+                return None
+            return asset
+        except VisualAsset.DoesNotExist:
+            return None
+
+    def get(self, request, pk):
+        asset = self.get_object(pk, request.user)
+        if not asset:
+            return Response({"error": "Not found or access denied"}, status=status.HTTP_404_NOT_FOUND)
+        serializer = VisualAssetSerializer(asset)
+        return Response(serializer.data)
+
+    def delete(self, request, pk):
+        asset = self.get_object(pk, request.user)
+        if not asset:
+            return Response({"error": "Not found or access denied"}, status=status.HTTP_404_NOT_FOUND)
+
+        if not has_role(request.user, asset.event_id, ['owner', 'editor']):
+            return Response({"error": "Permission denied"}, status=status.HTTP_403_FORBIDDEN)
+
+        asset.delete()
+        return Response({"message": "Delete successfully!"}, status=status.HTTP_204_NO_CONTENT)